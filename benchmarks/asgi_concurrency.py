@@ -0,0 +1,138 @@
+"""
+Benchmark of the site holding many slow clients, served over WSGI by gthread workers and
+over ASGI by uvicorn workers, both with the defaults of `gunicorn.conf.py`.
+
+A database is populated in a temporary file and, for each server, a thousand
+connections are opened, spread over the slow duration so that slow clients are always in
+flight. Each of them sends the first line of its request, waits for the slow duration
+before finishing its headers, as a client on a slow network does, then reads the
+response. Meanwhile a probe requests the pages on fresh connections and measures how
+long a normal client waits. A thread-based server ties a thread up per slow client,
+while an event loop keeps them all at the cost of a coroutine each.
+
+Usage:
+    python -m benchmarks.asgi_concurrency [connections] [slow seconds]
+"""
+
+import asyncio
+import os
+import subprocess
+import sys
+from random import choice
+from tempfile import TemporaryDirectory
+from time import perf_counter
+
+from benchmarks.common import populate, report, setup_django
+from benchmarks.gunicorn_scaling import LETTINGS, PATHS, free_port, wait_until_ready
+
+
+SERVERS = (
+    ("WSGI gthread", "gthread"),
+    ("ASGI uvicorn", "uvicorn.workers.UvicornWorker"),
+)
+
+
+async def request(port, path, pause=0.0, delay=0.0):
+    """
+    Send a GET request on a new connection after `delay`, pausing before the end of its
+    headers.
+
+    Returns:
+        int: The status code of the response, or 0 if the request failed.
+    """
+    await asyncio.sleep(delay)
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    try:
+        writer.write(f"GET {path} HTTP/1.1\r\nHost: localhost\r\n".encode())
+        await writer.drain()
+        await asyncio.sleep(pause)
+        writer.write(b"Connection: close\r\n\r\n")
+        await writer.drain()
+        response = await reader.read()
+        return int(response.split(b" ", 2)[1]) if response else 0
+    except (OSError, IndexError, ValueError):
+        return 0
+    finally:
+        writer.close()
+
+
+async def probe(port, stop, samples):
+    """
+    Request the pages one after the other until `stop` is set, recording the latencies.
+    """
+    while not stop.is_set():
+        start = perf_counter()
+        status = await request(port, choice(PATHS))
+        samples.append((perf_counter() - start) * 1000 if status == 200 else float("inf"))
+
+
+async def load(port, connections, slow_seconds):
+    """
+    Run the slow clients and the probe, and return the probe latencies, the statuses of
+    the slow clients and the time until they all completed.
+    """
+    stop = asyncio.Event()
+    samples = []
+    probe_task = asyncio.create_task(probe(port, stop, samples))
+    start = perf_counter()
+    statuses = await asyncio.gather(
+        *(
+            request(port, choice(PATHS), slow_seconds, slow_seconds * i / connections)
+            for i in range(connections)
+        ),
+        return_exceptions=True,
+    )
+    elapsed = perf_counter() - start
+    stop.set()
+    await probe_task
+    return samples, statuses, elapsed
+
+
+def run(database_path, label, worker_class, connections, slow_seconds):
+    port = free_port()
+    env = dict(
+        os.environ,
+        DATABASE_PATH=database_path,
+        GUNICORN_BIND=f"127.0.0.1:{port}",
+        GUNICORN_WORKER_CLASS=worker_class,
+        GUNICORN_TIMEOUT="300",
+    )
+    server = subprocess.Popen(
+        [sys.executable, "-m", "gunicorn", "--config", "gunicorn.conf.py"],
+        env=env,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    try:
+        wait_until_ready(port)
+        samples, statuses, elapsed = asyncio.run(load(port, connections, slow_seconds))
+    finally:
+        server.terminate()
+        server.wait()
+    completed = sum(1 for status in statuses if status == 200)
+    report(f"{label} probe", samples)
+    print(
+        f"{'':<40} {completed}/{connections} slow clients served in {elapsed:.1f} s, "
+        f"{len(samples)} probe requests"
+    )
+
+
+def main(connections, slow_seconds):
+    with TemporaryDirectory() as directory:
+        database_path = os.path.join(directory, "bench.sqlite3")
+        setup_django(database_path=database_path)
+        populate(lettings=LETTINGS, profiles=LETTINGS)
+
+        from django.db import connection
+
+        connection.close()
+        print(f"{connections} connections, headers finished after {slow_seconds} s")
+        for label, worker_class in SERVERS:
+            run(database_path, label, worker_class, connections, slow_seconds)
+
+
+if __name__ == "__main__":
+    arguments = sys.argv[1:]
+    connections = int(arguments[0]) if arguments else 1000
+    slow_seconds = float(arguments[1]) if len(arguments) > 1 else 2
+    main(connections, slow_seconds)
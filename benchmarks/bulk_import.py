@@ -0,0 +1,65 @@
+"""
+Benchmark of the 'import_lettings' command on a generated CSV file.
+
+One row in a thousand is invalid, so the reject file is exercised too. The reported
+throughput includes the rebuild of the search and spatial indexes, which the command
+also times on its own.
+
+Usage:
+    python -m benchmarks.bulk_import [rows] [--defer-indexes]
+"""
+
+import csv
+import os
+import random
+import resource
+import sys
+from tempfile import TemporaryDirectory
+from time import perf_counter
+
+from benchmarks.common import setup_django
+
+
+def write_csv(path, count):
+    """
+    Write a CSV file of `count` lettings.
+    """
+    from lettings.importing import COLUMNS
+
+    with open(path, "w", newline="") as file:
+        writer = csv.writer(file)
+        writer.writerow(COLUMNS)
+        for i in range(count):
+            state = "C" if i % 1000 == 999 else "CA"
+            writer.writerow(
+                [
+                    f"Letting {i}",
+                    i % 9999,
+                    f"Street {i}",
+                    f"City {i % 100}",
+                    state,
+                    i % 99999,
+                    "USA",
+                    random.uniform(24.5, 49.0),
+                    random.uniform(-124.7, -67.0),
+                ]
+            )
+
+
+def main(count, *options):
+    from django.core.management import call_command
+
+    with TemporaryDirectory() as directory:
+        setup_django(os.path.join(directory, "benchmark.sqlite3"))
+        path = os.path.join(directory, "lettings.csv")
+        write_csv(path, count)
+        start = perf_counter()
+        call_command("import_lettings", path, *options)
+        elapsed = perf_counter() - start
+    print(f"{count / elapsed:.0f} rows/s")
+    maxrss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    print(f"Peak memory: {maxrss / 1024:.0f} MB")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 1000000, *sys.argv[2:])
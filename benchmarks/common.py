@@ -0,0 +1,164 @@
+"""
+This module contains the helpers shared by the benchmark scripts.
+
+The benchmarks run against a throw-away test database created from the current models,
+so they can be run from a fresh checkout with `python -m benchmarks.<name>`.
+"""
+
+import os
+from time import perf_counter
+
+import django
+
+
+_application = None
+
+
+def setup_django(database_path=None, **overrides):
+    """
+    Configure Django and create an empty test database from the current models.
+
+    Args:
+        database_path (str, optional): The file of the test database. An in-memory
+         database is used if it is not given.
+        **overrides: Settings to override before the database is created.
+
+    Returns:
+        None
+    """
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "oc_lettings_site.settings")
+    from django.conf import settings
+
+    for name, value in overrides.items():
+        setattr(settings, name, value)
+    if database_path is not None:
+        settings.DATABASES["default"]["TEST"] = {"NAME": database_path}
+    settings.MIGRATION_MODULES = {
+        app: None for app in ("oc_lettings_site", "lettings", "profiles")
+    }
+    django.setup()
+
+    from django.db import connection
+    from django.test.utils import setup_test_environment
+
+    setup_test_environment()
+    connection.creation.create_test_db(verbosity=0)
+
+
+def populate(lettings=1000, profiles=1000):
+    """
+    Insert the given number of lettings and profiles in the test database.
+
+    Args:
+        lettings (int): The number of lettings, each with its own address.
+        profiles (int): The number of profiles, each with its own user.
+
+    Returns:
+        None
+    """
+    from django.contrib.auth.models import User
+    from lettings.models import Address, Letting
+    from profiles.models import Profile
+
+    Address.objects.bulk_create(
+        Address(
+            number=i % 9999,
+            street=f"Street {i}",
+            city=f"City {i % 100}",
+            state="CA",
+            zip_code=i % 99999,
+            country_iso_code="USA",
+        )
+        for i in range(lettings)
+    )
+    Letting.objects.bulk_create(
+        Letting(title=f"Letting {address_id}", address_id=address_id)
+        for address_id in Address.objects.values_list("id", flat=True)
+    )
+    User.objects.bulk_create(User(username=f"user{i}") for i in range(profiles))
+    Profile.objects.bulk_create(
+        Profile(user_id=user_id, favorite_city="Los Angeles")
+        for user_id in User.objects.values_list("id", flat=True)
+    )
+
+
+def time_requests(client, url, count, **extra):
+    """
+    Request the given URL `count` times and return the latencies in milliseconds.
+
+    Args:
+        client (Client): The test client used to send the requests.
+        url (str): The requested URL.
+        count (int): The number of requests.
+        **extra: Extra arguments passed to `client.get`.
+
+    Returns:
+        list: The latency of each request, in milliseconds.
+    """
+    samples = []
+    for _ in range(count):
+        start = perf_counter()
+        client.get(url, **extra)
+        samples.append((perf_counter() - start) * 1000)
+    return samples
+
+
+def wsgi_get(path):
+    """
+    Send a GET request through the WSGI application, as gunicorn would.
+
+    Unlike the test client, this runs the request_started and request_finished
+    signals, so connections are closed or kept according to CONN_MAX_AGE.
+
+    Args:
+        path (str): The requested path.
+
+    Returns:
+        int: The status code of the response.
+    """
+    from django.core.handlers.wsgi import WSGIHandler
+    from django.test import RequestFactory
+
+    global _application
+    if _application is None:
+        _application = WSGIHandler()
+    environ = RequestFactory()._base_environ(PATH_INFO=path)
+    status = []
+    body = _application(environ, lambda code, headers: status.append(code))
+    for _ in body:
+        pass
+    body.close()
+    return int(status[0].split()[0])
+
+
+def percentile(samples, rank):
+    """
+    Return the given percentile of the samples.
+
+    Args:
+        samples (list): The measured values.
+        rank (float): The percentile, between 0 and 100.
+
+    Returns:
+        float: The value below which `rank` percent of the samples fall.
+    """
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, int(len(ordered) * rank / 100))
+    return ordered[index]
+
+
+def report(label, samples):
+    """
+    Print the p50 and p99 latencies of the samples.
+
+    Args:
+        label (str): The name of the measured scenario.
+        samples (list): The latencies, in milliseconds.
+
+    Returns:
+        None
+    """
+    print(
+        f"{label:<40} p50={percentile(samples, 50):8.3f} ms  "
+        f"p99={percentile(samples, 99):8.3f} ms  n={len(samples)}"
+    )
@@ -0,0 +1,93 @@
+"""
+Comparison of the bytes blocking the first paint of the pages, and of the resulting first
+contentful paint on a slow link, with the whole stylesheet of the theme and with the
+inlined critical stylesheet.
+
+The pages are rendered from a populated test database. Before, 'base.html' linked
+'css/styles.css', which the browser downloads before painting anything. After, the
+critical stylesheet is inlined in the page and the purged one loads without blocking.
+
+No browser is available to the benchmarks, so the first contentful paint is modelled as
+the time until the page and its blocking stylesheets are received over one connection:
+a TCP and a TLS 1.3 handshake, then a round trip per request, the responses growing
+from an initial congestion window of 10 segments which doubles every round trip. The
+HTML is sent as rendered and the stylesheets brotli-compressed, as WhiteNoise serves
+them.
+
+Usage:
+    python -m benchmarks.critical_css [RTT ms] [bandwidth kbit/s]
+"""
+
+import re
+import sys
+
+import brotli
+
+from benchmarks.common import populate, setup_django
+
+
+PATHS = ("/", "/lettings/", "/profiles/", "/lettings/1/")
+SEGMENT = 1460
+INITIAL_WINDOW = 10 * SEGMENT
+INLINED = re.compile(r"<style>.*?</style>\s*<link rel=\"preload\".*?</noscript>", re.S)
+
+
+def transfer(size, rtt, bandwidth, window):
+    """
+    Return the time to request and receive a response of `size` bytes, and the
+    congestion window after it.
+    """
+    elapsed, remaining = rtt, size
+    while True:
+        sent = min(remaining, window)
+        remaining -= sent
+        elapsed += sent * 8 / bandwidth
+        if remaining <= 0:
+            return elapsed, window
+        # The sender waits for the acknowledgements when its window is below the
+        # bandwidth-delay product
+        elapsed += max(0.0, rtt - window * 8 / bandwidth)
+        window *= 2
+
+
+def first_paint(sizes, rtt, bandwidth):
+    """
+    Return the modelled time until the responses of the given sizes are received, one
+    after the other over a new connection.
+    """
+    elapsed, window = 2 * rtt, INITIAL_WINDOW
+    for size in sizes:
+        duration, window = transfer(size, rtt, bandwidth, window)
+        elapsed += duration
+    return elapsed
+
+
+def main(rtt, bandwidth):
+    setup_django()
+    populate(lettings=20, profiles=20)
+
+    from django.test import Client
+    from oc_lettings_site.stylesheets import SOURCE, read_static
+
+    theme = len(brotli.compress(read_static(SOURCE).encode("utf-8")))
+    link = '<link href="/static/css/styles.css" rel="stylesheet" />'
+    client = Client()
+    print(f"RTT {rtt * 1000:.0f} ms, {bandwidth / 1000:.0f} kbit/s, CSS brotli-compressed")
+    print(f"{'page':<14} {'blocking bytes':>24} {'first contentful paint':>28}")
+    for path in PATHS:
+        html = client.get(path).content.decode("utf-8")
+        before = len(INLINED.sub(link, html).encode("utf-8"))
+        after = len(html.encode("utf-8"))
+        before_paint = first_paint([before, theme], rtt, bandwidth)
+        after_paint = first_paint([after], rtt, bandwidth)
+        print(
+            f"{path:<14} {before + theme:>10,} -> {after:>9,} "
+            f"{before_paint * 1000:>12,.0f} ms -> {after_paint * 1000:>7,.0f} ms"
+        )
+
+
+if __name__ == "__main__":
+    arguments = sys.argv[1:]
+    rtt = float(arguments[0]) / 1000 if arguments else 0.4
+    bandwidth = float(arguments[1]) * 1000 if len(arguments) > 1 else 400_000
+    main(rtt, bandwidth)
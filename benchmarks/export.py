@@ -0,0 +1,63 @@
+"""
+Benchmark of the 'export_data' command in each format, against `dumpdata`.
+
+The formats run first, so the peak memory growth of `dumpdata` is measured last.
+
+Usage:
+    python -m benchmarks.export [lettings]
+"""
+
+import os
+import resource
+import sys
+from io import StringIO
+from tempfile import TemporaryDirectory
+from time import perf_counter
+
+from benchmarks.common import populate, setup_django
+
+
+def measure(label, function, count):
+    """
+    Run the function and print its throughput and the growth of the peak memory.
+    """
+    before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    start = perf_counter()
+    function()
+    elapsed = perf_counter() - start
+    growth = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - before
+    print(
+        f"{label:<10} {elapsed:6.2f} s  {count / elapsed:8.0f} rows/s  "
+        f"peak memory +{growth / 1024:.0f} MB"
+    )
+
+
+def main(count):
+    setup_django()
+    populate(lettings=count, profiles=0)
+
+    from django.core.management import call_command
+
+    with TemporaryDirectory() as directory:
+        for format in ("csv", "jsonl", "columnar"):
+            path = os.path.join(directory, f"lettings.{format}")
+            measure(
+                format,
+                lambda: call_command(
+                    "export_data", "lettings", format=format, output=path, stderr=StringIO()
+                ),
+                count,
+            )
+            print(f"{'':<10} {os.path.getsize(path) / 1024 / 1024:6.1f} MB written")
+        path = os.path.join(directory, "lettings.json")
+        measure(
+            "dumpdata",
+            lambda: call_command(
+                "dumpdata", "lettings.Letting", "lettings.Address", output=path
+            ),
+            count,
+        )
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 100000)
@@ -0,0 +1,137 @@
+"""
+Load test of the site served by gunicorn with `gunicorn.conf.py`, for several worker
+classes and worker counts.
+
+A database is populated in a temporary file, then gunicorn is started on it for each
+configuration and loaded by client processes sending keep-alive requests to the public
+pages for a fixed duration. The throughput and latencies of each configuration are
+printed, so the scaling across worker counts can be compared. The clients run on the
+same machine and take a share of its CPUs, so the scaling flattens before the number of
+CPUs is reached.
+
+Usage:
+    python -m benchmarks.gunicorn_scaling [clients] [seconds] [workers...]
+"""
+
+import http.client
+import os
+import socket
+import subprocess
+import sys
+from multiprocessing import Pool
+from random import choice
+from tempfile import TemporaryDirectory
+from time import perf_counter, sleep
+
+from benchmarks.common import percentile, populate, report, setup_django
+
+
+LETTINGS = 1000
+PATHS = ["/", "/lettings/", "/profiles/"] + [f"/lettings/{i}/" for i in range(1, 51)]
+
+
+def free_port():
+    """
+    Return a TCP port which is free on the loopback interface.
+    """
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def wait_until_ready(port, timeout=30):
+    """
+    Wait until the server answers on the given port.
+    """
+    deadline = perf_counter() + timeout
+    while perf_counter() < deadline:
+        try:
+            connection = http.client.HTTPConnection("127.0.0.1", port, timeout=1)
+            connection.request("GET", "/")
+            connection.getresponse().read()
+            return
+        except OSError:
+            sleep(0.1)
+    raise RuntimeError("gunicorn did not start")
+
+
+def client(arguments):
+    """
+    Send requests over one keep-alive connection until the duration elapses.
+
+    Returns:
+        tuple: The latencies in milliseconds and the number of errors.
+    """
+    port, seconds = arguments
+    connection = http.client.HTTPConnection("127.0.0.1", port, timeout=10)
+    samples, errors = [], 0
+    deadline = perf_counter() + seconds
+    while perf_counter() < deadline:
+        start = perf_counter()
+        try:
+            connection.request("GET", choice(PATHS))
+            response = connection.getresponse()
+            response.read()
+            if response.status != 200:
+                errors += 1
+        except (OSError, http.client.HTTPException):
+            errors += 1
+            connection.close()
+            connection = http.client.HTTPConnection("127.0.0.1", port, timeout=10)
+        samples.append((perf_counter() - start) * 1000)
+    connection.close()
+    return samples, errors
+
+
+def run(database_path, worker_class, workers, clients, seconds):
+    port = free_port()
+    env = dict(
+        os.environ,
+        DATABASE_PATH=database_path,
+        GUNICORN_BIND=f"127.0.0.1:{port}",
+        GUNICORN_WORKER_CLASS=worker_class,
+        WEB_CONCURRENCY=str(workers),
+    )
+    server = subprocess.Popen(
+        [sys.executable, "-m", "gunicorn", "--config", "gunicorn.conf.py"],
+        env=env,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    try:
+        wait_until_ready(port)
+        with Pool(clients) as pool:
+            results = pool.map(client, [(port, seconds)] * clients)
+    finally:
+        server.terminate()
+        server.wait()
+    samples = [sample for latencies, _ in results for sample in latencies]
+    errors = sum(errors for _, errors in results)
+    report(f"{worker_class} x{workers} workers", samples)
+    print(
+        f"{'':<40} {len(samples) / seconds:.0f} req/s  errors={errors}  "
+        f"p90={percentile(samples, 90):.3f} ms"
+    )
+
+
+def main(clients, seconds, worker_counts):
+    with TemporaryDirectory() as directory:
+        database_path = os.path.join(directory, "bench.sqlite3")
+        setup_django(database_path=database_path)
+        populate(lettings=LETTINGS, profiles=LETTINGS)
+
+        from django.db import connection
+
+        connection.close()
+        print(f"{os.cpu_count()} CPUs, {clients} clients, {seconds} s per configuration")
+        for worker_class in ("sync", "gthread"):
+            for workers in worker_counts:
+                run(database_path, worker_class, workers, clients, seconds)
+
+
+if __name__ == "__main__":
+    arguments = sys.argv[1:]
+    clients = int(arguments[0]) if arguments else 16
+    seconds = float(arguments[1]) if len(arguments) > 1 else 10
+    worker_counts = [int(count) for count in arguments[2:]] or [1, 2, 4, 8]
+    main(clients, seconds, worker_counts)
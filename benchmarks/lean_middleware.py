@@ -0,0 +1,107 @@
+"""
+Benchmark of the CPU time per request of the public pages, through the whole middleware
+stack and through the lean path of the anonymous requests.
+
+The requests go through the test client, which runs the middleware of the settings.
+They are conditional, with the ETag of the page, so that the views answer with a 304
+from their validators and the time left is mostly the one of the middleware. The whole
+stack is Django's session, CSRF, authentication and messages middleware, as
+MIDDLEWARE listed them before 'oc_lettings_site.middleware'. The lean stack is also
+measured for a client with a session cookie, which goes through the whole stack.
+Finally, the four middleware alone are timed around a view returning an empty response.
+
+Usage:
+    python -m benchmarks.lean_middleware [requests]
+"""
+
+import sys
+from time import perf_counter, process_time
+
+from benchmarks.common import percentile, populate, setup_django
+
+
+URLS = ("/lettings/", "/lettings/1/", "/profiles/", "/profiles/user1/")
+
+FULL_STACK = {
+    "oc_lettings_site.middleware.LeanSessionMiddleware": (
+        "django.contrib.sessions.middleware.SessionMiddleware"
+    ),
+    "oc_lettings_site.middleware.LeanCsrfViewMiddleware": (
+        "django.middleware.csrf.CsrfViewMiddleware"
+    ),
+    "oc_lettings_site.middleware.LeanAuthenticationMiddleware": (
+        "django.contrib.auth.middleware.AuthenticationMiddleware"
+    ),
+    "oc_lettings_site.middleware.LeanMessageMiddleware": (
+        "django.contrib.messages.middleware.MessageMiddleware"
+    ),
+}
+
+
+def measure(clients, url, count):
+    """
+    Request the URL `count` times with each client, one client after the other, with the
+    ETag of the page, and return the CPU time per request and the wall-clock latencies
+    of each client, in milliseconds.
+    """
+    etags = [client.get(url)["ETag"] for client in clients]
+    cpu = [0.0] * len(clients)
+    samples = [[] for _ in clients]
+    for _ in range(count):
+        for index, client in enumerate(clients):
+            cpu_start, start = process_time(), perf_counter()
+            client.get(url, HTTP_IF_NONE_MATCH=etags[index])
+            samples[index].append((perf_counter() - start) * 1000)
+            cpu[index] += (process_time() - cpu_start) * 1000
+    return [(total / count, latencies) for total, latencies in zip(cpu, samples)]
+
+
+def measure_middleware(paths, url, count):
+    """
+    Return the CPU time per request, in microseconds, of the given middleware around a
+    view returning an empty response, including the creation of the requests.
+    """
+    from django.http import HttpResponse
+    from django.test import RequestFactory
+    from django.utils.module_loading import import_string
+
+    handler = lambda request: HttpResponse()  # noqa: E731
+    for path in reversed(paths):
+        handler = import_string(path)(handler)
+    factory = RequestFactory()
+    start = process_time()
+    for _ in range(count):
+        handler(factory.get(url))
+    return (process_time() - start) * 1_000_000 / count
+
+
+def main(count):
+    setup_django()
+    populate(lettings=50, profiles=50)
+
+    from django.conf import settings
+    from django.test import Client, override_settings
+
+    full_stack = [FULL_STACK.get(path, path) for path in settings.MIDDLEWARE]
+    with override_settings(MIDDLEWARE=full_stack):
+        full = Client()
+        full.get("/")
+    session = Client()
+    session.cookies[settings.SESSION_COOKIE_NAME] = "unknown"
+    labels = ("whole stack", "lean path", "lean, session cookie")
+    clients = (full, Client(), session)
+    print(f"{'':<40} {'CPU/request':>12} {'p50':>10} {'p99':>10}")
+    for url in URLS:
+        measure(clients, url, 100)
+        for label, (cpu, samples) in zip(labels, measure(clients, url, count)):
+            print(
+                f"{label + ' ' + url:<40} {cpu * 1000:>9.0f} us "
+                f"{percentile(samples, 50):>7.3f} ms {percentile(samples, 99):>7.3f} ms"
+            )
+    for label, paths in (("whole stack", list(FULL_STACK.values())), ("lean path", FULL_STACK)):
+        cpu = measure_middleware(list(paths), URLS[-1], count * 10)
+        print(f"{label + ' middleware alone':<40} {cpu:>9.0f} us")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 2000)
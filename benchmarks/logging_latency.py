@@ -0,0 +1,57 @@
+"""
+Benchmark of the index views latency with synchronous and asynchronous file logging.
+
+Usage:
+    python -m benchmarks.logging_latency [requests]
+"""
+
+import logging.config
+import os
+import sys
+from copy import deepcopy
+from tempfile import TemporaryDirectory
+
+from benchmarks.common import populate, report, setup_django, time_requests
+
+
+URLS = ("/", "/lettings/", "/profiles/")
+
+
+def configure_logging(directory, asynchronous):
+    """
+    Reconfigure the project logging to write the log file in the given directory.
+    """
+    from django.conf import settings
+
+    config = deepcopy(settings.LOGGING)
+    handler = {
+        "level": "INFO",
+        "class": "logging.FileHandler",
+        "filename": os.path.join(directory, "info.log"),
+        "formatter": "verbose",
+    }
+    if asynchronous:
+        handler["class"] = "oc_lettings_site.log_handlers.QueueFileHandler"
+    config["handlers"]["file"] = handler
+    logging.config.dictConfig(config)
+
+
+def main(count):
+    setup_django()
+    populate(lettings=50, profiles=50)
+
+    from django.test import Client
+
+    client = Client()
+    with TemporaryDirectory() as directory:
+        for asynchronous in (False, True):
+            configure_logging(directory, asynchronous)
+            mode = "async" if asynchronous else "sync"
+            for url in URLS:
+                time_requests(client, url, 20)
+                report(f"{mode} {url}", time_requests(client, url, count))
+        logging.shutdown()
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 1000)
@@ -0,0 +1,80 @@
+"""
+Benchmark of the CPU time the Prometheus metrics add to the requests of the pages.
+
+The requests go through the test client, with and without 'MetricsMiddleware' in
+MIDDLEWARE, one client after the other. The template backend and the query wrapper stay
+installed for both, and only read a context variable outside the middleware. The pages
+are requested conditionally, so that the views answer with a 304 and the overhead is
+compared to the cheapest requests, then rendered, with their queries and templates timed.
+Finally, the middleware alone is timed around a view returning an empty response.
+
+With `--multiprocess`, the metrics are written to files in a temporary
+PROMETHEUS_MULTIPROC_DIR, as under gunicorn.
+
+Usage:
+    python -m benchmarks.metrics_overhead [requests] [--multiprocess]
+"""
+
+import os
+import sys
+from tempfile import TemporaryDirectory
+from time import perf_counter, process_time
+
+from benchmarks.common import percentile, populate, setup_django
+from benchmarks.lean_middleware import URLS, measure, measure_middleware
+
+
+def measure_rendered(clients, url, count):
+    """
+    Request the URL `count` times with each client, one client after the other, and
+    return the CPU time per request and the wall-clock latencies of each client, in
+    milliseconds.
+    """
+    cpu = [0.0] * len(clients)
+    samples = [[] for _ in clients]
+    for _ in range(count):
+        for index, client in enumerate(clients):
+            cpu_start, start = process_time(), perf_counter()
+            client.get(url)
+            samples[index].append((perf_counter() - start) * 1000)
+            cpu[index] += (process_time() - cpu_start) * 1000
+    return [(total / count, latencies) for total, latencies in zip(cpu, samples)]
+
+
+def main(count):
+    setup_django()
+    populate(lettings=50, profiles=50)
+
+    from django.conf import settings
+    from django.test import Client, override_settings
+
+    metrics = "oc_lettings_site.metrics.MetricsMiddleware"
+    middleware = [path for path in settings.MIDDLEWARE if path != metrics]
+    with override_settings(MIDDLEWARE=middleware):
+        without = Client()
+        without.get("/")
+    clients = (without, Client())
+    labels = ("without metrics", "with metrics")
+    print(f"{'':<42} {'CPU/request':>12} {'p50':>10} {'p99':>10}")
+    for url in URLS:
+        for mode, run in (("304", measure), ("200", measure_rendered)):
+            run(clients, url, 100)
+            for label, (cpu, samples) in zip(labels, run(clients, url, count)):
+                print(
+                    f"{label + ' ' + mode + ' ' + url:<42} {cpu * 1000:>9.0f} us "
+                    f"{percentile(samples, 50):>7.3f} ms {percentile(samples, 99):>7.3f} ms"
+                )
+    for label, paths in (("without metrics", []), ("with metrics", [metrics])):
+        cpu = measure_middleware(paths, URLS[-1], count * 10)
+        print(f"{label + ' middleware alone':<42} {cpu:>9.0f} us")
+
+
+if __name__ == "__main__":
+    arguments = [argument for argument in sys.argv[1:] if argument != "--multiprocess"]
+    count = int(arguments[0]) if arguments else 1000
+    if "--multiprocess" in sys.argv:
+        with TemporaryDirectory() as directory:
+            os.environ["PROMETHEUS_MULTIPROC_DIR"] = directory
+            main(count)
+    else:
+        main(count)
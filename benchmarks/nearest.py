@@ -0,0 +1,86 @@
+"""
+Benchmark of the nearest-lettings query with the spatial index.
+
+The addresses are spread at random over the contiguous United States and inserted with
+raw SQL, since building a million model instances would dominate the run time.
+
+Usage:
+    python -m benchmarks.nearest [addresses] [queries]
+"""
+
+import random
+import sys
+from time import perf_counter
+
+from benchmarks.common import report, setup_django
+
+
+BOUNDS = ((24.5, 49.0), (-124.7, -67.0))
+
+
+def insert_located_lettings(count):
+    """
+    Insert `count` lettings whose addresses are located at random.
+    """
+    from django.db import connection, transaction
+    from django.utils import timezone
+
+    now = timezone.now()
+    (min_latitude, max_latitude), (min_longitude, max_longitude) = BOUNDS
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.executemany(
+            "INSERT INTO lettings_address (id, number, street, city, state, zip_code, "
+            "country_iso_code, latitude, longitude, updated_at) "
+            "VALUES (%s, 1, 'Street', 'City', 'CA', 90000, 'USA', %s, %s, %s)",
+            (
+                (
+                    i,
+                    random.uniform(min_latitude, max_latitude),
+                    random.uniform(min_longitude, max_longitude),
+                    now,
+                )
+                for i in range(1, count + 1)
+            ),
+        )
+        cursor.executemany(
+            "INSERT INTO lettings_letting (id, title, address_id, updated_at) "
+            "VALUES (%s, %s, %s, %s)",
+            ((i, f"Letting {i}", i, now) for i in range(1, count + 1)),
+        )
+
+
+def main(count, queries):
+    setup_django()
+    random.seed(0)
+    insert_located_lettings(count)
+
+    from lettings import geo
+
+    start = perf_counter()
+    geo.rebuild_index()
+    print(f"Indexed {count} addresses in {(perf_counter() - start) * 1000:.0f} ms")
+
+    (min_latitude, max_latitude), (min_longitude, max_longitude) = BOUNDS
+    samples = []
+    for _ in range(queries):
+        latitude = random.uniform(min_latitude, max_latitude)
+        longitude = random.uniform(min_longitude, max_longitude)
+        start = perf_counter()
+        geo.nearest(latitude, longitude, 10)
+        samples.append((perf_counter() - start) * 1000)
+    report(f"nearest 10 of {count}", samples)
+
+    # A point far from every letting, where the bounding box stops at MAX_RADIUS_KM
+    samples = []
+    for _ in range(queries):
+        start = perf_counter()
+        geo.nearest(-33.87, 151.21, 10)
+        samples.append((perf_counter() - start) * 1000)
+    report(f"nearest 10 of {count}, far point", samples)
+
+
+if __name__ == "__main__":
+    main(
+        int(sys.argv[1]) if len(sys.argv) > 1 else 1000000,
+        int(sys.argv[2]) if len(sys.argv) > 2 else 1000,
+    )
@@ -0,0 +1,58 @@
+"""
+Benchmark of the CPU time the query log adds to the requests of the pages, off and on.
+
+The pages are rendered through the test client with and without 'QueryLogMiddleware' in
+MIDDLEWARE, one client after the other, with the query log off, then on. The execute
+wrapper stays installed on the connection in all cases. The log records are
+discarded, so that the time of the log file is not counted. Finally, the middleware
+alone is timed, off and on, around a view returning an empty response.
+
+Usage:
+    python -m benchmarks.query_log [requests]
+"""
+
+import logging
+import sys
+
+from benchmarks.common import percentile, populate, setup_django
+from benchmarks.lean_middleware import URLS, measure_middleware
+from benchmarks.metrics_overhead import measure_rendered
+
+
+def main(count):
+    setup_django()
+    populate(lettings=50, profiles=50)
+    logging.getLogger("oc_lettings_site.query_log").disabled = True
+
+    from django.conf import settings
+    from django.test import Client, override_settings
+
+    query_log = "oc_lettings_site.query_log.QueryLogMiddleware"
+    middleware = [path for path in settings.MIDDLEWARE if path != query_log]
+    with override_settings(MIDDLEWARE=middleware):
+        without = Client()
+        without.get("/")
+    clients = (without, Client())
+    print(f"{'':<42} {'CPU/request':>12} {'p50':>10} {'p99':>10}")
+    for url in URLS:
+        for state, enabled in (("off", False), ("on", True)):
+            with override_settings(QUERY_LOG=enabled):
+                measure_rendered(clients, url, 100)
+                results = measure_rendered(clients, url, count)
+            for label, (cpu, samples) in zip(("without", state), results):
+                print(
+                    f"{'query log ' + label + ' ' + url:<42} {cpu * 1000:>9.0f} us "
+                    f"{percentile(samples, 50):>7.3f} ms {percentile(samples, 99):>7.3f} ms"
+                )
+    for label, paths, enabled in (
+        ("without query log", [], False),
+        ("query log off", [query_log], False),
+        ("query log on", [query_log], True),
+    ):
+        with override_settings(QUERY_LOG=enabled):
+            cpu = measure_middleware(paths, URLS[-1], count * 10)
+        print(f"{label + ' middleware alone':<42} {cpu:>9.1f} us")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 1000)
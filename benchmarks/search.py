@@ -0,0 +1,54 @@
+"""
+Benchmark of the full-text search against the containment filters it replaces.
+
+Usage:
+    python -m benchmarks.search [lettings] [queries]
+"""
+
+import sys
+from time import perf_counter
+
+from benchmarks.common import populate, report, setup_django
+
+
+QUERIES = ("city 4", "street 99", "letting 12", "usa", "nowhere")
+
+
+def time_queries(function, count):
+    """
+    Run each query `count` times with the given function and return the latencies.
+    """
+    samples = []
+    for _ in range(count):
+        for query in QUERIES:
+            start = perf_counter()
+            function(query)
+            samples.append((perf_counter() - start) * 1000)
+    return samples
+
+
+def main(lettings, count):
+    setup_django()
+    populate(lettings=lettings, profiles=0)
+
+    from lettings import search
+
+    start = perf_counter()
+    search.rebuild_index()
+    print(f"Index built in {(perf_counter() - start) * 1000:.0f} ms")
+
+    report("fts5", time_queries(lambda query: search.search(query), count))
+    report(
+        "icontains",
+        time_queries(
+            lambda query: list(search._search_without_index(query, "default")[:20]),
+            count,
+        ),
+    )
+
+
+if __name__ == "__main__":
+    main(
+        int(sys.argv[1]) if len(sys.argv) > 1 else 10000,
+        int(sys.argv[2]) if len(sys.argv) > 2 else 50,
+    )
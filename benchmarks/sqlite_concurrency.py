@@ -0,0 +1,99 @@
+"""
+Benchmark of concurrent reads of /lettings/ while the admin writes, with and without the
+SQLite tuning layer.
+
+Each mode runs in its own process on its own database file, as the WAL journal mode is
+persistent.
+
+Usage:
+    python -m benchmarks.sqlite_concurrency [threads] [seconds]
+"""
+
+import logging
+import os
+import subprocess
+import sys
+from random import randint
+from tempfile import TemporaryDirectory
+from threading import Event, Thread
+from time import perf_counter, sleep
+
+from benchmarks.common import populate, report, setup_django, wsgi_get
+
+
+def read_loop(stop, samples, errors):
+    from django.db import connection
+
+    while not stop.is_set():
+        start = perf_counter()
+        try:
+            status = wsgi_get("/lettings/")
+        except Exception:
+            status = 500
+        samples.append((perf_counter() - start) * 1000)
+        if status != 200:
+            errors.append(status)
+    connection.close()
+
+
+def write_loop(stop, writes):
+    from django.db import connection, transaction
+    from lettings.models import Letting
+
+    count = Letting.objects.count()
+    while not stop.is_set():
+        with transaction.atomic():
+            Letting.objects.filter(pk=randint(1, count)).update(title=f"Letting {writes[0]}")
+        writes[0] += 1
+        sleep(0.001)
+    connection.close()
+
+
+def run(mode, threads, seconds):
+    logging.disable(logging.CRITICAL)
+    with TemporaryDirectory() as directory:
+        overrides = {} if mode == "tuned" else {"SQLITE_PRAGMAS": {}}
+        setup_django(database_path=os.path.join(directory, "bench.sqlite3"), **overrides)
+        populate(lettings=200, profiles=0)
+
+        from django.db import connection
+
+        connection.close()
+        stop = Event()
+        samples, errors, writes = [], [], [0]
+        workers = [Thread(target=read_loop, args=(stop, samples, errors)) for _ in range(threads)]
+        workers.append(Thread(target=write_loop, args=(stop, writes)))
+        for worker in workers:
+            worker.start()
+        sleep(seconds)
+        stop.set()
+        for worker in workers:
+            worker.join()
+        report(f"{mode} /lettings/ x{threads} threads", samples)
+        print(
+            f"{'':<40} {len(samples) / seconds:.0f} req/s  errors={len(errors)}  "
+            f"writes={writes[0]}"
+        )
+
+
+def main(threads, seconds):
+    for mode, conn_max_age in (("baseline", "0"), ("tuned", "600")):
+        subprocess.run(
+            [sys.executable, "-m", "benchmarks.sqlite_concurrency", "--mode", mode,
+             str(threads), str(seconds)],
+            env=dict(os.environ, DATABASE_CONN_MAX_AGE=conn_max_age),
+            check=True,
+        )
+
+
+if __name__ == "__main__":
+    arguments = sys.argv[1:]
+    mode = None
+    if arguments[:1] == ["--mode"]:
+        mode, arguments = arguments[1], arguments[2:]
+    threads = int(arguments[0]) if arguments else 8
+    seconds = float(arguments[1]) if len(arguments) > 1 else 5
+    if mode:
+        run(mode, threads, seconds)
+    else:
+        main(threads, seconds)
@@ -0,0 +1,202 @@
+"""
+This module is the gunicorn configuration of the project, read by `gunicorn` from the
+current directory or given with `--config gunicorn.conf.py`.
+
+The workers are sized from the CPUs available to the process, including the quota of
+its container. The default 'gthread' worker class runs WEB_CONCURRENCY processes of
+GUNICORN_THREADS threads each, so a worker keeps serving while a request waits on the
+database. The 'sync' class gets the usual 2 x CPUs + 1 processes. With
+`GUNICORN_WORKER_CLASS=uvicorn.workers.UvicornWorker`, one ASGI worker per CPU serves
+'oc_lettings_site.asgi' and holds its connections on an event loop.
+
+The application is loaded once in the master before the workers are forked
+(`preload_app`), so the imported code is shared copy-on-write instead of being loaded
+by every worker. A worker is replaced after GUNICORN_MAX_REQUESTS requests, plus a
+random jitter so that the workers do not all restart at once, which bounds the growth
+of a leak. The database connections opened while loading the application are closed
+after each fork, as a SQLite connection cannot be shared between processes.
+
+The workers write their metrics to files in PROMETHEUS_MULTIPROC_DIR, which '/metrics'
+aggregates, see 'oc_lettings_site.metrics'. The directory is emptied when the server
+starts, so that the counters start from zero.
+
+With more than one worker, the rendered pages are cached in files shared by the
+workers, under PAGE_CACHE_LOCATION, so that the entries a worker invalidates are
+removed for all of them. The directory is emptied when the server starts too, so that
+no page rendered by the previous code is served. A PAGE_CACHE_BACKEND keeping the pages
+in the memory of each process is refused below in that case. Both directories have
+fixed names, so that a restart reuses them instead of leaving new ones behind. The
+workers also leave the rotation of the log file they share to logrotate, with
+LOG_MAX_BYTES 0, see 'oc_lettings_site.log_handlers'.
+
+Every value can be overridden with the environment variables read below.
+"""
+
+import glob
+import math
+import os
+import tempfile
+from secrets import token_hex
+
+
+def available_cpus():
+    """
+    Return the number of CPUs the process may use.
+
+    The CPU affinity of the process is capped by the CPU quota of its cgroup, as set
+    by `docker run --cpus`, which `os.cpu_count` ignores.
+
+    Returns:
+        int: The number of CPUs, at least 1.
+    """
+    try:
+        cpus = len(os.sched_getaffinity(0))
+    except AttributeError:
+        cpus = os.cpu_count() or 1
+    quota = None
+    try:
+        with open("/sys/fs/cgroup/cpu.max") as file:
+            limit, period = file.read().split()
+        if limit != "max":
+            quota = int(limit) / int(period)
+    except (OSError, ValueError):
+        try:
+            with open("/sys/fs/cgroup/cpu/cpu.cfs_quota_us") as file:
+                limit = int(file.read())
+            with open("/sys/fs/cgroup/cpu/cpu.cfs_period_us") as file:
+                period = int(file.read())
+            if limit > 0:
+                quota = limit / period
+        except (OSError, ValueError):
+            pass
+    if quota is not None:
+        cpus = min(cpus, math.ceil(quota))
+    return max(1, cpus)
+
+
+def default_workers(worker_class, cpus):
+    """
+    Return the default number of worker processes.
+
+    Args:
+        worker_class (str): The gunicorn worker class.
+        cpus (int): The number of available CPUs.
+
+    Returns:
+        int: The number of workers.
+    """
+    if worker_class == "sync":
+        return 2 * cpus + 1
+    if worker_class.startswith("uvicorn."):
+        return cpus
+    return max(2, cpus)
+
+
+def close_connections():
+    """
+    Close the database connections of the current process.
+    """
+    from django.db import connections
+
+    for connection in connections.all():
+        connection.close()
+
+
+def on_starting(server):
+    """
+    Empty the directories of the metrics files and of the shared page cache before the
+    workers are started.
+    """
+    metrics_dir = os.environ["PROMETHEUS_MULTIPROC_DIR"]
+    os.makedirs(metrics_dir, exist_ok=True)
+    for path in glob.glob(os.path.join(metrics_dir, "*.db")):
+        os.remove(path)
+    pages_dir = os.environ.get("PAGE_CACHE_LOCATION")
+    if pages_dir and os.environ.get("PAGE_CACHE_BACKEND", "").endswith("FileBasedCache"):
+        for path in glob.glob(os.path.join(pages_dir, "*.djcache")):
+            os.remove(path)
+
+
+def pre_fork(server, worker):
+    """
+    Close the connections of the master before forking a worker, so that the worker
+    does not inherit an open SQLite file handle.
+    """
+    close_connections()
+
+
+def post_fork(server, worker):
+    """
+    Close the connections inherited from the master, should any have been opened since.
+    """
+    close_connections()
+
+
+def worker_exit(server, worker):
+    """
+    Close the connections of a worker when it exits.
+    """
+    close_connections()
+
+
+def child_exit(server, worker):
+    """
+    Remove the files of the live gauges of an exited worker, whose counters are kept.
+    """
+    from prometheus_client import multiprocess
+
+    multiprocess.mark_process_dead(worker.pid)
+
+
+bind = os.environ.get("GUNICORN_BIND", "127.0.0.1:8000")
+
+worker_class = os.environ.get("GUNICORN_WORKER_CLASS", "gthread")
+if worker_class.startswith("uvicorn."):
+    wsgi_app = "oc_lettings_site.asgi:application"
+else:
+    wsgi_app = "oc_lettings_site.wsgi:application"
+workers = int(
+    os.environ.get("WEB_CONCURRENCY", default_workers(worker_class, available_cpus()))
+)
+threads = int(os.environ.get("GUNICORN_THREADS", 4 if worker_class == "gthread" else 1))
+
+preload_app = os.environ.get("GUNICORN_PRELOAD", "true").lower() == "true"
+
+max_requests = int(os.environ.get("GUNICORN_MAX_REQUESTS", 1000))
+max_requests_jitter = int(os.environ.get("GUNICORN_MAX_REQUESTS_JITTER", max_requests // 10))
+
+timeout = int(os.environ.get("GUNICORN_TIMEOUT", 30))
+graceful_timeout = int(os.environ.get("GUNICORN_GRACEFUL_TIMEOUT", 30))
+keepalive = int(os.environ.get("GUNICORN_KEEPALIVE", 5))
+
+# The heartbeat file of the workers is kept in memory, as writing it to the overlay
+# filesystem of a container can stall the workers
+if os.path.isdir("/dev/shm"):
+    worker_tmp_dir = "/dev/shm"
+shared_dir = "/dev/shm" if os.path.isdir("/dev/shm") else tempfile.gettempdir()
+
+# The metrics must be written to files shared by the workers before the application is
+# loaded, as 'prometheus_client' reads the variable when it is imported
+os.environ.setdefault("PROMETHEUS_MULTIPROC_DIR", os.path.join(shared_dir, "oc-lettings-metrics"))
+
+# A page cache in the memory of each worker would keep serving the pages invalidated
+# by the others until they expire
+if workers > 1:
+    os.environ.setdefault(
+        "PAGE_CACHE_BACKEND", "oc_lettings_site.page_cache.CountingFileBasedCache"
+    )
+    os.environ.setdefault("PAGE_CACHE_LOCATION", os.path.join(shared_dir, "oc-lettings-pages"))
+    if os.environ["PAGE_CACHE_BACKEND"].endswith("LocMemCache"):
+        raise RuntimeError(
+            f"PAGE_CACHE_BACKEND {os.environ['PAGE_CACHE_BACKEND']} is local to each "
+            f"process, use a backend shared by the {workers} workers"
+        )
+
+# The workers would rename the log file they share under each other
+if workers > 1:
+    os.environ.setdefault("LOG_MAX_BYTES", "0")
+
+# Without a configured secret, every worker loading the application would generate its
+# own, and the sessions signed by one worker would be rejected by the others
+if not os.environ.get("DJANGO_SECRET"):
+    os.environ["DJANGO_SECRET"] = token_hex(24)
@@ -1,8 +1,11 @@
 """
 This module defines the admin interface configurations for the Django application.
 
-It imports the models from the models module and registers them with the admin site using
-the admin.site.register function.
+It imports the models from the models module and registers them with the admin site
+using ModelAdmin classes tuned for large tables: the related address is joined to the
+listed lettings, the searches and filters use indexed columns, the address of a letting
+is picked with a raw-id widget instead of a select of every address, and the lists of
+large tables are paginated with an estimated count.
 
 This allows the admin site to have access to the models, enabling it to perform CRUD operations
  on them.
@@ -10,8 +13,64 @@ This allows the admin site to have access to the models, enabling it to perform
 
 from django.contrib import admin
 
+from oc_lettings_site.admin_utils import EstimatedCountPaginator, IndexedSearchMixin
+from oc_lettings_site.export import export_action
 from .models import Letting
 from .models import Address
+from .search import filter_matching
 
-admin.site.register(Letting)
-admin.site.register(Address)
+
+@admin.register(Letting)
+class LettingAdmin(admin.ModelAdmin):
+    """
+    This class defines the admin interface of the 'Letting' model.
+
+    The search uses the full-text index of the lettings, and its actions stream the
+    selected lettings with their address as CSV or JSONL.
+    """
+
+    list_display = ("title", "address", "city", "state")
+    list_select_related = ("address",)
+    list_filter = ("address__state", "address__country_iso_code", "updated_at")
+    search_fields = ("title",)
+    raw_id_fields = ("address",)
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    actions = [export_action("lettings", "csv"), export_action("lettings", "jsonl")]
+
+    def city(self, letting):
+        """
+        Return the city of the address of a letting, for the list display.
+        """
+        return letting.address.city
+
+    city.admin_order_field = "address__city"
+
+    def state(self, letting):
+        """
+        Return the state of the address of a letting, for the list display.
+        """
+        return letting.address.state
+
+    state.admin_order_field = "address__state"
+
+    def get_search_results(self, request, queryset, search_term):
+        return filter_matching(queryset, search_term), False
+
+
+@admin.register(Address)
+class AddressAdmin(IndexedSearchMixin, admin.ModelAdmin):
+    """
+    This class defines the admin interface of the 'Address' model.
+
+    The search matches the city or the state by prefix, and the zip code exactly, or the
+    city or the state anywhere, ignoring the case, when nothing matches so.
+    """
+
+    list_display = ("__str__", "city", "state", "zip_code", "country_iso_code")
+    list_filter = ("state", "country_iso_code")
+    search_fields = ("city", "state")
+    search_prefix_fields = ("city", "state")
+    search_exact_fields = ("zip_code",)
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
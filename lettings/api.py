@@ -0,0 +1,159 @@
+"""
+This module defines the JSON API views of the 'lettings' application.
+
+The views return the lettings with the fields selected by the `fields` parameter, see
+'oc_lettings_site.api', and the list is paginated with the `after` and `before` keyset
+cursors like the lettings index.
+"""
+
+from logging import getLogger
+
+from django.conf import settings
+from django.views.decorators.http import require_safe
+
+from oc_lettings_site.api import (
+    FieldsError,
+    conditional_fields,
+    error_response,
+    json_response,
+    lookups,
+    nest,
+    parse_fields,
+    serialize,
+)
+from oc_lettings_site.database import public_view
+from oc_lettings_site.pagination import MAX_PRIMARY_KEY, MIN_PRIMARY_KEY, KeysetPaginator
+from .models import Letting
+from .views import letting_validators
+
+
+logger = getLogger(__name__)
+
+FIELDS = (
+    "id",
+    "title",
+    "address.number",
+    "address.street",
+    "address.city",
+    "address.state",
+    "address.zip_code",
+    "address.country_iso_code",
+    "address.latitude",
+    "address.longitude",
+)
+
+
+def _page_url(request, cursor_name, cursor):
+    """
+    Return the URL of another page of the list, keeping the other parameters.
+    """
+    params = request.GET.copy()
+    params.pop("after", None)
+    params.pop("before", None)
+    params[cursor_name] = cursor
+    return request.build_absolute_uri(f"{request.path}?{params.urlencode()}")
+
+
+@require_safe
+@public_view
+def letting_list(request):
+    """
+    Return a page of lettings, selected with the `after` and `before` keyset cursors.
+
+    Args:
+        request (HttpRequest): The request object.
+
+    Returns:
+        JsonResponse: The lettings of the page in 'results', and the URLs of the
+         'next' and 'previous' pages, or a 400 response if the fields are unknown.
+    """
+    try:
+        fields = parse_fields(request, FIELDS, always=("id",))
+    except FieldsError as error:
+        return error_response(str(error))
+    logger.info(
+        "Client with IP %s accessed the lettings API", request.META.get("REMOTE_ADDR")
+    )
+    rows = Letting.objects.values(*lookups(fields))
+    page = KeysetPaginator(rows).page_from_request(request)
+    next_url = previous_url = None
+    if page.next_cursor is not None:
+        next_url = _page_url(request, "after", page.next_cursor)
+    if page.previous_cursor is not None:
+        previous_url = _page_url(request, "before", page.previous_cursor)
+    return json_response(
+        {
+            "results": [nest(row) for row in page.object_list],
+            "next": next_url,
+            "previous": previous_url,
+        }
+    )
+
+
+@require_safe
+@public_view
+@conditional_fields(letting_validators, FIELDS)
+def letting_detail(request, letting_id):
+    """
+    Return a letting.
+
+    Args:
+        request (HttpRequest): The request object.
+        letting_id (int): The ID of the letting.
+
+    Returns:
+        JsonResponse: The letting, or a 404 response if it does not exist, or a 400
+         response if the fields are unknown.
+    """
+    fields = request.api_fields
+    rows = serialize(Letting.objects.filter(id=letting_id), fields)
+    if not rows:
+        logger.warning(
+            "Client with IP %s requested a letting that does not exist: %s",
+            request.META.get("REMOTE_ADDR"),
+            letting_id,
+        )
+        return error_response("Letting not found.", status=404)
+    return json_response(rows[0])
+
+
+@require_safe
+@public_view
+def letting_batch(request):
+    """
+    Return the lettings whose ids are given by the comma-separated `ids` parameter.
+
+    The lettings are fetched with a single query and returned in the order of the ids.
+
+    Args:
+        request (HttpRequest): The request object.
+
+    Returns:
+        JsonResponse: The lettings found in 'results' and the ids not found in
+         'missing', or a 400 response if the ids or fields are invalid. An id outside
+         the range of the primary keys is invalid.
+    """
+    try:
+        fields = parse_fields(request, FIELDS, always=("id",))
+        ids = list(
+            dict.fromkeys(
+                int(value) for value in request.GET.get("ids", "").split(",") if value
+            )
+        )
+    except FieldsError as error:
+        return error_response(str(error))
+    except ValueError:
+        return error_response("The ids must be comma-separated integers.")
+    if len(ids) > settings.API_BATCH_MAX_IDS:
+        return error_response(f"At most {settings.API_BATCH_MAX_IDS} ids are allowed.")
+    if not all(MIN_PRIMARY_KEY <= letting_id <= MAX_PRIMARY_KEY for letting_id in ids):
+        return error_response("The ids must be 64-bit integers.")
+    rows = {
+        row["id"]: row for row in serialize(Letting.objects.filter(id__in=ids), fields)
+    }
+    return json_response(
+        {
+            "results": [rows[letting_id] for letting_id in ids if letting_id in rows],
+            "missing": [letting_id for letting_id in ids if letting_id not in rows],
+        }
+    )
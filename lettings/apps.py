@@ -21,3 +21,9 @@ class LettingsConfig(AppConfig):
     """
 
     name = "lettings"
+
+    def ready(self):
+        """
+        Connect the signal receivers of the 'lettings' application.
+        """
+        from . import signals  # noqa: F401
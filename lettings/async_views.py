@@ -0,0 +1,48 @@
+"""
+This module defines the asynchronous versions of the lettings index and detail views.
+
+They are routed instead of the views of 'lettings.views' when the ASYNC_VIEWS setting is
+set, as it is by the ASGI entry point of the project. The ORM, the template engine and
+the page cache are synchronous, so the validators and the page are built in the thread
+of the request with 'sync_to_async', while the event loop keeps serving the other
+connections.
+"""
+
+from asgiref.sync import sync_to_async
+from oc_lettings_site.conditional import conditional
+from oc_lettings_site.database import public_view
+from .views import index_response, index_validators, letting_response, letting_validators
+
+
+@public_view
+@conditional(index_validators)
+async def index(request):
+    """
+    Display a page of lettings, or stream all of them, as 'lettings.views.index'.
+
+    Args:
+        request (HttpRequest): The request object.
+
+    Returns:
+        HttpResponse: The response object.
+    """
+    return await sync_to_async(index_response)(request)
+
+
+@public_view
+@conditional(letting_validators)
+async def letting(request, letting_id):
+    """
+    Display a specific letting, as 'lettings.views.letting'.
+
+    Args:
+        request (HttpRequest): The request object.
+        letting_id (int): The ID of the letting to display.
+
+    Returns:
+        HttpResponse: The response object.
+
+    Raises:
+        Http404: If no Letting exists with the given ID.
+    """
+    return await sync_to_async(letting_response)(request, letting_id)
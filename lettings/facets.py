@@ -0,0 +1,178 @@
+"""
+This module implements the faceted filtering of the lettings index.
+
+The index can be filtered on the address of the lettings with the `state`, `city`,
+`zip_code` and `country` GET parameters, each backed by an index of the 'Address' table.
+The number of lettings per state and per country is stored in the 'FacetCount' table and
+adjusted by the signal receivers of the application whenever a letting or its address
+changes, so displaying the facets costs a single indexed read.
+"""
+
+from django.apps import apps as global_apps
+from django.db import transaction
+from django.db.models import Count, F
+
+from .models import Address, FacetCount, Letting
+
+
+# The counted facets and the 'Address' field they count
+FACETS = {FacetCount.STATE: "state", FacetCount.COUNTRY: "country_iso_code"}
+
+# The GET parameters of the index and the lookups they filter the lettings on
+FILTERS = {
+    "state": "address__state",
+    "city": "address__city",
+    "zip_code": "address__zip_code",
+    "country": "address__country_iso_code",
+}
+
+# The digits of the largest zip code, see 'Address.zip_code'
+ZIP_CODE_DIGITS = 5
+
+
+def filter_lettings(queryset, params):
+    """
+    Filter the lettings with the facet GET parameters.
+
+    A zip code which is not a number of at most ZIP_CODE_DIGITS digits is ignored.
+
+    Args:
+        queryset (QuerySet): The lettings to filter.
+        params (QueryDict): The GET parameters of the request.
+
+    Returns:
+        tuple: The filtered queryset and a dict of the applied filters.
+    """
+    filters = {}
+    for name, lookup in FILTERS.items():
+        value = params.get(name, "").strip()
+        if not value:
+            continue
+        if name == "zip_code":
+            # Superscripts pass 'isdigit' but not 'int', and huge numbers overflow the query
+            if not value.isdecimal() or len(value) > ZIP_CODE_DIGITS:
+                continue
+            value = int(value)
+        filters[name] = value
+        queryset = queryset.filter(**{lookup: value})
+    return queryset, filters
+
+
+def address_facets(address):
+    """
+    Return the facet values of an address.
+
+    Args:
+        address (Address): The address.
+
+    Returns:
+        dict: The value of each facet.
+    """
+    return {facet: getattr(address, field) for facet, field in FACETS.items()}
+
+
+def stored_address_facets(address_id, using="default"):
+    """
+    Return the facet values of an address as stored in the database.
+
+    Args:
+        address_id (int): The id of the address.
+        using (str): The alias of the database.
+
+    Returns:
+        dict: The value of each facet, or None if the address does not exist.
+    """
+    values = Address.objects.using(using).filter(pk=address_id)
+    row = values.values_list(*FACETS.values()).first()
+    return None if row is None else dict(zip(FACETS, row))
+
+
+def stored_letting_facets(letting_id, using="default"):
+    """
+    Return the facet values of the address of a letting as stored in the database.
+
+    Args:
+        letting_id (int): The id of the letting.
+        using (str): The alias of the database.
+
+    Returns:
+        dict: The value of each facet, or None if the letting does not exist.
+    """
+    lookups = [f"address__{field}" for field in FACETS.values()]
+    values = Letting.objects.using(using).filter(pk=letting_id).values_list(*lookups)
+    row = values.first()
+    return None if row is None else dict(zip(FACETS, row))
+
+
+def adjust_counts(before, after, using="default"):
+    """
+    Move a letting from the facet values `before` to the facet values `after`.
+
+    Args:
+        before (dict): The previous facet values, or None for a new letting.
+        after (dict): The new facet values, or None for a deleted letting.
+        using (str): The alias of the database.
+
+    Returns:
+        None
+    """
+    counts = FacetCount.objects.using(using)
+    with transaction.atomic(using=using):
+        for facet in FACETS:
+            old = before[facet] if before else None
+            new = after[facet] if after else None
+            if old == new:
+                continue
+            if old is not None:
+                counts.filter(facet=facet, value=old).update(count=F("count") - 1)
+            if new is not None:
+                counts.get_or_create(facet=facet, value=new)
+                counts.filter(facet=facet, value=new).update(count=F("count") + 1)
+
+
+def rebuild_counts(using="default", apps=global_apps):
+    """
+    Recompute every facet count from the lettings and their addresses.
+
+    Args:
+        using (str): The alias of the database.
+        apps (Apps): The app registry, the historical one in a migration.
+
+    Returns:
+        int: The number of facet values stored.
+    """
+    Letting = apps.get_model("lettings", "Letting")
+    FacetCount = apps.get_model("lettings", "FacetCount")
+    counts = []
+    for facet, field in FACETS.items():
+        rows = (
+            Letting.objects.using(using)
+            .values_list(f"address__{field}")
+            .annotate(count=Count("pk"))
+            .order_by()
+        )
+        counts += [
+            FacetCount(facet=facet, value=value, count=count) for value, count in rows
+        ]
+    with transaction.atomic(using=using):
+        FacetCount.objects.using(using).all().delete()
+        FacetCount.objects.using(using).bulk_create(counts)
+    return len(counts)
+
+
+def facet_counts():
+    """
+    Return the non-empty values of each facet with their number of lettings.
+
+    Returns:
+        dict: The (value, count) pairs of each facet, ordered by value.
+    """
+    facets = {facet: [] for facet in FACETS}
+    rows = (
+        FacetCount.objects.filter(count__gt=0)
+        .order_by("facet", "value")
+        .values_list("facet", "value", "count")
+    )
+    for facet, value, count in rows:
+        facets[facet].append((value, count))
+    return facets
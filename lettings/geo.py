@@ -0,0 +1,240 @@
+"""
+This module implements the proximity search over the located lettings.
+
+On SQLite, the coordinates of the located addresses are kept in the
+'lettings_address_rtree' R*Tree virtual table, whose id is the address id. The index is
+updated by the signal receivers of the application when an address changes, and can be
+rebuilt from scratch with `manage.py geocode_addresses --rebuild-only`.
+
+The nearest lettings are found by reading the index in a bounding box around the given
+point and computing the great-circle distance of the few candidates it returns. The box
+grows until it holds enough lettings within its inscribed circle, so the result is exact
+while only the rows close to the point are read. It stops growing at MAX_RADIUS_KM, so
+that a point far from every letting does not read the whole table: fewer lettings, or
+none, are then returned. Boxes crossing the antimeridian are
+not split, so lettings on the other side of it are not found.
+
+On other databases, the bounding box is read with range filters on the
+'address_location_idx' index instead.
+"""
+
+from math import asin, cos, radians, sin, sqrt
+
+from django.db import connections, router
+
+from .models import Address, Letting
+
+
+RTREE_TABLE = "lettings_address_rtree"
+EARTH_RADIUS_KM = 6371.0
+KM_PER_DEGREE = 111.195
+# The radius of the first bounding box, and the distance beyond which it stops growing,
+# after four expansions
+INITIAL_RADIUS_KM = 5.0
+MAX_RADIUS_KM = 1280.0
+
+CREATE_INDEX_SQL = (
+    f"CREATE VIRTUAL TABLE IF NOT EXISTS {RTREE_TABLE} "
+    "USING rtree(id, min_latitude, max_latitude, min_longitude, max_longitude)"
+)
+DROP_INDEX_SQL = f"DROP TABLE IF EXISTS {RTREE_TABLE}"
+INSERT_SQL = (
+    f"INSERT OR REPLACE INTO {RTREE_TABLE} "
+    "SELECT id, latitude, latitude, longitude, longitude FROM lettings_address "
+    "WHERE latitude IS NOT NULL AND longitude IS NOT NULL"
+)
+SELECT_CANDIDATES_SQL = (
+    "SELECT l.id, l.title, a.latitude, a.longitude "
+    f"FROM {RTREE_TABLE} r "
+    "INNER JOIN lettings_address a ON a.id = r.id "
+    "INNER JOIN lettings_letting l ON l.address_id = a.id "
+    "WHERE r.max_latitude >= %s AND r.min_latitude <= %s "
+    "AND r.max_longitude >= %s AND r.min_longitude <= %s"
+)
+
+
+def uses_index(connection):
+    """
+    Return whether the given connection supports the R*Tree spatial index.
+    """
+    return connection.vendor == "sqlite"
+
+
+def distance_km(latitude1, longitude1, latitude2, longitude2):
+    """
+    Return the great-circle distance between two points, with the haversine formula.
+
+    Args:
+        latitude1 (float): The latitude of the first point, in degrees.
+        longitude1 (float): The longitude of the first point, in degrees.
+        latitude2 (float): The latitude of the second point, in degrees.
+        longitude2 (float): The longitude of the second point, in degrees.
+
+    Returns:
+        float: The distance in kilometers.
+    """
+    phi1, phi2 = radians(latitude1), radians(latitude2)
+    half_dphi = (phi2 - phi1) / 2
+    half_dlambda = radians(longitude2 - longitude1) / 2
+    h = sin(half_dphi) ** 2 + cos(phi1) * cos(phi2) * sin(half_dlambda) ** 2
+    return 2 * EARTH_RADIUS_KM * asin(min(1.0, sqrt(h)))
+
+
+def bounding_box(latitude, longitude, radius_km):
+    """
+    Return the box of coordinates containing the circle around a point.
+
+    Args:
+        latitude (float): The latitude of the center, in degrees.
+        longitude (float): The longitude of the center, in degrees.
+        radius_km (float): The radius of the circle, in kilometers.
+
+    Returns:
+        tuple: The minimum and maximum latitudes, then longitudes.
+    """
+    delta_latitude = radius_km / KM_PER_DEGREE
+    min_latitude = max(-90.0, latitude - delta_latitude)
+    max_latitude = min(90.0, latitude + delta_latitude)
+    # Meridians get closer towards the poles, so the box widens with the latitude
+    widest = max(abs(min_latitude), abs(max_latitude))
+    if widest >= 89.9:
+        return min_latitude, max_latitude, -180.0, 180.0
+    delta_longitude = delta_latitude / cos(radians(widest))
+    return (
+        min_latitude,
+        max_latitude,
+        max(-180.0, longitude - delta_longitude),
+        min(180.0, longitude + delta_longitude),
+    )
+
+
+def rebuild_index(using="default"):
+    """
+    Create the spatial index if needed and fill it with every located address.
+
+    Args:
+        using (str): The alias of the database.
+
+    Returns:
+        int: The number of addresses indexed.
+    """
+    connection = connections[using]
+    if not uses_index(connection):
+        return 0
+    with connection.cursor() as cursor:
+        cursor.execute(CREATE_INDEX_SQL)
+        cursor.execute(f"DELETE FROM {RTREE_TABLE}")
+        cursor.execute(INSERT_SQL)
+        cursor.execute(f"SELECT count(*) FROM {RTREE_TABLE}")
+        return cursor.fetchone()[0]
+
+
+def index_address(address, using="default"):
+    """
+    Update the entry of an address in the spatial index.
+
+    Args:
+        address (Address): The saved address.
+        using (str): The alias of the database.
+
+    Returns:
+        None
+    """
+    connection = connections[using]
+    if not uses_index(connection):
+        return
+    with connection.cursor() as cursor:
+        if address.latitude is None or address.longitude is None:
+            cursor.execute(f"DELETE FROM {RTREE_TABLE} WHERE id = %s", [address.pk])
+        else:
+            cursor.execute(
+                f"INSERT OR REPLACE INTO {RTREE_TABLE} VALUES (%s, %s, %s, %s, %s)",
+                [
+                    address.pk,
+                    address.latitude,
+                    address.latitude,
+                    address.longitude,
+                    address.longitude,
+                ],
+            )
+
+
+def remove_address(address_id, using="default"):
+    """
+    Remove an address from the spatial index.
+
+    Args:
+        address_id (int): The id of the removed address.
+        using (str): The alias of the database.
+
+    Returns:
+        None
+    """
+    connection = connections[using]
+    if not uses_index(connection):
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(f"DELETE FROM {RTREE_TABLE} WHERE id = %s", [address_id])
+
+
+def nearest(latitude, longitude, count=10):
+    """
+    Return the lettings closest to a point, nearest first.
+
+    Args:
+        latitude (float): The latitude of the point, in degrees.
+        longitude (float): The longitude of the point, in degrees.
+        count (int): The maximum number of lettings.
+
+    Returns:
+        list: The lettings within MAX_RADIUS_KM, with their 'id' and 'title' loaded and
+         their 'distance' from the point in kilometers.
+    """
+    using = router.db_for_read(Letting) or "default"
+    radius = INITIAL_RADIUS_KM
+    while True:
+        box = bounding_box(latitude, longitude, radius)
+        found = []
+        for letting_id, title, candidate_latitude, candidate_longitude in _candidates(
+            box, using
+        ):
+            distance = distance_km(
+                latitude, longitude, candidate_latitude, candidate_longitude
+            )
+            if distance <= radius:
+                found.append((distance, letting_id, title))
+        # Lettings outside the circle may be closer than those in the corners of the box
+        if len(found) >= count or radius >= MAX_RADIUS_KM:
+            break
+        radius = min(radius * 4, MAX_RADIUS_KM)
+
+    found.sort()
+    lettings = []
+    for distance, letting_id, title in found[:count]:
+        letting = Letting(id=letting_id, title=title)
+        letting.distance = distance
+        lettings.append(letting)
+    return lettings
+
+
+def _candidates(box, using):
+    """
+    Return the located lettings within a bounding box, with their coordinates.
+    """
+    min_latitude, max_latitude, min_longitude, max_longitude = box
+    connection = connections[using]
+    if not uses_index(connection):
+        addresses = Address.objects.using(using).filter(
+            latitude__range=(min_latitude, max_latitude),
+            longitude__range=(min_longitude, max_longitude),
+            letting__isnull=False,
+        )
+        return addresses.values_list(
+            "letting__id", "letting__title", "latitude", "longitude"
+        )
+    with connection.cursor() as cursor:
+        cursor.execute(
+            SELECT_CANDIDATES_SQL,
+            [min_latitude, max_latitude, min_longitude, max_longitude],
+        )
+        return cursor.fetchall()
@@ -0,0 +1,441 @@
+"""
+This module implements the bulk import of lettings with their addresses.
+
+The rows of a CSV or JSONL file are streamed in batches, so the memory used does not
+depend on the size of the file. Each batch is validated one column at a time against the
+validators of the model fields, e.g. the MaxValueValidator of 'zip_code' or the
+MinLengthValidator of 'state', which runs each validator over a whole column instead of
+calling `full_clean` on one instance per row. The valid rows of a batch are inserted
+with one `executemany` per table in a single transaction, and the invalid ones are
+written to a reject file with their errors.
+
+The inserts skip the model signals, so the search index, the facet counts and the
+spatial index must be rebuilt once the import is done, see 'rebuild_derived_indexes'.
+For an initial load, the indexes of the 'Address' table can also be dropped during the
+import and recreated at the end, which sorts each index once instead of updating it for
+every row.
+"""
+
+import csv
+import json
+import math
+import os
+from contextlib import contextmanager, nullcontext
+from itertools import compress, islice, repeat
+
+from django.core.exceptions import ValidationError
+from django.core.management.color import no_style
+from django.core.validators import BaseValidator, MinValueValidator
+from django.db import connections, transaction
+from django.db.models import Max
+from django.utils import timezone
+
+from . import facets, geo, search
+from .models import Address, Letting
+
+
+ADDRESS_FIELDS = (
+    "number",
+    "street",
+    "city",
+    "state",
+    "zip_code",
+    "country_iso_code",
+    "latitude",
+    "longitude",
+)
+COLUMNS = ("title",) + ADDRESS_FIELDS
+FORMATS = {".csv": "csv", ".jsonl": "jsonl", ".ndjson": "jsonl"}
+
+
+def finite_float(value):
+    """
+    Convert a value to a float, refusing 'nan' and 'inf', which the column cannot store.
+
+    Raises:
+        ValueError: If the value is not a finite number.
+    """
+    number = float(value)
+    if not math.isfinite(number):
+        raise ValueError(f"{value!r} is not a finite number")
+    return number
+
+
+_CONVERTERS = {
+    "CharField": str,
+    "PositiveIntegerField": int,
+    "IntegerField": int,
+    "FloatField": finite_float,
+}
+
+
+def file_format(path):
+    """
+    Return the format of a file from its extension.
+
+    Args:
+        path (str): The path of the file.
+
+    Returns:
+        str: 'csv' or 'jsonl'.
+
+    Raises:
+        ValueError: If the extension is not supported.
+    """
+    extension = os.path.splitext(path)[1].lower()
+    if extension not in FORMATS:
+        raise ValueError(f"Unsupported file extension '{extension}'.")
+    return FORMATS[extension]
+
+
+def read_rows(file, format):
+    """
+    Stream the rows of a CSV or JSONL file as flat dicts.
+
+    The address of a JSONL row can be nested in an 'address' object. A JSONL line which
+    is not a JSON object is returned as a row with an '_error'.
+
+    Args:
+        file (file): The file, opened in text mode.
+        format (str): 'csv' or 'jsonl'.
+
+    Yields:
+        dict: The raw values of a row, keyed by column name.
+    """
+    if format == "csv":
+        yield from csv.DictReader(file)
+        return
+    for line in file:
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+            if not isinstance(row, dict):
+                raise ValueError("not an object")
+        except ValueError as error:
+            yield {"_raw": line.rstrip("\n"), "_error": f"Invalid JSON: {error}"}
+            continue
+        address = row.pop("address", None)
+        if isinstance(address, dict):
+            row.update(address)
+        yield row
+
+
+def column_validator(field):
+    """
+    Return a function validating a column of raw values for a model field.
+
+    The values are first converted to the type of the field, then each validator of the
+    field runs over the whole column. The limit of the BaseValidator subclasses (the
+    min/max value and length validators) is compared directly, without raising and
+    catching a ValidationError per value. A positive integer field is also validated
+    against 0, as the SQLite backend gives it no MinValueValidator, and the row would
+    otherwise fail the CHECK constraint of the column and abort the import.
+
+    Args:
+        field (Field): The model field.
+
+    Returns:
+        callable: A function taking the list of raw values and returning the list of
+         cleaned values and a dict of error messages by index.
+    """
+    convert = _CONVERTERS[field.get_internal_type()]
+    fast_convert = str.strip if convert is str else convert
+    name = field.name
+    field_validators = list(field.validators)
+    if field.get_internal_type().startswith("Positive") and not any(
+        isinstance(validator, MinValueValidator) for validator in field_validators
+    ):
+        field_validators.append(MinValueValidator(0))
+
+    def convert_column(values):
+        cleaned = []
+        errors = {}
+        # A column without blank or malformed values is converted with a single map
+        if None not in values and "" not in values:
+            try:
+                cleaned = list(map(fast_convert, values))
+            except (TypeError, ValueError):
+                pass
+            else:
+                if "" not in cleaned:
+                    return cleaned, errors
+                cleaned = []
+        for index, value in enumerate(values):
+            if isinstance(value, str):
+                value = value.strip()
+            if value is None or value == "":
+                if not field.blank:
+                    errors[index] = f"{name}: This field cannot be blank."
+                cleaned.append(None)
+                continue
+            try:
+                cleaned.append(convert(value))
+            except (TypeError, ValueError):
+                errors[index] = f"{name}: Invalid value {value!r}."
+                cleaned.append(None)
+        return cleaned, errors
+
+    def validate(values):
+        cleaned, errors = convert_column(values)
+        complete = None not in cleaned
+        for validator in field_validators:
+            if isinstance(validator, BaseValidator):
+                limit, clean, compare = validator.limit_value, validator.clean, validator.compare
+                if complete:
+                    flags = map(compare, map(clean, cleaned), repeat(limit))
+                    failed = list(compress(range(len(cleaned)), flags))
+                else:
+                    failed = [
+                        index
+                        for index, value in enumerate(cleaned)
+                        if value is not None and compare(clean(value), limit)
+                    ]
+                for index in failed:
+                    params = {"limit_value": limit, "show_value": clean(cleaned[index])}
+                    errors.setdefault(index, f"{name}: {validator.message % params}")
+                continue
+            for index, value in enumerate(cleaned):
+                if value is None or index in errors:
+                    continue
+                try:
+                    validator(value)
+                except ValidationError as error:
+                    errors[index] = f"{name}: {' '.join(error.messages)}"
+        return cleaned, errors
+
+    return validate
+
+
+def validate_batch(rows, validators):
+    """
+    Validate a batch of raw rows column by column.
+
+    Args:
+        rows (list): The raw rows.
+        validators (dict): The column validators, keyed by column name.
+
+    Returns:
+        tuple: The list of cleaned rows of the valid rows, and the list of
+         (raw row, errors) pairs of the invalid ones.
+    """
+    columns = {}
+    errors = {}
+    for index, row in enumerate(rows):
+        if "_error" in row:
+            errors[index] = [row["_error"]]
+    for name, validate in validators.items():
+        cleaned, column_errors = validate([row.get(name) for row in rows])
+        columns[name] = cleaned
+        for index, message in column_errors.items():
+            errors.setdefault(index, []).append(message)
+    valid = [
+        {name: columns[name][index] for name in COLUMNS}
+        for index in range(len(rows))
+        if index not in errors
+    ]
+    rejected = [(rows[index], messages) for index, messages in sorted(errors.items())]
+    return valid, rejected
+
+
+def insert_rows(model, columns, rows, using="default"):
+    """
+    Insert rows of already validated values in the table of a model.
+
+    The rows are sent with a single `executemany` of a parameterised INSERT, which avoids
+    building a model instance and preparing each value of each row as `bulk_create` does.
+
+    Args:
+        model (type): The model.
+        columns (tuple): The names of the fields, in the order of the values.
+        rows (iterable): The tuples of values, in the database format.
+        using (str): The alias of the database.
+
+    Returns:
+        None
+    """
+    connection = connections[using]
+    quote = connection.ops.quote_name
+    names = ", ".join(quote(model._meta.get_field(name).column) for name in columns)
+    placeholders = ", ".join(["%s"] * len(columns))
+    with connection.cursor() as cursor:
+        cursor.executemany(
+            f"INSERT INTO {quote(model._meta.db_table)} ({names}) VALUES ({placeholders})",
+            rows,
+        )
+
+
+def insert_batch(rows, using="default"):
+    """
+    Insert a batch of valid rows as addresses and lettings, in a single transaction.
+
+    The addresses are given consecutive ids following the greatest existing one, so
+    the lettings can point to them without reading the ids back.
+
+    Args:
+        rows (list): The cleaned rows.
+        using (str): The alias of the database.
+
+    Returns:
+        None
+    """
+    connection = connections[using]
+    now = connection.ops.adapt_datetimefield_value(timezone.now())
+    with transaction.atomic(using=using):
+        first_id = (
+            Address.objects.using(using).aggregate(last_id=Max("id"))["last_id"] or 0
+        ) + 1
+        insert_rows(
+            Address,
+            ("id",) + ADDRESS_FIELDS + ("updated_at",),
+            (
+                (first_id + index,) + tuple(row[name] for name in ADDRESS_FIELDS) + (now,)
+                for index, row in enumerate(rows)
+            ),
+            using,
+        )
+        insert_rows(
+            Letting,
+            ("title", "address", "updated_at"),
+            ((row["title"], first_id + index, now) for index, row in enumerate(rows)),
+            using,
+        )
+
+
+@contextmanager
+def deferred_indexes(model, using="default"):
+    """
+    Drop the Meta indexes of a model for the duration of the block, then recreate them.
+
+    Args:
+        model (type): The model.
+        using (str): The alias of the database.
+
+    Yields:
+        None
+    """
+    connection = connections[using]
+    # The statements are run directly, as the SQLite schema editor refuses to run
+    # inside a transaction
+    editor = connection.schema_editor()
+    with connection.cursor() as cursor:
+        for index in model._meta.indexes:
+            cursor.execute(str(index.remove_sql(model, editor)))
+    try:
+        yield
+    finally:
+        with connection.cursor() as cursor:
+            for index in model._meta.indexes:
+                cursor.execute(str(index.create_sql(model, editor)))
+
+
+class RejectWriter:
+    """
+    This class writes the rejected rows to a CSV or JSONL file, created on first use.
+
+    Attributes:
+        path (str): The path of the reject file.
+        format (str): 'csv' or 'jsonl'.
+        count (int): The number of rows written.
+    """
+
+    def __init__(self, path, format):
+        self.path = path
+        self.format = format
+        self.count = 0
+        self._file = None
+        self._writer = None
+
+    def write(self, row, errors):
+        """
+        Write a rejected row with its errors, in an 'errors' column or key.
+        """
+        if self._file is None:
+            self._file = open(self.path, "w", newline="", encoding="utf-8")
+            if self.format == "csv":
+                self._writer = csv.writer(self._file)
+                self._writer.writerow(COLUMNS + ("errors",))
+        if self.format == "csv":
+            self._writer.writerow(
+                [row.get(name, "") for name in COLUMNS] + ["; ".join(errors)]
+            )
+        else:
+            self._file.write(json.dumps(dict(row, errors=errors)) + "\n")
+        self.count += 1
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+
+
+def import_lettings(
+    path,
+    rejects_path,
+    batch_size=5000,
+    using="default",
+    progress=None,
+    defer_indexes=False,
+):
+    """
+    Import the lettings of a CSV or JSONL file, see the module docstring.
+
+    Args:
+        path (str): The path of the file to import.
+        rejects_path (str): The path of the file receiving the invalid rows.
+        batch_size (int): The number of rows validated and inserted at once.
+        using (str): The alias of the database.
+        progress (callable, optional): Called after each batch with the number of
+         rows imported and rejected so far.
+        defer_indexes (bool): Drop the indexes of the addresses during the import. The
+         filters of the lettings index scan the table until they are recreated.
+
+    Returns:
+        tuple: The number of rows imported and rejected.
+    """
+    format = file_format(path)
+    validators = {
+        name: column_validator(model._meta.get_field(name))
+        for model, names in ((Letting, ("title",)), (Address, ADDRESS_FIELDS))
+        for name in names
+    }
+    imported = 0
+    rejects = RejectWriter(rejects_path, format)
+    indexes = deferred_indexes(Address, using) if defer_indexes else nullcontext()
+    try:
+        with indexes, open(path, newline="", encoding="utf-8") as file:
+            rows = read_rows(file, format)
+            while True:
+                batch = list(islice(rows, batch_size))
+                if not batch:
+                    break
+                valid, rejected = validate_batch(batch, validators)
+                if valid:
+                    insert_batch(valid, using)
+                imported += len(valid)
+                for row, errors in rejected:
+                    rejects.write(row, errors)
+                if progress is not None:
+                    progress(imported, rejects.count)
+    finally:
+        rejects.close()
+
+    connection = connections[using]
+    with connection.cursor() as cursor:
+        for sql in connection.ops.sequence_reset_sql(no_style(), [Address]):
+            cursor.execute(sql)
+    return imported, rejects.count
+
+
+def rebuild_derived_indexes(using="default"):
+    """
+    Rebuild the search index, the facet counts and the spatial index after an import.
+
+    Args:
+        using (str): The alias of the database.
+
+    Returns:
+        None
+    """
+    search.rebuild_index(using)
+    facets.rebuild_counts(using)
+    geo.rebuild_index(using)
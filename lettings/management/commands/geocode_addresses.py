@@ -0,0 +1,128 @@
+"""
+This module defines the 'geocode_addresses' management command.
+
+It sets the latitude and longitude of the addresses to the centroid of their zip code,
+read from a local CSV or tab-separated file such as the US Census Gazetteer ZCTA file,
+so no geocoding service is called. The spatial index of the proximity search is rebuilt
+at the end.
+
+The located addresses get a new 'updated_at', which changes the version of their
+cached letting pages, see 'oc_lettings_site.page_cache'. The running server thus
+renders them again with their link to the nearby lettings, without being restarted.
+"""
+
+import csv
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, transaction
+from django.utils import timezone
+
+from lettings.geo import rebuild_index
+from lettings.models import Address
+
+
+ZIP_COLUMNS = ("zip", "zip_code", "zipcode", "geoid", "zcta5")
+LATITUDE_COLUMNS = ("lat", "latitude", "intptlat")
+LONGITUDE_COLUMNS = ("lon", "lng", "longitude", "intptlong")
+
+
+def read_centroids(path):
+    """
+    Read the zip code centroids of a CSV or tab-separated file.
+
+    Args:
+        path (str): The path of the file, with a header row.
+
+    Returns:
+        dict: The (latitude, longitude) of each zip code.
+
+    Raises:
+        CommandError: If the zip code, latitude or longitude column is missing.
+    """
+    with open(path, newline="", encoding="utf-8") as file:
+        dialect = csv.Sniffer().sniff(file.read(4096), delimiters=",\t;|")
+        file.seek(0)
+        reader = csv.reader(file, dialect)
+        header = [name.strip().lower() for name in next(reader, [])]
+        indexes = []
+        for candidates in (ZIP_COLUMNS, LATITUDE_COLUMNS, LONGITUDE_COLUMNS):
+            matches = [header.index(name) for name in candidates if name in header]
+            if not matches:
+                raise CommandError(f"{path} has none of the columns {candidates}.")
+            indexes.append(matches[0])
+        zip_index, latitude_index, longitude_index = indexes
+        centroids = {}
+        for row in reader:
+            try:
+                centroids[int(row[zip_index])] = (
+                    float(row[latitude_index]),
+                    float(row[longitude_index]),
+                )
+            except (IndexError, ValueError):
+                continue
+    return centroids
+
+
+class Command(BaseCommand):
+    help = "Locate the addresses at the centroid of their zip code, from a local file."
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", nargs="?", help="The zip code centroids file.")
+        parser.add_argument(
+            "--overwrite",
+            action="store_true",
+            help="Also locate the addresses which already have coordinates.",
+        )
+        parser.add_argument("--batch-size", type=int, default=1000)
+        parser.add_argument(
+            "--rebuild-only",
+            action="store_true",
+            help="Only rebuild the spatial index from the stored coordinates.",
+        )
+        parser.add_argument("--database", default=DEFAULT_DB_ALIAS)
+
+    def handle(self, *args, path, overwrite, batch_size, rebuild_only, database, **options):
+        if not rebuild_only:
+            if path is None:
+                raise CommandError("The path of the centroids file is required.")
+            self.locate(read_centroids(path), overwrite, batch_size, database)
+        self.stdout.write(f"Indexed {rebuild_index(database)} located addresses")
+
+    def locate(self, centroids, overwrite, batch_size, database):
+        addresses = Address.objects.using(database).order_by("pk")
+        if not overwrite:
+            addresses = addresses.filter(latitude__isnull=True)
+        now = timezone.now()
+        located = missing = 0
+        batch = []
+        for address_id, zip_code in addresses.values_list("pk", "zip_code").iterator(
+            chunk_size=batch_size
+        ):
+            if zip_code not in centroids:
+                missing += 1
+                continue
+            latitude, longitude = centroids[zip_code]
+            # bulk_update skips the signals, the new timestamp outdates the cached pages
+            batch.append(
+                Address(
+                    pk=address_id,
+                    latitude=latitude,
+                    longitude=longitude,
+                    updated_at=now,
+                )
+            )
+            if len(batch) >= batch_size:
+                located += self.save(batch, database)
+                batch = []
+        if batch:
+            located += self.save(batch, database)
+        self.stdout.write(
+            f"Located {located} addresses, {missing} zip codes not found in the file"
+        )
+
+    def save(self, batch, database):
+        with transaction.atomic(using=database):
+            Address.objects.using(database).bulk_update(
+                batch, ["latitude", "longitude", "updated_at"]
+            )
+        return len(batch)
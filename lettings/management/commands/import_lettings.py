@@ -0,0 +1,81 @@
+"""
+This module defines the 'import_lettings' management command.
+
+It imports the lettings and their addresses of a CSV or JSONL file at high throughput,
+writing the invalid rows to a reject file, see 'lettings.importing'. The search index,
+the facet counts and the spatial index are then rebuilt.
+"""
+
+import os
+from time import monotonic
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS
+
+from lettings.importing import (
+    COLUMNS,
+    file_format,
+    import_lettings,
+    rebuild_derived_indexes,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Import lettings from a CSV or JSONL file with the columns "
+        f"{', '.join(COLUMNS)}."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", help="The .csv, .jsonl or .ndjson file to import.")
+        parser.add_argument(
+            "--rejects",
+            help="The file receiving the invalid rows, next to the input by default.",
+        )
+        parser.add_argument("--batch-size", type=int, default=5000)
+        parser.add_argument(
+            "--defer-indexes",
+            action="store_true",
+            help="Drop the address indexes during the import, for initial loads.",
+        )
+        parser.add_argument("--database", default=DEFAULT_DB_ALIAS)
+
+    def handle(self, *args, path, rejects, batch_size, database, verbosity, **options):
+        try:
+            format = file_format(path)
+        except ValueError as error:
+            raise CommandError(error)
+        if not os.path.exists(path):
+            raise CommandError(f"{path} does not exist.")
+        if rejects is None:
+            rejects = f"{os.path.splitext(path)[0]}.rejects.{format}"
+        start = monotonic()
+
+        def progress(imported, rejected):
+            if verbosity > 1:
+                elapsed = monotonic() - start
+                self.stdout.write(
+                    f"{imported} imported, {rejected} rejected "
+                    f"({(imported + rejected) / elapsed if elapsed else 0:.0f} rows/s)"
+                )
+
+        imported, rejected = import_lettings(
+            path,
+            rejects,
+            batch_size=batch_size,
+            using=database,
+            progress=progress,
+            defer_indexes=options["defer_indexes"],
+        )
+        self.stdout.write(
+            f"Imported {imported} lettings in {monotonic() - start:.1f} s, "
+            f"rejected {rejected} rows"
+            + (f" (see {rejects})" if rejected else "")
+        )
+        if imported:
+            start = monotonic()
+            rebuild_derived_indexes(database)
+            self.stdout.write(
+                "Rebuilt the search index, facet counts and spatial index "
+                f"in {monotonic() - start:.1f} s"
+            )
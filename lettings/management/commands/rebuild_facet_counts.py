@@ -0,0 +1,21 @@
+"""
+This module defines the 'rebuild_facet_counts' management command.
+
+It recomputes the number of lettings per state and per country shown by the lettings
+index, e.g. after rows were imported without going through the model signals.
+"""
+
+from django.core.management.base import BaseCommand
+from django.db import DEFAULT_DB_ALIAS
+
+from lettings.facets import rebuild_counts
+
+
+class Command(BaseCommand):
+    help = "Recompute the facet counts of the lettings index."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--database", default=DEFAULT_DB_ALIAS)
+
+    def handle(self, *args, database, **options):
+        self.stdout.write(f"Stored {rebuild_counts(database)} facet values")
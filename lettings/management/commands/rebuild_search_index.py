@@ -0,0 +1,27 @@
+"""
+This module defines the 'rebuild_search_index' management command.
+
+It recreates the full-text search index of the lettings from the lettings and addresses
+tables, e.g. after rows were imported without going through the model signals.
+"""
+
+from time import monotonic
+
+from django.core.management.base import BaseCommand
+from django.db import DEFAULT_DB_ALIAS
+
+from lettings.search import rebuild_index
+
+
+class Command(BaseCommand):
+    help = "Rebuild the full-text search index of the lettings."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--database", default=DEFAULT_DB_ALIAS)
+
+    def handle(self, *args, database, **options):
+        start = monotonic()
+        indexed = rebuild_index(database)
+        self.stdout.write(
+            f"Indexed {indexed} lettings in {(monotonic() - start) * 1000:.0f} ms"
+        )
@@ -39,6 +39,7 @@ def copy_data(apps: Apps, schema_editor: Any):
 class Migration(migrations.Migration):
     dependencies = [
         ("lettings", "0001_initial"),
+        ("oc_lettings_site", "0001_initial"),
     ]
 
     operations = [
@@ -0,0 +1,48 @@
+# Generated by Django 3.0 on 2026-10-18 10:05
+
+from django.db import migrations
+from django.apps.registry import Apps
+from typing import Any
+
+
+def create_search_index(apps: Apps, schema_editor: Any):
+    """
+    Creates and fills the full-text search index of the lettings
+
+    Args:
+        apps: The app registry.
+        schema_editor: The schema editor.
+
+    Returns:
+        None
+    """
+    from lettings.search import rebuild_index
+
+    rebuild_index(schema_editor.connection.alias)
+
+
+def drop_search_index(apps: Apps, schema_editor: Any):
+    """
+    Drops the full-text search index of the lettings
+
+    Args:
+        apps: The app registry.
+        schema_editor: The schema editor.
+
+    Returns:
+        None
+    """
+    from lettings.search import DROP_INDEX_SQL, uses_index
+
+    if uses_index(schema_editor.connection):
+        schema_editor.execute(DROP_INDEX_SQL)
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("lettings", "0004_updated_at"),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -0,0 +1,78 @@
+# Generated by Django 3.0 on 2026-10-18 16:08
+
+from django.db import migrations, models
+from django.apps.registry import Apps
+from typing import Any
+
+
+def count_facets(apps: Apps, schema_editor: Any):
+    """
+    Computes the facet counts of the existing lettings
+
+    Args:
+        apps: The app registry.
+        schema_editor: The schema editor.
+
+    Returns:
+        None
+    """
+    from lettings.facets import rebuild_counts
+
+    rebuild_counts(schema_editor.connection.alias, apps)
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("lettings", "0005_letting_search_index"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="FacetCount",
+            fields=[
+                (
+                    "id",
+                    models.AutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "facet",
+                    models.CharField(
+                        choices=[("state", "State"), ("country", "Country")],
+                        max_length=16,
+                    ),
+                ),
+                ("value", models.CharField(max_length=64)),
+                ("count", models.PositiveIntegerField(default=0)),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name="address",
+            index=models.Index(fields=["state", "city"], name="address_state_city_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="address",
+            index=models.Index(
+                fields=["country_iso_code", "state"], name="address_country_state_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="address",
+            index=models.Index(fields=["city"], name="address_city_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="address",
+            index=models.Index(fields=["zip_code"], name="address_zip_code_idx"),
+        ),
+        migrations.AddConstraint(
+            model_name="facetcount",
+            constraint=models.UniqueConstraint(
+                fields=("facet", "value"), name="unique_facet_value"
+            ),
+        ),
+        migrations.RunPython(count_facets, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,79 @@
+# Generated by Django 3.0 on 2026-10-18 16:40
+
+import django.core.validators
+from django.db import migrations, models
+from django.apps.registry import Apps
+from typing import Any
+
+
+def create_spatial_index(apps: Apps, schema_editor: Any):
+    """
+    Creates and fills the spatial index of the located addresses
+
+    Args:
+        apps: The app registry.
+        schema_editor: The schema editor.
+
+    Returns:
+        None
+    """
+    from lettings.geo import rebuild_index
+
+    rebuild_index(schema_editor.connection.alias)
+
+
+def drop_spatial_index(apps: Apps, schema_editor: Any):
+    """
+    Drops the spatial index of the located addresses
+
+    Args:
+        apps: The app registry.
+        schema_editor: The schema editor.
+
+    Returns:
+        None
+    """
+    from lettings.geo import DROP_INDEX_SQL, uses_index
+
+    if uses_index(schema_editor.connection):
+        schema_editor.execute(DROP_INDEX_SQL)
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("lettings", "0006_address_indexes_facet_count"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="address",
+            name="latitude",
+            field=models.FloatField(
+                blank=True,
+                null=True,
+                validators=[
+                    django.core.validators.MinValueValidator(-90),
+                    django.core.validators.MaxValueValidator(90),
+                ],
+            ),
+        ),
+        migrations.AddField(
+            model_name="address",
+            name="longitude",
+            field=models.FloatField(
+                blank=True,
+                null=True,
+                validators=[
+                    django.core.validators.MinValueValidator(-180),
+                    django.core.validators.MaxValueValidator(180),
+                ],
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="address",
+            index=models.Index(
+                fields=["latitude", "longitude"], name="address_location_idx"
+            ),
+        ),
+        migrations.RunPython(create_spatial_index, drop_spatial_index),
+    ]
@@ -7,7 +7,11 @@ Each attribute of the class represents a field of the table.
 """
 
 from django.db import models
-from django.core.validators import MaxValueValidator, MinLengthValidator
+from django.core.validators import (
+    MaxValueValidator,
+    MinLengthValidator,
+    MinValueValidator,
+)
 
 
 class Address(models.Model):
@@ -15,7 +19,8 @@ class Address(models.Model):
     This class represents the 'Address' model for the 'lettings' application.
 
     Each instance of this class represents a single address, with fields for number,
-     street, city, state, zip code, and country ISO code.
+     street, city, state, zip code, and country ISO code. The optional latitude and
+     longitude locate the address for the proximity search.
 
     """
 
@@ -28,6 +33,15 @@ class Address(models.Model):
         """
 
         verbose_name_plural = "Addresses"
+        indexes = [
+            models.Index(fields=["state", "city"], name="address_state_city_idx"),
+            models.Index(
+                fields=["country_iso_code", "state"], name="address_country_state_idx"
+            ),
+            models.Index(fields=["city"], name="address_city_idx"),
+            models.Index(fields=["zip_code"], name="address_zip_code_idx"),
+            models.Index(fields=["latitude", "longitude"], name="address_location_idx"),
+        ]
 
     number = models.PositiveIntegerField(validators=[MaxValueValidator(9999)])
     street = models.CharField(max_length=64)
@@ -37,6 +51,17 @@ class Address(models.Model):
     country_iso_code = models.CharField(
         max_length=3, validators=[MinLengthValidator(3)]
     )
+    latitude = models.FloatField(
+        null=True,
+        blank=True,
+        validators=[MinValueValidator(-90), MaxValueValidator(90)],
+    )
+    longitude = models.FloatField(
+        null=True,
+        blank=True,
+        validators=[MinValueValidator(-180), MaxValueValidator(180)],
+    )
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
 
     def __str__(self):
         """
@@ -66,9 +91,47 @@ class Letting(models.Model):
 
     title = models.CharField(max_length=256)
     address = models.OneToOneField(Address, on_delete=models.CASCADE)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
 
     def __str__(self):
         """
         This method returns a string representation of the 'Letting' model instance.
         """
         return self.title
+
+
+class FacetCount(models.Model):
+    """
+    This class represents the 'FacetCount' model for the 'lettings' application.
+
+    Each instance holds the number of lettings whose address has a given value for a
+     facet, e.g. the lettings in the state "CA". The counts are kept up to date by the
+     signal receivers of the application, so the lettings index reads them instead of
+     grouping the addresses on every request.
+
+    """
+
+    class Meta:
+        """
+        This inner class defines metadata for the 'FacetCount' model.
+
+        It makes each value appear once per facet.
+        """
+
+        constraints = [
+            models.UniqueConstraint(fields=["facet", "value"], name="unique_facet_value")
+        ]
+
+    STATE = "state"
+    COUNTRY = "country"
+    FACET_CHOICES = [(STATE, "State"), (COUNTRY, "Country")]
+
+    facet = models.CharField(max_length=16, choices=FACET_CHOICES)
+    value = models.CharField(max_length=64)
+    count = models.PositiveIntegerField(default=0)
+
+    def __str__(self):
+        """
+        This method returns a string representation of the 'FacetCount' model instance.
+        """
+        return f"{self.facet}={self.value}: {self.count}"
@@ -0,0 +1,192 @@
+"""
+This module implements the full-text search over the lettings and their addresses.
+
+On SQLite, the searchable text of each letting is kept in the 'lettings_letting_fts'
+FTS5 virtual table, whose rowid is the letting id. The index is updated by the signal
+receivers of the application when a letting or an address changes, and can be rebuilt
+from scratch with `manage.py rebuild_search_index`. The results are ranked with BM25 and
+every search term matches as a prefix, so "san fr" finds "San Francisco".
+
+On other databases, the search falls back to case-insensitive containment filters.
+"""
+
+import re
+
+from django.db import connections, router
+from django.db.models import Q
+from django.db.models.expressions import RawSQL
+
+from .models import Letting
+
+
+FTS_TABLE = "lettings_letting_fts"
+SEARCHED_FIELDS = ("title", "street", "city", "state", "zip_code", "country_iso_code")
+
+CREATE_INDEX_SQL = (
+    f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5("
+    f"{', '.join(SEARCHED_FIELDS)}, tokenize='unicode61', prefix='2 3')"
+)
+DROP_INDEX_SQL = f"DROP TABLE IF EXISTS {FTS_TABLE}"
+# Selects the searchable text of the lettings, followed by a WHERE clause or nothing
+SELECT_DOCUMENTS_SQL = (
+    "SELECT l.id, l.title, a.street, a.city, a.state, a.zip_code, a.country_iso_code "
+    "FROM lettings_letting l INNER JOIN lettings_address a ON l.address_id = a.id"
+)
+
+_TERM = re.compile(r"\w+")
+
+
+def uses_index(connection):
+    """
+    Return whether the given connection supports the FTS5 search index.
+    """
+    return connection.vendor == "sqlite"
+
+
+def match_expression(query):
+    """
+    Convert a user query to an FTS5 expression matching every term as a prefix.
+
+    Args:
+        query (str): The text typed by the user.
+
+    Returns:
+        str: The FTS5 expression, or an empty string if the query has no terms.
+    """
+    return " ".join(f'"{term}"*' for term in _TERM.findall(query))
+
+
+def rebuild_index(using="default"):
+    """
+    Create the search index if needed and fill it with every letting.
+
+    Args:
+        using (str): The alias of the database.
+
+    Returns:
+        int: The number of lettings indexed.
+    """
+    connection = connections[using]
+    if not uses_index(connection):
+        return 0
+    with connection.cursor() as cursor:
+        cursor.execute(CREATE_INDEX_SQL)
+        cursor.execute(f"DELETE FROM {FTS_TABLE}")
+        cursor.execute(
+            f"INSERT INTO {FTS_TABLE} (rowid, {', '.join(SEARCHED_FIELDS)}) "
+            f"{SELECT_DOCUMENTS_SQL}"
+        )
+        cursor.execute(f"SELECT count(*) FROM {FTS_TABLE}")
+        return cursor.fetchone()[0]
+
+
+def index_lettings(letting_ids, using="default"):
+    """
+    Update the entries of the given lettings in the search index.
+
+    Args:
+        letting_ids (list): The ids of the lettings to index again.
+        using (str): The alias of the database.
+
+    Returns:
+        None
+    """
+    connection = connections[using]
+    if not letting_ids or not uses_index(connection):
+        return
+    placeholders = ", ".join(["%s"] * len(letting_ids))
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"DELETE FROM {FTS_TABLE} WHERE rowid IN ({placeholders})", letting_ids
+        )
+        cursor.execute(
+            f"INSERT INTO {FTS_TABLE} (rowid, {', '.join(SEARCHED_FIELDS)}) "
+            f"{SELECT_DOCUMENTS_SQL} WHERE l.id IN ({placeholders})",
+            letting_ids,
+        )
+
+
+def remove_letting(letting_id, using="default"):
+    """
+    Remove a letting from the search index.
+
+    Args:
+        letting_id (int): The id of the removed letting.
+        using (str): The alias of the database.
+
+    Returns:
+        None
+    """
+    connection = connections[using]
+    if not uses_index(connection):
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(f"DELETE FROM {FTS_TABLE} WHERE rowid = %s", [letting_id])
+
+
+def search(query, offset=0, limit=20):
+    """
+    Return the lettings matching the query, best matches first.
+
+    Args:
+        query (str): The text typed by the user.
+        offset (int): The number of results to skip.
+        limit (int): The maximum number of results.
+
+    Returns:
+        list: The matching lettings, with their 'id' and 'title' loaded.
+    """
+    expression = match_expression(query)
+    if not expression:
+        return []
+    using = router.db_for_read(Letting) or "default"
+    connection = connections[using]
+    if not uses_index(connection):
+        return list(_search_without_index(query, using)[offset:offset + limit])
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"SELECT rowid, title FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s "
+            f"ORDER BY rank LIMIT %s OFFSET %s",
+            [expression, limit, offset],
+        )
+        return [Letting(id=letting_id, title=title) for letting_id, title in cursor]
+
+
+def filter_matching(queryset, query):
+    """
+    Filter a queryset of lettings on the query, e.g. for the admin search.
+
+    The matching ids are read from the search index in a subquery, so they are never
+    loaded in Python.
+
+    Args:
+        queryset (QuerySet): The lettings.
+        query (str): The text typed by the user.
+
+    Returns:
+        QuerySet: The matching lettings, in the order of the queryset.
+    """
+    expression = match_expression(query)
+    if not expression:
+        return queryset
+    if not uses_index(connections[queryset.db]):
+        return queryset.filter(pk__in=_search_without_index(query, queryset.db).values("pk"))
+    return queryset.filter(
+        pk__in=RawSQL(
+            f"SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s", [expression]
+        )
+    )
+
+
+def _search_without_index(query, using):
+    """
+    Return the lettings containing every term of the query, for databases without FTS5.
+    """
+    lettings = Letting.objects.using(using).only("title").order_by("pk")
+    for term in _TERM.findall(query):
+        condition = Q()
+        for field in SEARCHED_FIELDS:
+            lookup = field if field == "title" else f"address__{field}"
+            condition |= Q(**{f"{lookup}__icontains": term})
+        lettings = lettings.filter(condition)
+    return lettings
@@ -0,0 +1,126 @@
+"""
+This module defines the signal receivers of the 'lettings' application.
+
+The receivers invalidate the cached letting pages, update the full-text search and
+spatial indexes and adjust the facet counts whenever a 'Letting' or the 'Address' it
+points to is saved or deleted.
+"""
+
+from django.db.models.signals import post_delete, post_save, pre_delete, pre_save
+from django.dispatch import receiver
+
+from oc_lettings_site import page_cache
+from . import facets, geo, search
+from .models import Address, Letting
+
+
+@receiver([post_save, post_delete], sender=Letting)
+def invalidate_letting_page(sender, instance, **kwargs):
+    """
+    Remove the cached page of the saved or deleted letting.
+    """
+    page_cache.invalidate(page_cache.letting_key(instance.pk))
+
+
+@receiver([post_save, post_delete], sender=Address)
+def invalidate_address_page(sender, instance, **kwargs):
+    """
+    Remove the cached page of the letting located at the saved or deleted address.
+    """
+    letting_ids = Letting.objects.filter(address_id=instance.pk).values_list(
+        "pk", flat=True
+    )
+    page_cache.invalidate(*[page_cache.letting_key(pk) for pk in letting_ids])
+
+
+@receiver(post_save, sender=Letting)
+def index_letting(sender, instance, using, **kwargs):
+    """
+    Update the search index entry of the saved letting.
+    """
+    search.index_lettings([instance.pk], using)
+
+
+@receiver(post_delete, sender=Letting)
+def unindex_letting(sender, instance, using, **kwargs):
+    """
+    Remove the deleted letting from the search index.
+    """
+    search.remove_letting(instance.pk, using)
+
+
+@receiver(post_save, sender=Address)
+def index_address_letting(sender, instance, using, **kwargs):
+    """
+    Update the search index entry of the letting located at the saved address.
+    """
+    letting_ids = Letting.objects.using(using).filter(address_id=instance.pk)
+    search.index_lettings(list(letting_ids.values_list("pk", flat=True)), using)
+
+
+@receiver(pre_save, sender=Letting)
+def remember_letting_facets(sender, instance, raw, using, **kwargs):
+    """
+    Remember the facet values of the letting before it is saved.
+    """
+    if not raw:
+        instance._facets_before = (
+            facets.stored_letting_facets(instance.pk, using) if instance.pk else None
+        )
+
+
+@receiver(post_save, sender=Letting)
+def count_letting_facets(sender, instance, raw, using, **kwargs):
+    """
+    Move the saved letting to the facet values of its address.
+    """
+    if not raw:
+        after = facets.address_facets(instance.address)
+        facets.adjust_counts(instance._facets_before, after, using)
+
+
+@receiver(pre_delete, sender=Letting)
+def uncount_letting_facets(sender, instance, using, **kwargs):
+    """
+    Remove the deleted letting from the facet counts.
+    """
+    facets.adjust_counts(facets.stored_letting_facets(instance.pk, using), None, using)
+
+
+@receiver(pre_save, sender=Address)
+def remember_address_facets(sender, instance, raw, using, **kwargs):
+    """
+    Remember the facet values of the address before it is saved.
+    """
+    if not raw:
+        instance._facets_before = (
+            facets.stored_address_facets(instance.pk, using) if instance.pk else None
+        )
+
+
+@receiver(post_save, sender=Address)
+def count_address_facets(sender, instance, created, raw, using, **kwargs):
+    """
+    Move the letting located at the saved address to its new facet values.
+    """
+    if raw or created:
+        return
+    before, after = instance._facets_before, facets.address_facets(instance)
+    if before != after and Letting.objects.using(using).filter(address=instance).exists():
+        facets.adjust_counts(before, after, using)
+
+
+@receiver(post_save, sender=Address)
+def index_address_location(sender, instance, using, **kwargs):
+    """
+    Update the spatial index entry of the saved address.
+    """
+    geo.index_address(instance, using)
+
+
+@receiver(post_delete, sender=Address)
+def unindex_address_location(sender, instance, using, **kwargs):
+    """
+    Remove the deleted address from the spatial index.
+    """
+    geo.remove_address(instance.pk, using)
@@ -8,9 +8,25 @@ These tests help ensure the correct functionality of the application by testing
  units of code.
 """
 
-from django.test import TestCase
+import csv
+import json
+import os
+from io import StringIO
+from tempfile import TemporaryDirectory
+
+from asgiref.sync import async_to_sync
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.http import Http404
+from django.test import RequestFactory, TestCase, override_settings
 from django.urls import reverse
-from .models import Address, Letting
+from django.utils import timezone
+from oc_lettings_site import page_cache
+from . import async_views, facets, geo, search, views
+from .models import Address, FacetCount, Letting
 
 
 class AddressModelTest(TestCase):
@@ -312,6 +328,7 @@ class LettingViewTest(TestCase):
         setUp: Sets up the test environment.
         test_letting_view: Tests that the Letting View returns a 200 status
         code for a valid letting and correctly displays the details of a letting.
+        test_letting_icons: Tests that the icons of the letting page are inlined.
     """
 
     def setUp(self):
@@ -349,6 +366,25 @@ class LettingViewTest(TestCase):
         self.assertContains(response, "Test Letting")
         self.assertContains(response, "123 Test Street")
 
+    def test_letting_icons(self):
+        """
+        Test that the icons of the letting page are rendered as inline SVG elements, with
+        the classes given to them, instead of being replaced by a script.
+
+        Args:
+            self (LettingViewTest): Instance of the test case.
+
+        Raises:
+            AssertionError: If an icon is missing or left to a script.
+
+        Returns:
+            None
+        """
+        response = self.client.get(reverse("letting", args=[1]))
+        self.assertContains(response, 'class="feather feather-home" aria-hidden="true">')
+        self.assertContains(response, 'class="feather feather-arrow-right ms-2"')
+        self.assertNotContains(response, "data-feather")
+
     def test_letting_not_found(self):
         """
         Test that the Letting View returns a 404 status code for an invalid letting.
@@ -368,3 +404,1502 @@ class LettingViewTest(TestCase):
         """
         response = self.client.get(reverse("letting", args=[100]))
         self.assertEqual(response.status_code, 404)
+
+
+@override_settings(PAGINATION_PAGE_SIZE=2, STREAMING_CHUNK_SIZE=2)
+class IndexPaginationTest(TestCase):
+    """
+    Test case for the keyset pagination and streaming of the Index View.
+
+    Methods:
+        setUp: Sets up the test environment.
+        test_index_first_page: Tests that the first page links to the next one.
+        test_index_after_cursor: Tests that the `after` cursor returns the following page.
+        test_index_before_cursor: Tests that the `before` cursor returns the previous page.
+        test_index_empty_page: Tests that an empty page links to no other page.
+        test_index_cursor_out_of_range: Tests that a cursor overflowing the primary keys
+        is ignored.
+        test_index_stream: Tests that the streaming mode renders every letting.
+    """
+
+    def setUp(self):
+        for i in range(5):
+            address = Address.objects.create(
+                number=i,
+                street="Test Street",
+                city="Test City",
+                state="TS",
+                zip_code=12345,
+                country_iso_code="TSC",
+            )
+            Letting.objects.create(address=address, title=f"Test Letting {i}")
+        self.ids = list(Letting.objects.order_by("id").values_list("id", flat=True))
+
+    def test_index_first_page(self):
+        """
+        Test that the first page contains the first lettings and links to the next one.
+
+        Args:
+            self (IndexPaginationTest): Instance of the test case.
+
+        Raises:
+            AssertionError: If the page content or the next cursor is wrong.
+
+        Returns:
+            None
+        """
+        response = self.client.get(reverse("lettings_index"))
+        page = response.context["page"]
+        self.assertEqual([letting.id for letting in page], self.ids[:2])
+        self.assertFalse(page.has_previous)
+        self.assertContains(response, f"?after={self.ids[1]}")
+
+    def test_index_after_cursor(self):
+        """
+        Test that the `after` cursor returns the lettings following it.
+
+        Args:
+            self (IndexPaginationTest): Instance of the test case.
+
+        Raises:
+            AssertionError: If the page content or the cursors are wrong.
+
+        Returns:
+            None
+        """
+        response = self.client.get(reverse("lettings_index"), {"after": self.ids[3]})
+        page = response.context["page"]
+        self.assertEqual([letting.id for letting in page], self.ids[4:])
+        self.assertFalse(page.has_next)
+        self.assertEqual(page.previous_cursor, self.ids[4])
+
+    def test_index_before_cursor(self):
+        """
+        Test that the `before` cursor returns the lettings preceding it.
+
+        Args:
+            self (IndexPaginationTest): Instance of the test case.
+
+        Raises:
+            AssertionError: If the page content or the cursors are wrong.
+
+        Returns:
+            None
+        """
+        response = self.client.get(reverse("lettings_index"), {"before": self.ids[4]})
+        page = response.context["page"]
+        self.assertEqual([letting.id for letting in page], self.ids[2:4])
+        self.assertTrue(page.has_previous)
+        self.assertEqual(page.next_cursor, self.ids[3])
+
+    def test_index_empty_page(self):
+        """
+        Test that a page without lettings has no link to a following or previous page.
+
+        Args:
+            self (IndexPaginationTest): Instance of the test case.
+
+        Raises:
+            AssertionError: If the page links to another one.
+
+        Returns:
+            None
+        """
+        for cursor in ({"before": self.ids[0]}, {"after": self.ids[-1]}):
+            response = self.client.get(reverse("lettings_index"), cursor)
+            page = response.context["page"]
+            self.assertEqual(len(page), 0)
+            self.assertFalse(page.has_next)
+            self.assertFalse(page.has_previous)
+            self.assertNotContains(response, "=None")
+
+    def test_index_cursor_out_of_range(self):
+        """
+        Test that a cursor outside the range of the primary keys returns the first page.
+
+        Args:
+            self (IndexPaginationTest): Instance of the test case.
+
+        Raises:
+            AssertionError: If the request fails or another page is returned.
+
+        Returns:
+            None
+        """
+        for cursor in ({"after": "9" * 30}, {"before": "-" + "9" * 30}):
+            response = self.client.get(reverse("lettings_index"), cursor)
+            self.assertEqual(response.status_code, 200)
+            page = response.context["page"]
+            self.assertEqual([letting.id for letting in page], self.ids[:2])
+
+    def test_index_stream(self):
+        """
+        Test that the streaming mode renders every letting in a streaming response.
+
+        Args:
+            self (IndexPaginationTest): Instance of the test case.
+
+        Raises:
+            AssertionError: If the response is not streamed or misses a letting.
+
+        Returns:
+            None
+        """
+        response = self.client.get(reverse("lettings_index"), {"stream": 1})
+        self.assertTrue(response.streaming)
+        content = b"".join(response.streaming_content).decode()
+        for i in range(5):
+            self.assertIn(f"Test Letting {i}", content)
+        self.assertNotIn("stream-placeholder", content)
+
+
+class LettingPageCacheTest(TestCase):
+    """
+    Test case for the page cache of the Letting View.
+
+    Methods:
+        setUp: Sets up the test environment.
+        test_letting_page_cached: Tests that a second request is served from the cache.
+        test_address_change_invalidates_page: Tests that saving the address invalidates
+        the cached page.
+        test_outdated_version_not_served: Tests that a page cached with the previous
+        timestamps is not served, even without invalidation.
+        test_lagging_replica_page_replaced: Tests that a page cached from a replica
+        lagging behind a write is replaced once the replica has the write.
+        test_evictions_counted: Tests that the entries evicted by the size bound are counted.
+    """
+
+    def setUp(self):
+        caches[page_cache.PAGE_CACHE_ALIAS].clear()
+        page_cache.reset_stats()
+        self.address = Address.objects.create(
+            number=123,
+            street="Test Street",
+            city="Test City",
+            state="TS",
+            zip_code=12345,
+            country_iso_code="TSC",
+        )
+        self.letting = Letting.objects.create(
+            address=self.address,
+            title="Test Letting",
+        )
+
+    def test_letting_page_cached(self):
+        """
+        Test that a second request to the same letting is served from the cache.
+
+        This test checks that the second request only runs the validator query and is
+        counted as a hit.
+
+        Args:
+            self (LettingPageCacheTest): Instance of the test case.
+
+        Raises:
+            AssertionError: If the second request runs the page query or is not a hit.
+
+        Returns:
+            None
+        """
+        url = reverse("letting", args=[self.letting.id])
+        self.client.get(url)
+        with self.assertNumQueries(1):
+            response = self.client.get(url)
+        self.assertContains(response, "Test Letting")
+        self.assertEqual(page_cache.stats()["hits"], 1)
+        self.assertEqual(page_cache.stats()["misses"], 1)
+
+    def test_address_change_invalidates_page(self):
+        """
+        Test that saving the address of a letting invalidates its cached page.
+
+        Args:
+            self (LettingPageCacheTest): Instance of the test case.
+
+        Raises:
+            AssertionError: If the page still shows the previous address.
+
+        Returns:
+            None
+        """
+        url = reverse("letting", args=[self.letting.id])
+        self.client.get(url)
+        self.address.street = "Other Street"
+        self.address.save()
+        response = self.client.get(url)
+        self.assertContains(response, "123 Other Street")
+
+    def test_outdated_version_not_served(self):
+        """
+        Test that a page cached with the previous timestamps of its rows is not served.
+
+        The update skips the signals, as a write made by another process, whose
+        invalidation does not reach the cache of this one.
+
+        Args:
+            self (LettingPageCacheTest): Instance of the test case.
+
+        Raises:
+            AssertionError: If the page still shows the previous title.
+
+        Returns:
+            None
+        """
+        url = reverse("letting", args=[self.letting.id])
+        self.client.get(url)
+        Letting.objects.filter(id=self.letting.id).update(
+            title="Other Letting", updated_at=timezone.now()
+        )
+        response = self.client.get(url)
+        self.assertContains(response, "Other Letting")
+        self.assertEqual(page_cache.stats()["misses"], 2)
+
+    def test_lagging_replica_page_replaced(self):
+        """
+        Test that a page cached from a replica lagging behind a write is replaced once
+        the replica has received the write.
+
+        The page rendered from the replica is cached after the invalidation of the
+        write, with the validators the replica returned.
+
+        Args:
+            self (LettingPageCacheTest): Instance of the test case.
+
+        Raises:
+            AssertionError: If the page rendered from the replica is still served.
+
+        Returns:
+            None
+        """
+        url = reverse("letting", args=[self.letting.id])
+        lagging_version, _ = views.letting_validators(None, self.letting.id)
+        lagging_page = self.client.get(url).content
+        self.letting.title = "Other Letting"
+        self.letting.save()
+        page_cache.set_page(page_cache.letting_key(self.letting.id), lagging_version, lagging_page)
+        self.assertContains(self.client.get(url), "Other Letting")
+
+    @override_settings(
+        CACHES={
+            "default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"},
+            "pages": {
+                "BACKEND": "oc_lettings_site.page_cache.CountingLocMemCache",
+                "LOCATION": "evictions",
+                "OPTIONS": {"MAX_ENTRIES": 2, "CULL_FREQUENCY": 2},
+            },
+        }
+    )
+    def test_evictions_counted(self):
+        """
+        Test that the entries evicted to respect MAX_ENTRIES are counted.
+
+        Args:
+            self (LettingPageCacheTest): Instance of the test case.
+
+        Raises:
+            AssertionError: If the eviction counter is not incremented.
+
+        Returns:
+            None
+        """
+        for i in range(3):
+            page_cache.set_page(page_cache.letting_key(i), "1", b"page")
+        self.assertEqual(page_cache.stats()["evictions"], 1)
+
+
+class ConditionalGetTest(TestCase):
+    """
+    Test case for the conditional GET support of the lettings views.
+
+    Methods:
+        setUp: Sets up the test environment.
+        test_letting_not_modified: Tests that a matching ETag returns a 304 without
+        running the page query.
+        test_letting_modified: Tests that saving the address changes the ETag.
+        test_index_not_modified: Tests that the index returns a 304 until a letting
+        is deleted.
+    """
+
+    def setUp(self):
+        self.address = Address.objects.create(
+            number=123,
+            street="Test Street",
+            city="Test City",
+            state="TS",
+            zip_code=12345,
+            country_iso_code="TSC",
+        )
+        self.letting = Letting.objects.create(
+            address=self.address,
+            title="Test Letting",
+        )
+
+    def test_letting_not_modified(self):
+        """
+        Test that a matching If-None-Match returns a 304 with a single query.
+
+        Args:
+            self (ConditionalGetTest): Instance of the test case.
+
+        Raises:
+            AssertionError: If the response is not a 304 or runs the page query.
+
+        Returns:
+            None
+        """
+        url = reverse("letting", args=[self.letting.id])
+        etag = self.client.get(url)["ETag"]
+        with self.assertNumQueries(1):
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+    def test_letting_modified(self):
+        """
+        Test that saving the address of a letting changes the ETag of its page.
+
+        Args:
+            self (ConditionalGetTest): Instance of the test case.
+
+        Raises:
+            AssertionError: If the previous ETag still returns a 304.
+
+        Returns:
+            None
+        """
+        url = reverse("letting", args=[self.letting.id])
+        etag = self.client.get(url)["ETag"]
+        self.address.save()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+    def test_index_not_modified(self):
+        """
+        Test that the index returns a 304 until a letting is deleted.
+
+        The oldest letting is deleted so that only the row count changes.
+
+        Args:
+            self (ConditionalGetTest): Instance of the test case.
+
+        Raises:
+            AssertionError: If the index does not return a 304 for an unchanged table,
+            or still returns a 304 after a deletion.
+
+        Returns:
+            None
+        """
+        address = Address.objects.create(
+            number=1,
+            street="Test Street",
+            city="Test City",
+            state="TS",
+            zip_code=12345,
+            country_iso_code="TSC",
+        )
+        Letting.objects.create(address=address, title="Newer Letting")
+        url = reverse("lettings_index")
+        etag = self.client.get(url)["ETag"]
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.letting.delete()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+
+class SearchTest(TestCase):
+    """
+    Test case for the full-text search over the lettings and their addresses.
+
+    Methods:
+        setUp: Sets up the test environment.
+        test_search_prefix: Tests that the terms of a query match as prefixes.
+        test_search_address: Tests that the address fields are searched.
+        test_index_follows_changes: Tests that the index follows the saved and deleted
+        rows.
+        test_rebuild_command: Tests that the 'rebuild_search_index' command indexes
+        every letting.
+        test_search_view: Tests that the search view lists the matching lettings.
+        test_search_page_bounded: Tests that a huge page number is clamped.
+    """
+
+    def setUp(self):
+        self.address = Address.objects.create(
+            number=7,
+            street="Ocean Drive",
+            city="San Francisco",
+            state="CA",
+            zip_code=94110,
+            country_iso_code="USA",
+        )
+        self.letting = Letting.objects.create(
+            address=self.address, title="Sunny Loft"
+        )
+
+    def test_search_prefix(self):
+        """
+        Test that "sun lo" finds the letting titled "Sunny Loft".
+
+        Args:
+            self (SearchTest): Instance of the test case.
+
+        Raises:
+            AssertionError: If the letting is not found.
+
+        Returns:
+            None
+        """
+        results = search.search("sun lo")
+        self.assertEqual([letting.pk for letting in results], [self.letting.pk])
+        self.assertEqual(results[0].title, "Sunny Loft")
+
+    def test_search_address(self):
+        """
+        Test that a letting is found by its street, city and zip code, and not by
+        unrelated terms.
+
+        Args:
+            self (SearchTest): Instance of the test case.
+
+        Raises:
+            AssertionError: If the letting is not found by an address field, or is found
+            by an unrelated term.
+
+        Returns:
+            None
+        """
+        for query in ("ocean", "san fran", "94110"):
+            self.assertEqual(len(search.search(query)), 1, query)
+        self.assertEqual(search.search("boston"), [])
+        self.assertEqual(search.search("  "), [])
+
+    def test_index_follows_changes(self):
+        """
+        Test that the index is updated when the address is saved and the letting is
+        deleted.
+
+        Args:
+            self (SearchTest): Instance of the test case.
+
+        Raises:
+            AssertionError: If a search returns stale results.
+
+        Returns:
+            None
+        """
+        self.address.city = "Oakland"
+        self.address.save()
+        self.assertEqual(search.search("francisco"), [])
+        self.assertEqual(len(search.search("oakland")), 1)
+        self.letting.delete()
+        self.assertEqual(search.search("oakland"), [])
+
+    def test_rebuild_command(self):
+        """
+        Test that the 'rebuild_search_index' command indexes the lettings inserted
+        without signals.
+
+        Args:
+            self (SearchTest): Instance of the test case.
+
+        Raises:
+            AssertionError: If the bulk-created letting is not found after the rebuild.
+
+        Returns:
+            None
+        """
+        address = Address.objects.create(
+            number=8,
+            street="Elm Street",
+            city="Boston",
+            state="MA",
+            zip_code=2101,
+            country_iso_code="USA",
+        )
+        Letting.objects.bulk_create([Letting(address=address, title="Quiet Studio")])
+        self.assertEqual(search.search("quiet"), [])
+        output = StringIO()
+        call_command("rebuild_search_index", stdout=output)
+        self.assertIn("Indexed 2 lettings", output.getvalue())
+        self.assertEqual(len(search.search("quiet")), 1)
+
+    def test_search_view(self):
+        """
+        Test that the search view lists the matching lettings and links to them.
+
+        Args:
+            self (SearchTest): Instance of the test case.
+
+        Raises:
+            AssertionError: If the view does not return a 200 or does not link to the
+            matching letting.
+
+        Returns:
+            None
+        """
+        response = self.client.get(reverse("lettings_search"), {"q": "sunny"})
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, reverse("letting", args=[self.letting.pk]))
+        response = self.client.get(reverse("lettings_search"), {"q": "boston"})
+        self.assertNotContains(response, reverse("letting", args=[self.letting.pk]))
+
+    def test_search_page_bounded(self):
+        """
+        Test that a page number whose offset would overflow the query is clamped to the
+        last page allowed.
+
+        Args:
+            self (SearchTest): Instance of the test case.
+
+        Raises:
+            AssertionError: If the request fails or the page number is not clamped.
+
+        Returns:
+            None
+        """
+        response = self.client.get(reverse("lettings_search"), {"q": "sunny", "page": "9" * 30})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context["page_number"], views.MAX_SEARCH_PAGE)
+        self.assertEqual(len(response.context["lettings_list"]), 0)
+
+
+class FacetTest(TestCase):
+    """
+    Test case for the faceted filtering of the lettings index.
+
+    Methods:
+        setUp: Sets up the test environment.
+        counts: Returns the stored facet counts of a facet.
+        test_filter_index: Tests that the index lists only the lettings matching the
+        filters.
+        test_invalid_zip_code_ignored: Tests that a zip code which is not a small number
+        is ignored.
+        test_counts_follow_changes: Tests that the facet counts follow the saved and
+        deleted rows.
+        test_rebuild_counts: Tests that rebuilding the counts gives the maintained counts.
+        test_filters_use_indexes: Tests that the filter queries use the address indexes.
+    """
+
+    def setUp(self):
+        self.lettings = []
+        for i, (city, state) in enumerate(
+            [("Los Angeles", "CA"), ("San Diego", "CA"), ("Boston", "MA")]
+        ):
+            address = Address.objects.create(
+                number=i,
+                street="Test Street",
+                city=city,
+                state=state,
+                zip_code=10000 + i,
+                country_iso_code="USA",
+            )
+            self.lettings.append(
+                Letting.objects.create(address=address, title=f"Letting {city}")
+            )
+
+    def counts(self, facet):
+        """
+        Return the non-zero counts of a facet as a dict of value to count.
+        """
+        return dict(
+            FacetCount.objects.filter(facet=facet, count__gt=0).values_list(
+                "value", "count"
+            )
+        )
+
+    def test_filter_index(self):
+        """
+        Test that the filters of the index restrict the lettings and are kept in the
+        facet counts display.
+
+        Args:
+            self (FacetTest): Instance of the test case.
+
+        Raises:
+            AssertionError: If a letting outside the filters is listed, or one matching
+            them is missing.
+
+        Returns:
+            None
+        """
+        response = self.client.get(reverse("lettings_index"), {"state": "CA"})
+        self.assertEqual(
+            [letting.title for letting in response.context["lettings_list"]],
+            ["Letting Los Angeles", "Letting San Diego"],
+        )
+        self.assertEqual(response.context["facets"]["state"], [("CA", 2), ("MA", 1)])
+        response = self.client.get(
+            reverse("lettings_index"), {"state": "CA", "city": "San Diego"}
+        )
+        self.assertEqual(len(response.context["lettings_list"]), 1)
+        response = self.client.get(reverse("lettings_index"), {"zip_code": "10002"})
+        self.assertEqual(
+            [letting.title for letting in response.context["lettings_list"]],
+            ["Letting Boston"],
+        )
+
+    def test_invalid_zip_code_ignored(self):
+        """
+        Test that a superscript digit or a zip code overflowing an integer column is
+        ignored instead of failing the request.
+
+        Args:
+            self (FacetTest): Instance of the test case.
+
+        Raises:
+            AssertionError: If the request fails or the lettings are filtered.
+
+        Returns:
+            None
+        """
+        for zip_code in ("\u00b2", "1" * 30):
+            response = self.client.get(reverse("lettings_index"), {"zip_code": zip_code})
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(len(response.context["lettings_list"]), 3)
+            self.assertEqual(response.context["filters"], {})
+
+    def test_counts_follow_changes(self):
+        """
+        Test that moving an address to another state and deleting a letting adjust the
+        counts.
+
+        Args:
+            self (FacetTest): Instance of the test case.
+
+        Raises:
+            AssertionError: If the stored counts differ from the expected ones.
+
+        Returns:
+            None
+        """
+        self.assertEqual(self.counts("state"), {"CA": 2, "MA": 1})
+        self.assertEqual(self.counts("country"), {"USA": 3})
+        address = self.lettings[2].address
+        address.state = "NY"
+        address.save()
+        self.assertEqual(self.counts("state"), {"CA": 2, "NY": 1})
+        self.lettings[0].address.delete()
+        self.assertEqual(self.counts("state"), {"CA": 1, "NY": 1})
+        self.assertEqual(self.counts("country"), {"USA": 2})
+
+    def test_rebuild_counts(self):
+        """
+        Test that the 'rebuild_facet_counts' command gives the counts maintained by the
+        signals.
+
+        Args:
+            self (FacetTest): Instance of the test case.
+
+        Raises:
+            AssertionError: If the rebuilt counts differ.
+
+        Returns:
+            None
+        """
+        maintained = self.counts("state"), self.counts("country")
+        FacetCount.objects.all().delete()
+        output = StringIO()
+        call_command("rebuild_facet_counts", stdout=output)
+        self.assertIn("Stored 3 facet values", output.getvalue())
+        self.assertEqual((self.counts("state"), self.counts("country")), maintained)
+
+    def test_filters_use_indexes(self):
+        """
+        Test that the query plan of each filter searches an address index instead of
+        scanning the table.
+
+        Args:
+            self (FacetTest): Instance of the test case.
+
+        Raises:
+            AssertionError: If a filter query does not use the expected index.
+
+        Returns:
+            None
+        """
+        expected = {
+            "state": "address_state_city_idx",
+            "city": "address_city_idx",
+            "zip_code": "address_zip_code_idx",
+            "country": "address_country_state_idx",
+        }
+        for name, index in expected.items():
+            params = {name: "10000" if name == "zip_code" else "X"}
+            lettings, _ = facets.filter_lettings(Letting.objects.all(), params)
+            self.assertIn(index, lettings.explain(), name)
+        lettings, _ = facets.filter_lettings(
+            Letting.objects.all(), {"state": "CA", "city": "X"}
+        )
+        self.assertIn("address_state_city_idx (state=? AND city=?)", lettings.explain())
+
+
+class GeoTest(TestCase):
+    """
+    Test case for the proximity search over the located lettings.
+
+    Methods:
+        setUp: Sets up the test environment.
+        test_distance: Tests the great-circle distance between two cities.
+        test_nearest: Tests that the nearest lettings are returned nearest first.
+        test_nearest_far_point: Tests that the search around a point far from every
+        letting stops growing.
+        test_index_follows_changes: Tests that the spatial index follows the saved and
+        deleted addresses.
+        test_geocode_command: Tests that the 'geocode_addresses' command locates the
+        addresses from a zip code centroids file.
+        test_nearby_view: Tests that the nearby view lists the nearest lettings.
+    """
+
+    def setUp(self):
+        self.lettings = {}
+        places = [
+            ("Paris", 75001, 48.8566, 2.3522),
+            ("Versailles", 78000, 48.8049, 2.1204),
+            ("Lyon", 69001, 45.7640, 4.8357),
+            ("Nowhere", 12345, None, None),
+        ]
+        for city, zip_code, latitude, longitude in places:
+            address = Address.objects.create(
+                number=1,
+                street="Test Street",
+                city=city,
+                state="FR",
+                zip_code=zip_code,
+                country_iso_code="FRA",
+                latitude=latitude,
+                longitude=longitude,
+            )
+            self.lettings[city] = Letting.objects.create(
+                address=address, title=f"Letting {city}"
+            )
+
+    def test_distance(self):
+        """
+        Test that the distance from Paris to Lyon is about 392 km.
+
+        Args:
+            self (GeoTest): Instance of the test case.
+
+        Raises:
+            AssertionError: If the distance is off by more than a kilometer.
+
+        Returns:
+            None
+        """
+        self.assertAlmostEqual(geo.distance_km(48.8566, 2.3522, 45.7640, 4.8357), 392, delta=1)
+
+    def test_nearest(self):
+        """
+        Test that the nearest lettings are ordered by distance, and that the lettings
+        without coordinates are never returned.
+
+        Args:
+            self (GeoTest): Instance of the test case.
+
+        Raises:
+            AssertionError: If the lettings or their order differ from the expected ones.
+
+        Returns:
+            None
+        """
+        nearest = geo.nearest(48.86, 2.35, 2)
+        self.assertEqual(
+            [letting.title for letting in nearest], ["Letting Paris", "Letting Versailles"]
+        )
+        self.assertLess(nearest[0].distance, 1)
+        nearest = geo.nearest(48.86, 2.35, 10)
+        self.assertEqual(
+            [letting.title for letting in nearest],
+            ["Letting Paris", "Letting Versailles", "Letting Lyon"],
+        )
+
+    def test_nearest_far_point(self):
+        """
+        Test that the search around a point far from every letting stops at
+        MAX_RADIUS_KM, with a query per bounding box, instead of reading every located
+        letting.
+
+        Args:
+            self (GeoTest): Instance of the test case.
+
+        Raises:
+            AssertionError: If a letting is returned, or the box grows further.
+
+        Returns:
+            None
+        """
+        with self.assertNumQueries(5):
+            self.assertEqual(geo.nearest(-33.87, 151.21, 10), [])
+        self.assertEqual(
+            [letting.title for letting in geo.nearest(41.39, 2.17, 10)],
+            ["Letting Lyon", "Letting Versailles", "Letting Paris"],
+        )
+
+    def test_index_follows_changes(self):
+        """
+        Test that an address losing its coordinates or deleted is no longer found.
+
+        Args:
+            self (GeoTest): Instance of the test case.
+
+        Raises:
+            AssertionError: If a search returns stale results.
+
+        Returns:
+            None
+        """
+        address = self.lettings["Paris"].address
+        address.latitude = address.longitude = None
+        address.save()
+        self.assertEqual(geo.nearest(48.86, 2.35, 1)[0].title, "Letting Versailles")
+        self.lettings["Versailles"].address.delete()
+        self.assertEqual(geo.nearest(48.86, 2.35, 1)[0].title, "Letting Lyon")
+
+    def test_geocode_command(self):
+        """
+        Test that the 'geocode_addresses' command reads a tab-separated Gazetteer file
+        and makes the located addresses searchable, and their cached pages outdated.
+
+        Args:
+            self (GeoTest): Instance of the test case.
+
+        Raises:
+            AssertionError: If the address is not located at the centroid of its zip
+            code, is not found by the proximity search, or its cached page is served.
+
+        Returns:
+            None
+        """
+        url = reverse("letting", args=[self.lettings["Nowhere"].id])
+        self.assertNotContains(self.client.get(url), "Lettings nearby")
+        with TemporaryDirectory() as directory:
+            path = os.path.join(directory, "zcta.txt")
+            with open(path, "w") as file:
+                file.write("GEOID\tALAND\tINTPTLAT\tINTPTLONG \n")
+                file.write("12345\t1000\t10.5\t-20.25\n")
+                file.write("99999\t1000\t11.5\t-21.25\n")
+            output = StringIO()
+            call_command("geocode_addresses", path, stdout=output)
+        self.assertIn("Located 1 addresses", output.getvalue())
+        address = self.lettings["Nowhere"].address
+        address.refresh_from_db()
+        self.assertEqual((address.latitude, address.longitude), (10.5, -20.25))
+        self.assertEqual(geo.nearest(10.5, -20.25, 1)[0].title, "Letting Nowhere")
+        self.assertContains(self.client.get(url), "Lettings nearby")
+
+    def test_nearby_view(self):
+        """
+        Test that the nearby view lists the nearest lettings with their distance, and
+        ignores an invalid point.
+
+        Args:
+            self (GeoTest): Instance of the test case.
+
+        Raises:
+            AssertionError: If the view does not list the expected lettings.
+
+        Returns:
+            None
+        """
+        url = reverse("lettings_nearby")
+        response = self.client.get(url, {"lat": "48.86", "lon": "2.35", "n": "1"})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            [letting.title for letting in response.context["lettings_list"]],
+            ["Letting Paris"],
+        )
+        response = self.client.get(url, {"lat": "north", "lon": "2.35"})
+        self.assertEqual(response.context["lettings_list"], [])
+
+
+class LettingApiTest(TestCase):
+    """
+    Test case for the JSON API of the lettings.
+
+    Methods:
+        setUp: Sets up the test environment.
+        test_detail_all_fields: Tests that a letting is returned with every field.
+        test_detail_sparse_fields: Tests that only the requested columns are loaded.
+        test_detail_errors: Tests the responses to unknown fields and lettings.
+        test_detail_conditional_fields: Tests that the fields are checked before the
+        conditional request and vary the ETag.
+        test_list_pagination: Tests that the list follows the keyset cursors.
+        test_batch: Tests that the batch endpoint fetches the lettings in one query.
+        test_ids_out_of_range: Tests that the ids overflowing the primary keys are
+        rejected.
+    """
+
+    def setUp(self):
+        self.lettings = []
+        for i in range(3):
+            address = Address.objects.create(
+                number=i,
+                street="Test Street",
+                city=f"City {i}",
+                state="TS",
+                zip_code=12345,
+                country_iso_code="TSC",
+            )
+            self.lettings.append(
+                Letting.objects.create(address=address, title=f"Letting {i}")
+            )
+
+    def test_detail_all_fields(self):
+        """
+        Test that a letting is returned with its address nested when no fields are
+        selected.
+
+        Args:
+            self (LettingApiTest): Instance of the test case.
+
+        Raises:
+            AssertionError: If the JSON differs from the letting.
+
+        Returns:
+            None
+        """
+        letting = self.lettings[0]
+        response = self.client.get(reverse("api_letting", args=[letting.id]))
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertEqual(data["id"], letting.id)
+        self.assertEqual(data["title"], "Letting 0")
+        self.assertEqual(data["address"]["city"], "City 0")
+        self.assertEqual(data["address"]["zip_code"], 12345)
+
+    def test_detail_sparse_fields(self):
+        """
+        Test that selecting the title only neither joins the address nor loads the
+        other columns.
+
+        Args:
+            self (LettingApiTest): Instance of the test case.
+
+        Raises:
+            AssertionError: If the response has other fields, or the query joins the
+            address table.
+
+        Returns:
+            None
+        """
+        url = reverse("api_letting", args=[self.lettings[0].id])
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(url, {"fields": "title"})
+        self.assertEqual(response.json(), {"title": "Letting 0"})
+        page_query = context.captured_queries[-1]["sql"]
+        self.assertNotIn("lettings_address", page_query)
+        self.assertNotIn("updated_at", page_query)
+        response = self.client.get(url, {"fields": "title,address.city"})
+        self.assertEqual(
+            response.json(), {"title": "Letting 0", "address": {"city": "City 0"}}
+        )
+
+    def test_detail_errors(self):
+        """
+        Test that an unknown field returns a 400 and an unknown letting a 404.
+
+        Args:
+            self (LettingApiTest): Instance of the test case.
+
+        Raises:
+            AssertionError: If the status codes differ.
+
+        Returns:
+            None
+        """
+        url = reverse("api_letting", args=[self.lettings[0].id])
+        response = self.client.get(url, {"fields": "title,address.secret"})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("address.secret", response.json()["error"])
+        response = self.client.get(reverse("api_letting", args=[999]))
+        self.assertEqual(response.status_code, 404)
+
+    def test_detail_conditional_fields(self):
+        """
+        Test that unknown fields return a 400 even with a matching If-None-Match, and
+        that the ETag depends on the selected fields.
+
+        Args:
+            self (LettingApiTest): Instance of the test case.
+
+        Raises:
+            AssertionError: If unknown fields return a 304, or if the ETag of other
+            fields matches.
+
+        Returns:
+            None
+        """
+        url = reverse("api_letting", args=[self.lettings[0].id])
+        fields = {"fields": "title,address.city"}
+        etag = self.client.get(url, fields)["ETag"]
+        response = self.client.get(url, fields, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        response = self.client.get(
+            url, {"fields": "title,address.secret"}, HTTP_IF_NONE_MATCH=etag
+        )
+        self.assertEqual(response.status_code, 400)
+        response = self.client.get(url, {"fields": "address.city"}, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response["ETag"], etag)
+
+    @override_settings(PAGINATION_PAGE_SIZE=2)
+    def test_list_pagination(self):
+        """
+        Test that the list returns the pages linked by the next and previous URLs.
+
+        Args:
+            self (LettingApiTest): Instance of the test case.
+
+        Raises:
+            AssertionError: If a page has unexpected lettings or links.
+
+        Returns:
+            None
+        """
+        response = self.client.get(reverse("api_lettings"), {"fields": "title"})
+        data = response.json()
+        self.assertEqual(
+            data["results"],
+            [
+                {"id": self.lettings[0].id, "title": "Letting 0"},
+                {"id": self.lettings[1].id, "title": "Letting 1"},
+            ],
+        )
+        self.assertIsNone(data["previous"])
+        data = self.client.get(data["next"]).json()
+        self.assertEqual([row["title"] for row in data["results"]], ["Letting 2"])
+        self.assertIsNone(data["next"])
+        self.assertIn("fields=title", data["previous"])
+
+    def test_batch(self):
+        """
+        Test that the batch endpoint returns the lettings in the order of the ids with
+        a single query, and reports the missing ids.
+
+        Args:
+            self (LettingApiTest): Instance of the test case.
+
+        Raises:
+            AssertionError: If the lettings, their order or the number of queries differ.
+
+        Returns:
+            None
+        """
+        ids = [self.lettings[2].id, 999, self.lettings[0].id]
+        with self.assertNumQueries(1):
+            response = self.client.get(
+                reverse("api_lettings_batch"),
+                {"ids": ",".join(map(str, ids)), "fields": "title"},
+            )
+        data = response.json()
+        self.assertEqual(
+            [row["title"] for row in data["results"]], ["Letting 2", "Letting 0"]
+        )
+        self.assertEqual(data["missing"], [999])
+        response = self.client.get(reverse("api_lettings_batch"), {"ids": "1,x"})
+        self.assertEqual(response.status_code, 400)
+
+    def test_ids_out_of_range(self):
+        """
+        Test that the ids overflowing the primary keys are rejected instead of failing
+        the request.
+
+        Args:
+            self (LettingApiTest): Instance of the test case.
+
+        Raises:
+            AssertionError: If the batch is not rejected with a 400, or a letting path
+            is not answered with a 404.
+
+        Returns:
+            None
+        """
+        huge_id = "9" * 30
+        response = self.client.get(reverse("api_lettings_batch"), {"ids": f"1,{huge_id}"})
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json()["error"], "The ids must be 64-bit integers.")
+        for url in (f"/api/lettings/{huge_id}/", f"/lettings/{huge_id}/"):
+            self.assertEqual(self.client.get(url).status_code, 404)
+
+
+class ImportTest(TestCase):
+    """
+    Test case for the 'import_lettings' management command.
+
+    Methods:
+        setUp: Sets up the test environment.
+        tearDown: Removes the temporary directory.
+        write: Writes a file in the temporary directory.
+        test_import_csv: Tests that the valid rows of a CSV file are imported and the
+        invalid ones, including negative numbers and non-finite coordinates, rejected.
+        test_import_jsonl: Tests the import of a JSONL file with nested addresses.
+        test_defer_indexes: Tests that the deferred indexes are recreated.
+    """
+
+    def setUp(self):
+        self.directory = TemporaryDirectory()
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def write(self, name, lines):
+        """
+        Write the given lines to a file of the temporary directory and return its path.
+        """
+        path = os.path.join(self.directory.name, name)
+        with open(path, "w", newline="") as file:
+            file.write("\n".join(lines) + "\n")
+        return path
+
+    def test_import_csv(self):
+        """
+        Test that the valid rows of a CSV file are imported and indexed, and that each
+        invalid row is written to the reject file with the error of its field.
+
+        Args:
+            self (ImportTest): Instance of the test case.
+
+        Raises:
+            AssertionError: If the imported lettings, the facet counts or the rejected
+            rows differ from the expected ones.
+
+        Returns:
+            None
+        """
+        header = "title,number,street,city,state,zip_code,country_iso_code,latitude,longitude"
+        path = self.write(
+            "lettings.csv",
+            [
+                header,
+                "Sunny Loft,7,Ocean Drive,San Francisco,CA,94110,USA,37.75,-122.41",
+                "Quiet Studio,8,Elm Street,Boston,MA,2101,USA,,",
+                "Bad State,9,Elm Street,Boston,M,2101,USA,,",
+                "Bad Zip,9,Elm Street,Boston,MA,123456,USA,,",
+                ",9,Elm Street,Boston,MA,2101,USA,,",
+                "Bad Number,nine,Elm Street,Boston,MA,2101,USA,,",
+                "Negative Number,-9,Elm Street,Boston,MA,2101,USA,,",
+                "Negative Zip,9,Elm Street,Boston,MA,-2101,USA,,",
+                "NaN Latitude,9,Elm Street,Boston,MA,2101,USA,nan,-71.06",
+                "Infinite Longitude,9,Elm Street,Boston,MA,2101,USA,42.36,inf",
+            ],
+        )
+        output = StringIO()
+        call_command("import_lettings", path, stdout=output)
+        self.assertIn("Imported 2 lettings", output.getvalue())
+        self.assertIn("rejected 8 rows", output.getvalue())
+        letting = Letting.objects.select_related("address").get(title="Sunny Loft")
+        self.assertEqual(letting.address.zip_code, 94110)
+        self.assertEqual(letting.address.latitude, 37.75)
+        self.assertIsNone(
+            Letting.objects.get(title="Quiet Studio").address.latitude
+        )
+        self.assertEqual(len(search.search("ocean")), 1)
+        self.assertEqual(geo.nearest(37.75, -122.41, 1)[0].title, "Sunny Loft")
+        self.assertEqual(
+            FacetCount.objects.get(facet="state", value="MA").count, 1
+        )
+
+        with open(os.path.join(self.directory.name, "lettings.rejects.csv")) as file:
+            rejects = list(csv.DictReader(file))
+        self.assertEqual(
+            [row["title"] for row in rejects],
+            [
+                "Bad State",
+                "Bad Zip",
+                "",
+                "Bad Number",
+                "Negative Number",
+                "Negative Zip",
+                "NaN Latitude",
+                "Infinite Longitude",
+            ],
+        )
+        self.assertIn("state:", rejects[0]["errors"])
+        self.assertIn("zip_code:", rejects[1]["errors"])
+        self.assertIn("title: This field cannot be blank.", rejects[2]["errors"])
+        self.assertIn("number: Invalid value 'nine'.", rejects[3]["errors"])
+        greater_than_zero = "Ensure this value is greater than or equal to 0."
+        self.assertIn(f"number: {greater_than_zero}", rejects[4]["errors"])
+        self.assertIn(f"zip_code: {greater_than_zero}", rejects[5]["errors"])
+        self.assertIn("latitude: Invalid value 'nan'.", rejects[6]["errors"])
+        self.assertIn("longitude: Invalid value 'inf'.", rejects[7]["errors"])
+
+    def test_import_jsonl(self):
+        """
+        Test that a JSONL file with nested addresses is imported, and that malformed
+        lines are rejected.
+
+        Args:
+            self (ImportTest): Instance of the test case.
+
+        Raises:
+            AssertionError: If the imported lettings or the rejected lines differ from
+            the expected ones.
+
+        Returns:
+            None
+        """
+        address = {
+            "number": 7,
+            "street": "Ocean Drive",
+            "city": "San Francisco",
+            "state": "CA",
+            "zip_code": 94110,
+            "country_iso_code": "USA",
+        }
+        path = self.write(
+            "lettings.jsonl",
+            [
+                json.dumps({"title": "Sunny Loft", "address": address}),
+                "{not json",
+                json.dumps({"title": "No Address"}),
+            ],
+        )
+        rejects_path = os.path.join(self.directory.name, "rejects.jsonl")
+        call_command(
+            "import_lettings", path, rejects=rejects_path, batch_size=2, stdout=StringIO()
+        )
+        self.assertEqual(
+            list(Letting.objects.values_list("title", flat=True)), ["Sunny Loft"]
+        )
+        with open(rejects_path) as file:
+            rejects = [json.loads(line) for line in file]
+        self.assertEqual(len(rejects), 2)
+        self.assertIn("Invalid JSON", rejects[0]["errors"][0])
+        self.assertEqual(rejects[1]["title"], "No Address")
+
+    def test_defer_indexes(self):
+        """
+        Test that the address indexes dropped by `--defer-indexes` are recreated.
+
+        Args:
+            self (ImportTest): Instance of the test case.
+
+        Raises:
+            AssertionError: If a filter query no longer uses its index.
+
+        Returns:
+            None
+        """
+        path = self.write(
+            "lettings.csv",
+            [
+                "title,number,street,city,state,zip_code,country_iso_code",
+                "Sunny Loft,7,Ocean Drive,San Francisco,CA,94110,USA",
+            ],
+        )
+        call_command("import_lettings", path, defer_indexes=True, stdout=StringIO())
+        self.assertEqual(Letting.objects.count(), 1)
+        lettings, _ = facets.filter_lettings(Letting.objects.all(), {"city": "X"})
+        self.assertIn("address_city_idx", lettings.explain())
+
+
+class LettingAdminTest(TestCase):
+    """
+    Test case for the admin interface of the lettings.
+
+    Methods:
+        setUp: Sets up the test environment.
+        create_lettings: Creates lettings with their address.
+        changelist_queries: Returns the number of queries of the lettings changelist.
+        test_changelist_queries_constant: Tests that the changelist does not query the
+        address of each letting.
+        test_search_uses_index: Tests that the search reads the full-text index.
+        test_address_search: Tests the indexed search of the addresses and its fallback.
+        test_change_form_raw_id: Tests that the address is picked with a raw-id widget.
+    """
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_superuser(
+            username="admin", email="admin@example.com", password="12345"
+        )
+        self.client.force_login(self.user)
+        self.create_lettings(0, 3)
+
+    def create_lettings(self, start, stop):
+        """
+        Create the lettings numbered from `start` to `stop`, each with its address.
+        """
+        for i in range(start, stop):
+            address = Address.objects.create(
+                number=i,
+                street="Test Street",
+                city="Test City",
+                state="TS",
+                zip_code=99999,
+                country_iso_code="TSC",
+            )
+            Letting.objects.create(address=address, title=f"Letting {i}")
+
+    def changelist_queries(self):
+        """
+        Request the lettings changelist and return the number of queries it executed.
+        """
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(reverse("admin:lettings_letting_changelist"))
+        self.assertEqual(response.status_code, 200)
+        return len(context.captured_queries)
+
+    def test_changelist_queries_constant(self):
+        """
+        Test that listing more lettings does not execute more queries.
+
+        Args:
+            self (LettingAdminTest): Instance of the test case.
+
+        Raises:
+            AssertionError: If the number of queries grows with the number of lettings.
+
+        Returns:
+            None
+        """
+        queries = self.changelist_queries()
+        self.create_lettings(3, 10)
+        self.assertEqual(self.changelist_queries(), queries)
+
+    def test_search_uses_index(self):
+        """
+        Test that the admin search finds the lettings through the full-text index.
+
+        Args:
+            self (LettingAdminTest): Instance of the test case.
+
+        Raises:
+            AssertionError: If the result differs or the index is not queried.
+
+        Returns:
+            None
+        """
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(
+                reverse("admin:lettings_letting_changelist"), {"q": "letting 1"}
+            )
+        self.assertEqual(
+            [letting.title for letting in response.context["cl"].result_list],
+            ["Letting 1"],
+        )
+        self.assertTrue(
+            any(search.FTS_TABLE in query["sql"] for query in context.captured_queries)
+        )
+
+    def test_address_search(self):
+        """
+        Test that the addresses are found by zip code or by a state in another case, and
+        that a term which is not a small number does not fail the search.
+
+        Args:
+            self (LettingAdminTest): Instance of the test case.
+
+        Raises:
+            AssertionError: If the search fails or returns other addresses.
+
+        Returns:
+            None
+        """
+        url = reverse("admin:lettings_address_changelist")
+        for term, count in (("99999", 3), ("ts", 3), ("\u00b2", 0), ("9" * 30, 0)):
+            response = self.client.get(url, {"q": term})
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(len(response.context["cl"].result_list), count)
+
+    def test_change_form_raw_id(self):
+        """
+        Test that the change form of a letting does not list every address in a select.
+
+        Args:
+            self (LettingAdminTest): Instance of the test case.
+
+        Raises:
+            AssertionError: If the address field is rendered as a select.
+
+        Returns:
+            None
+        """
+        letting = Letting.objects.first()
+        response = self.client.get(
+            reverse("admin:lettings_letting_change", args=[letting.pk])
+        )
+        self.assertContains(response, 'class="vForeignKeyRawIdAdminField"')
+        self.assertNotContains(response, '<select name="address"')
+
+
+class AsyncViewsTest(TestCase):
+    """
+    Test case for the asynchronous versions of the lettings views.
+
+    Methods:
+        setUp: Sets up the test environment.
+        test_index_matches_sync: Tests that the asynchronous index renders the same page.
+        test_letting_not_modified: Tests that a matching ETag returns a 304 without
+        running the page query.
+        test_letting_not_found: Tests that a missing letting raises Http404.
+    """
+
+    def setUp(self):
+        self.factory = RequestFactory()
+        address = Address.objects.create(
+            number=123,
+            street="Test Street",
+            city="Test City",
+            state="TS",
+            zip_code=12345,
+            country_iso_code="TSC",
+        )
+        self.letting = Letting.objects.create(address=address, title="Test Letting")
+
+    def test_index_matches_sync(self):
+        """
+        Test that the asynchronous index renders the page of the synchronous one.
+
+        Args:
+            self (AsyncViewsTest): Instance of the test case.
+
+        Raises:
+            AssertionError: If the responses differ.
+
+        Returns:
+            None
+        """
+        request = self.factory.get(reverse("lettings_index"))
+        response = async_to_sync(async_views.index)(request)
+        expected = views.index(self.factory.get(reverse("lettings_index")))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.content, expected.content)
+        self.assertEqual(response["ETag"], expected["ETag"])
+
+    def test_letting_not_modified(self):
+        """
+        Test that a matching If-None-Match returns a 304 with a single query.
+
+        Args:
+            self (AsyncViewsTest): Instance of the test case.
+
+        Raises:
+            AssertionError: If the response is not a 304 or runs the page query.
+
+        Returns:
+            None
+        """
+        url = reverse("letting", args=[self.letting.id])
+        response = async_to_sync(async_views.letting)(self.factory.get(url), self.letting.id)
+        self.assertContains(response, "Test Letting")
+        request = self.factory.get(url, HTTP_IF_NONE_MATCH=response["ETag"])
+        with self.assertNumQueries(1):
+            response = async_to_sync(async_views.letting)(request, self.letting.id)
+        self.assertEqual(response.status_code, 304)
+
+    def test_letting_not_found(self):
+        """
+        Test that the asynchronous letting view raises Http404 for a missing letting.
+
+        Args:
+            self (AsyncViewsTest): Instance of the test case.
+
+        Raises:
+            AssertionError: If Http404 is not raised.
+
+        Returns:
+            None
+        """
+        request = self.factory.get(reverse("letting", args=[999]))
+        with self.assertRaises(Http404):
+            async_to_sync(async_views.letting)(request, 999)
@@ -5,13 +5,20 @@ It imports the necessary modules and defines a 'urlpatterns' list which routes U
 
 Each URL is mapped to a view function in the 'views' module. When Django encounters an incoming
  URL, it checks the 'urlpatterns' list from top to bottom until it finds a matching pattern.
+The index and detail pages are served by the 'async_views' module when ASYNC_VIEWS is set.
 """
 
 
+from django.conf import settings
 from django.urls import path
-from .views import index, letting
+from oc_lettings_site import converters  # noqa: F401
+from . import async_views, views
+
+pages = async_views if settings.ASYNC_VIEWS else views
 
 urlpatterns = [
-    path("", index, name="lettings_index"),
-    path("<int:letting_id>/", letting, name="letting"),
+    path("", pages.index, name="lettings_index"),
+    path("search/", views.search, name="lettings_search"),
+    path("nearby/", views.nearby, name="lettings_nearby"),
+    path("<pk:letting_id>/", pages.letting, name="letting"),
 ]
@@ -6,39 +6,112 @@ The views receive an HttpRequest object, perform operations based on the request
 and return an HttpResponse object.
 """
 
+import sentry_sdk
+from django.conf import settings
 from django.shortcuts import render, get_object_or_404
-from django.http import Http404
+from django.http import Http404, HttpResponse
+from urllib.parse import urlencode
+from .facets import facet_counts, filter_lettings
+from .geo import nearest
 from .models import Letting
+from .search import search as search_lettings
 from logging import getLogger
+from oc_lettings_site import page_cache
+from oc_lettings_site.conditional import (
+    aggregate_validators,
+    conditional,
+    request_validators,
+    timestamp_validators,
+)
+from oc_lettings_site.database import public_view
+from oc_lettings_site.pagination import KeysetPaginator
+from oc_lettings_site.streaming import stream_list
 
 
 logger = getLogger(__name__)
 
+# The deepest page of the search results, so that its offset stays a small integer
+MAX_SEARCH_PAGE = 1000
 
+
+def index_validators(request):
+    """
+    Return the validators of the lettings index from the lettings and addresses aggregate.
+
+    The addresses are included because the filters and the facet counts depend on them.
+    """
+    return aggregate_validators(Letting.objects.all(), "updated_at", "address__updated_at")
+
+
+def letting_validators(request, letting_id):
+    """
+    Return the validators of a letting page from the letting and address timestamps.
+    """
+    timestamps = (
+        Letting.objects.filter(id=letting_id)
+        .values_list("updated_at", "address__updated_at")
+        .first()
+    )
+    return timestamp_validators(*(timestamps or ()))
+
+
+@public_view
+@conditional(index_validators)
 def index(request):
     """
-    Display a list of all lettings.
+    Display a page of lettings, or stream all of them when `stream` is set.
+
+    The lettings can be filtered on their address with the `state`, `city`, `zip_code`
+    and `country` parameters, and the page is selected with the `after` and `before`
+    keyset cursors.
 
     Args:
         request (HttpRequest): The request object.
 
     Returns:
-        HttpResponse: The response object, which includes a context containing a list
-         of all lettings.
+        HttpResponse: The response object, which includes a context containing a page
+         of lettings, or a StreamingHttpResponse rendering every letting.
+    """
+    return index_response(request)
+
+
+def index_response(request):
+    """
+    Build the response of the lettings index, for the synchronous and asynchronous views.
     """
     logger.info(
         "Client with IP %s accessed the lettings index page",
         request.META.get("REMOTE_ADDR"),
     )
-    lettings_list = Letting.objects.all()
-    context = {"lettings_list": lettings_list}
+    lettings, filters = filter_lettings(Letting.objects.only("title"), request.GET)
+    if request.GET.get("stream") and lettings.exists():
+        return stream_list(
+            request,
+            "lettings/index.html",
+            {"filters": filters},
+            lettings.order_by("pk"),
+            "lettings/letting_item.html",
+            "letting",
+        )
+    page = KeysetPaginator(lettings).page_from_request(request)
+    context = {
+        "lettings_list": page.object_list,
+        "page": page,
+        "facets": facet_counts(),
+        "filters": filters,
+        "filter_query": urlencode(filters),
+    }
     return render(request, "lettings/index.html", context)
 
 
+@public_view
+@conditional(letting_validators)
 def letting(request, letting_id):
     """
     Display a specific letting.
 
+    The rendered page is served from the page cache when it is available.
+
     Args:
         request (HttpRequest): The request object.
         letting_id (int): The ID of the letting to display.
@@ -50,8 +123,29 @@ def letting(request, letting_id):
     Raises:
         Http404: If no Letting exists with the given ID.
     """
+    return letting_response(request, letting_id)
+
+
+def letting_response(request, letting_id):
+    """
+    Build the response of a letting page, for the synchronous and asynchronous views.
+    """
+    cache_key = page_cache.letting_key(letting_id)
+    version, _ = request_validators(request, letting_validators, letting_id)
+    content = page_cache.get_page(cache_key, version)
+    if content is not None:
+        logger.info(
+            "Client with IP %s accessed the letting %s page",
+            request.META.get("REMOTE_ADDR"),
+            letting_id,
+        )
+        return HttpResponse(content)
+
     try:
-        letting = get_object_or_404(Letting, id=letting_id)
+        with sentry_sdk.start_span(op="db", description="letting lookup"):
+            letting = get_object_or_404(
+                Letting.objects.select_related("address"), id=letting_id
+            )
         logger.info(
             "Client with IP %s accessed the letting %s page",
             request.META.get("REMOTE_ADDR"),
@@ -70,4 +164,82 @@ def letting(request, letting_id):
         "title": letting.title,
         "address": letting.address,
     }
-    return render(request, "lettings/letting.html", context)
+    with sentry_sdk.start_span(op="template.render", description="lettings/letting.html"):
+        response = render(request, "lettings/letting.html", context)
+    page_cache.set_page(cache_key, version, response.content)
+    return response
+
+
+@public_view
+def search(request):
+    """
+    Display the lettings matching the `q` parameter, best matches first.
+
+    The title and every address field are searched, and the results are paginated with
+    the `page` parameter, up to MAX_SEARCH_PAGE.
+
+    Args:
+        request (HttpRequest): The request object.
+
+    Returns:
+        HttpResponse: The response object, which includes a context containing a page
+         of matching lettings.
+    """
+    query = request.GET.get("q", "").strip()
+    try:
+        page_number = min(max(1, int(request.GET.get("page", 1))), MAX_SEARCH_PAGE)
+    except ValueError:
+        page_number = 1
+    logger.info(
+        "Client with IP %s searched the lettings for %r",
+        request.META.get("REMOTE_ADDR"),
+        query,
+    )
+    per_page = settings.PAGINATION_PAGE_SIZE
+    results = search_lettings(
+        query, offset=(page_number - 1) * per_page, limit=per_page + 1
+    )
+    context = {
+        "query": query,
+        "lettings_list": results[:per_page],
+        "page_number": page_number,
+        "has_next": len(results) > per_page and page_number < MAX_SEARCH_PAGE,
+    }
+    return render(request, "lettings/search.html", context)
+
+
+@public_view
+def nearby(request):
+    """
+    Display the lettings closest to the point given by the `lat` and `lon` parameters.
+
+    The number of lettings is given by the `n` parameter, up to the page size.
+
+    Args:
+        request (HttpRequest): The request object.
+
+    Returns:
+        HttpResponse: The response object, which includes a context containing the
+         nearest lettings and their distance, or no lettings if the point is invalid.
+    """
+    try:
+        latitude = float(request.GET["lat"])
+        longitude = float(request.GET["lon"])
+        count = int(request.GET.get("n", 10))
+    except (KeyError, ValueError):
+        latitude = longitude = None
+        count = 0
+    valid = latitude is not None and -90 <= latitude <= 90 and -180 <= longitude <= 180
+    logger.info(
+        "Client with IP %s looked for the lettings near %s, %s",
+        request.META.get("REMOTE_ADDR"),
+        latitude,
+        longitude,
+    )
+    count = max(1, min(count, settings.PAGINATION_PAGE_SIZE))
+    context = {
+        "latitude": latitude,
+        "longitude": longitude,
+        "lettings_list": nearest(latitude, longitude, count) if valid else [],
+    }
+    return render(request, "lettings/nearby.html", context)
@@ -0,0 +1,131 @@
+"""
+This module provides the helpers shared by the admin classes of the project.
+
+'EstimatedCountPaginator' avoids the `COUNT(*)` of every changelist page on large
+tables: when the list is not filtered, the number of rows is estimated from the database
+statistics and the exact count is only run below ADMIN_EXACT_COUNT_LIMIT rows.
+
+'IndexedSearchMixin' runs the admin search as prefix searches written as range
+conditions, so that the index of each searched column is used instead of the
+`icontains` lookups, which scan the whole table. When nothing starts with the terms as
+typed, the `icontains` search of Django runs instead, so a search differing in case or
+matching inside the values still finds the rows.
+"""
+
+from functools import reduce
+from operator import or_
+
+from django.conf import settings
+from django.core.paginator import Paginator
+from django.db import connections
+from django.db.models import Q
+from django.utils.functional import cached_property
+
+
+# The greatest character, used as the upper bound of a prefix range
+MAX_CHARACTER = "\U0010ffff"
+# The most digits of a term searched in the integer columns, beyond which it overflows
+MAX_EXACT_DIGITS = 18
+
+
+def estimate_row_count(model, using="default"):
+    """
+    Return an estimate of the number of rows of a model table, without counting them.
+
+    On SQLite, the statistics gathered by ANALYZE are used when they exist, otherwise
+    the greatest rowid, which is read from the end of the table b-tree. On PostgreSQL,
+    the planner estimate of pg_class is used.
+
+    Args:
+        model (type): The model.
+        using (str): The alias of the database.
+
+    Returns:
+        int: The estimated number of rows, or None if the database gives no estimate.
+    """
+    connection = connections[using]
+    table = model._meta.db_table
+    with connection.cursor() as cursor:
+        if connection.vendor == "sqlite":
+            cursor.execute(
+                "SELECT name FROM sqlite_master WHERE type = 'table' AND name = 'sqlite_stat1'"
+            )
+            if cursor.fetchone():
+                cursor.execute(
+                    "SELECT stat FROM sqlite_stat1 WHERE tbl = %s AND idx IS NULL", [table]
+                )
+                row = cursor.fetchone()
+                if row:
+                    return int(row[0].split()[0])
+            cursor.execute(f"SELECT max(rowid) FROM {connection.ops.quote_name(table)}")
+            return cursor.fetchone()[0] or 0
+        if connection.vendor == "postgresql":
+            cursor.execute("SELECT reltuples FROM pg_class WHERE relname = %s", [table])
+            row = cursor.fetchone()
+            return int(row[0]) if row and row[0] >= 0 else None
+    return None
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    This paginator estimates the number of rows of the unfiltered large tables.
+    """
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        if hasattr(queryset, "query") and not queryset.query.where:
+            estimate = estimate_row_count(queryset.model, queryset.db)
+            if estimate is not None and estimate > settings.ADMIN_EXACT_COUNT_LIMIT:
+                return estimate
+        return super().count
+
+
+def prefix_condition(lookup, prefix):
+    """
+    Return the condition matching the values starting with a prefix, as an index range.
+
+    Unlike `startswith`, which SQLite runs as a case-insensitive LIKE, the range can be
+    read from the index of the column. The match is case-sensitive.
+
+    Args:
+        lookup (str): The lookup of the column.
+        prefix (str): The prefix.
+
+    Returns:
+        Q: The condition.
+    """
+    return Q(**{f"{lookup}__gte": prefix, f"{lookup}__lt": prefix + MAX_CHARACTER})
+
+
+class IndexedSearchMixin:
+    """
+    This mixin makes the admin search use the indexes of the searched columns.
+
+    Each term of the search must match one of `search_prefix_fields` by prefix, or one
+    of `search_exact_fields` exactly. If no row matches, the rows are searched with the
+    `search_fields` of the admin class, as by Django.
+
+    Attributes:
+        search_prefix_fields (tuple): The lookups of the indexed text columns.
+        search_exact_fields (tuple): The lookups of the indexed integer columns.
+    """
+
+    search_prefix_fields = ()
+    search_exact_fields = ()
+
+    def get_search_results(self, request, queryset, search_term):
+        terms = search_term.split()
+        if not terms:
+            return queryset, False
+        indexed = queryset
+        for term in terms:
+            conditions = [
+                prefix_condition(lookup, term) for lookup in self.search_prefix_fields
+            ]
+            if term.isdecimal() and len(term) <= MAX_EXACT_DIGITS:
+                conditions += [Q(**{lookup: int(term)}) for lookup in self.search_exact_fields]
+            indexed = indexed.filter(reduce(or_, conditions, Q(pk__in=[])))
+        if indexed.exists():
+            return indexed, False
+        return super().get_search_results(request, queryset, search_term)
@@ -0,0 +1,170 @@
+"""
+This module provides the helpers shared by the JSON API views of the project.
+
+The API exposes the same data as the HTML pages. Each endpoint declares the fields a
+client may request, as dotted paths such as 'address.city', and the `fields` parameter
+selects a subset of them. The selected paths become the column lookups of a `values()`
+query, so the unrequested columns are never loaded, a related table is only joined when
+one of its fields is requested, and no model instance is built for the rows. The flat
+rows are then nested following the dots of the paths.
+
+The detail views answer conditional requests with 'conditional_fields', which checks the
+`fields` parameter first and varies the ETag with the selected fields.
+"""
+
+from functools import wraps
+
+from django.http import JsonResponse
+
+from oc_lettings_site.conditional import conditional
+
+
+class FieldsError(ValueError):
+    """
+    This exception is raised when the `fields` parameter names an unknown field.
+    """
+
+
+def parse_fields(request, allowed, always=()):
+    """
+    Return the fields selected by the `fields` parameter of a request.
+
+    Args:
+        request (HttpRequest): The request object.
+        allowed (tuple): The dotted paths a client may request, all of them being
+         returned when the parameter is missing.
+        always (tuple): The paths returned whatever the parameter, e.g. the cursor.
+
+    Returns:
+        list: The selected dotted paths, without duplicates.
+
+    Raises:
+        FieldsError: If the parameter names a field which is not allowed.
+    """
+    requested = request.GET.get("fields")
+    if not requested:
+        return list(dict.fromkeys(list(always) + list(allowed)))
+    fields = [field.strip() for field in requested.split(",") if field.strip()]
+    unknown = [field for field in fields if field not in allowed]
+    if unknown:
+        raise FieldsError(f"Unknown fields: {', '.join(unknown)}.")
+    return list(dict.fromkeys(list(always) + fields))
+
+
+def conditional_fields(validators_func, allowed, always=()):
+    """
+    Decorate a detail view with its selected fields and the validators of its object.
+
+    The `fields` parameter is parsed before the conditional request is answered, so
+    unknown fields are refused with a 400 even when the If-None-Match matches. The
+    selected fields are then appended to the ETag, since the representation depends on
+    them, and stored in the `api_fields` attribute of the request for the view.
+
+    Args:
+        validators_func (callable): The function computing the validators of the
+         object, see 'oc_lettings_site.conditional.conditional'.
+        allowed (tuple): The dotted paths a client may request.
+        always (tuple): The paths returned whatever the parameter.
+
+    Returns:
+        callable: The decorator applying the fields and the validators to a view.
+    """
+
+    def validators(request, *args, **kwargs):
+        etag, last_modified = validators_func(request, *args, **kwargs)
+        if etag is not None:
+            # Not joined with commas, on which Django splits the If-None-Match header
+            etag = f"{etag}-{'+'.join(request.api_fields)}"
+        return etag, last_modified
+
+    def decorator(view):
+        conditional_view = conditional(validators)(view)
+
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            try:
+                request.api_fields = parse_fields(request, allowed, always)
+            except FieldsError as error:
+                return error_response(str(error))
+            return conditional_view(request, *args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+def lookups(fields):
+    """
+    Convert dotted paths to the lookups of a `values()` query.
+
+    Args:
+        fields (list): The dotted paths.
+
+    Returns:
+        list: The lookups, e.g. 'address__city' for 'address.city'.
+    """
+    return [field.replace(".", "__") for field in fields]
+
+
+def nest(row):
+    """
+    Nest a flat `values()` row following the separators of its lookups.
+
+    Args:
+        row (dict): The row, e.g. {'id': 1, 'address__city': 'Boston'}.
+
+    Returns:
+        dict: The nested row, e.g. {'id': 1, 'address': {'city': 'Boston'}}.
+    """
+    nested = {}
+    for lookup, value in row.items():
+        *parents, name = lookup.split("__")
+        target = nested
+        for parent in parents:
+            target = target.setdefault(parent, {})
+        target[name] = value
+    return nested
+
+
+def serialize(queryset, fields):
+    """
+    Return the selected fields of the rows of a queryset, nested.
+
+    Args:
+        queryset (QuerySet): The rows, not yet evaluated.
+        fields (list): The dotted paths to return.
+
+    Returns:
+        list: A dict for each row.
+    """
+    return [nest(row) for row in queryset.values(*lookups(fields))]
+
+
+def json_response(data, status=200):
+    """
+    Return compact JSON, without the whitespace of the default separators.
+
+    Args:
+        data: The JSON serializable data.
+        status (int): The status code of the response.
+
+    Returns:
+        JsonResponse: The response.
+    """
+    return JsonResponse(
+        data, status=status, safe=False, json_dumps_params={"separators": (",", ":")}
+    )
+
+
+def error_response(message, status=400):
+    """
+    Return a JSON error response.
+
+    Args:
+        message (str): The description of the error.
+        status (int): The status code of the response.
+
+    Returns:
+        JsonResponse: The response, with the message in its 'error' key.
+    """
+    return json_response({"error": message}, status=status)
@@ -8,6 +8,7 @@ Each Django application should have an apps.py module with a derived AppConfig c
 """
 
 from django.apps import AppConfig
+from django.db.backends.signals import connection_created
 
 
 class OCLettingsSiteConfig(AppConfig):
@@ -21,3 +22,17 @@ class OCLettingsSiteConfig(AppConfig):
     """
 
     name = "oc_lettings_site"
+
+    def ready(self):
+        """
+        Connect the receivers applying the SQLite pragmas to the new connections, timing
+        and logging their queries, and register the static assets check.
+        """
+        from . import staticfiles  # noqa: F401
+        from .database import configure_sqlite
+        from .metrics import instrument_connection
+        from .query_log import log_connection_queries
+
+        connection_created.connect(configure_sqlite)
+        connection_created.connect(instrument_connection)
+        connection_created.connect(log_connection_queries)
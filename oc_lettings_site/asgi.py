@@ -6,12 +6,22 @@ web apps and servers.
 This module sets the DJANGO_SETTINGS_MODULE environment variable to point to the Django
 project's settings and then gets the ASGI application instance.
 
-The application instance is used by the ASGI server to interact with the Django project.
+The application instance is used by the ASGI server to interact with the Django project,
+e.g. by the uvicorn workers of `GUNICORN_WORKER_CLASS=uvicorn.workers.UvicornWorker
+gunicorn --config gunicorn.conf.py`. It routes the lettings and profiles pages to their
+asynchronous views, and runs the synchronous code of each request in a thread of its
+own, see 'oc_lettings_site.asynchronous'.
 """
 
 import os
-from django.core.asgi import get_asgi_application
+
+import django
 
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "oc_lettings_site.settings")
+os.environ.setdefault("ASYNC_VIEWS", "true")
+
+django.setup(set_prefix=False)
+
+from oc_lettings_site.asynchronous import ASGIHandler  # noqa: E402
 
-application = get_asgi_application()
+application = ASGIHandler()
@@ -0,0 +1,129 @@
+"""
+This module contains the support of the ASGI deployment of the project.
+
+Under ASGI, a request goes through Django's middleware and views on the event loop of the
+server, so the server holds many slow clients with a coroutine each instead of a thread.
+A synchronous middleware would move the whole chain below it to a thread, so the
+middleware of the project derive from 'AsyncCapableMiddleware' and run in either mode.
+
+The ORM is synchronous, so the asynchronous views offload their queries with
+'sync_to_async'. By default, these calls share a single thread per process. The
+'ASGIHandler' below pins each request to one of ASGI_THREADS long-lived threads instead,
+so the requests run concurrently while each thread keeps its database connection for
+CONN_MAX_AGE. It also iterates the streaming responses in that thread, since their
+iterators query the database.
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+from itertools import cycle
+
+from asgiref.sync import (
+    SyncToAsync,
+    ThreadSensitiveContext,
+    iscoroutinefunction,
+    markcoroutinefunction,
+    sync_to_async,
+)
+from django.conf import settings
+from django.core.handlers.asgi import ASGIHandler as DjangoASGIHandler
+from whitenoise.middleware import WhiteNoiseMiddleware
+
+
+_END = object()
+
+
+class AsyncCapableMiddleware:
+    """
+    This base class lets a middleware run in the mode of the handler it wraps.
+
+    A subclass implements `__call__` for the synchronous mode and `__acall__` for the
+    asynchronous one, and `__call__` starts with `if self.async_mode: return
+    self.__acall__(request)`.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+
+class AsyncWhiteNoiseMiddleware(AsyncCapableMiddleware, WhiteNoiseMiddleware):
+    """
+    This middleware is WhiteNoise's, able to pass the requests which are not for a static
+    file on to an asynchronous handler.
+    """
+
+    def __init__(self, get_response=None, **kwargs):
+        WhiteNoiseMiddleware.__init__(self, get_response, **kwargs)
+        AsyncCapableMiddleware.__init__(self, get_response)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        return super().__call__(request)
+
+    async def __acall__(self, request):
+        if self.autorefresh:
+            static_file = await sync_to_async(self.find_file)(request.path_info)
+        else:
+            static_file = self.files.get(request.path_info)
+        if static_file is not None:
+            return await sync_to_async(self.serve)(static_file, request)
+        return await self.get_response(request)
+
+
+class ASGIHandler(DjangoASGIHandler):
+    """
+    This handler runs the synchronous code of each request in one of ASGI_THREADS threads.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.executors = cycle(
+            [
+                ThreadPoolExecutor(max_workers=1, thread_name_prefix="asgi")
+                for _ in range(settings.ASGI_THREADS)
+            ]
+        )
+
+    async def __call__(self, scope, receive, send):
+        async with ThreadSensitiveContext() as context:
+            # The thread-sensitive calls of the context run in the executor mapped to it,
+            # which is unmapped before the context would shut it down on exit
+            SyncToAsync.context_to_thread_executor[context] = next(self.executors)
+            try:
+                await super().__call__(scope, receive, send)
+            finally:
+                SyncToAsync.context_to_thread_executor.pop(context, None)
+
+    async def send_response(self, response, send):
+        if not response.streaming:
+            return await super().send_response(response, send)
+        headers = [
+            (str(header).encode("ascii"), str(value).encode("latin1"))
+            for header, value in response.items()
+        ]
+        headers.extend(
+            (b"Set-Cookie", cookie.output(header="").encode("ascii").strip())
+            for cookie in response.cookies.values()
+        )
+        await send(
+            {"type": "http.response.start", "status": response.status_code, "headers": headers}
+        )
+        # Django iterates the streaming content on the event loop, where the queries of
+        # the iterator are refused, so each part is produced in the thread of the request
+        next_part = sync_to_async(next)
+        iterator = iter(response)
+        while True:
+            part = await next_part(iterator, _END)
+            if part is _END:
+                break
+            for chunk, _ in self.chunk_bytes(part):
+                await send({"type": "http.response.body", "body": chunk, "more_body": True})
+        await send({"type": "http.response.body"})
+        # As Django does, which sends 'request_finished' and records the metrics
+        await sync_to_async(response.close)()
@@ -0,0 +1,131 @@
+"""
+This module provides the conditional GET support of the views of the project.
+
+Each view declares a validators function returning the ETag and the last modification
+date of the data it displays, computed from the 'updated_at' columns with a single
+query. Django's 'condition' decorator then answers If-None-Match and If-Modified-Since
+with a 304 before the view runs, so neither the page query nor the template rendering
+happen for a client holding an up-to-date copy. The validators of an asynchronous view
+are computed in a thread with 'sync_to_async', and the same headers are answered.
+"""
+
+from calendar import timegm
+from functools import wraps
+
+from asgiref.sync import iscoroutinefunction, sync_to_async
+from django.db.models import Count, Max
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+from django.views.decorators.http import condition
+
+
+def conditional(validators_func):
+    """
+    Decorate a view with the validators returned by `validators_func`.
+
+    `validators_func` receives the arguments of the view and returns an
+    `(etag, last_modified)` tuple, or `(None, None)` when the object does not exist.
+    It is called once per request, see 'request_validators'.
+
+    Args:
+        validators_func (callable): The function computing the validators.
+
+    Returns:
+        callable: The decorator applying the validators to a view.
+    """
+
+    def validators(request, *args, **kwargs):
+        return request_validators(request, validators_func, *args, **kwargs)
+
+    sync_decorator = condition(
+        etag_func=lambda *args, **kwargs: validators(*args, **kwargs)[0],
+        last_modified_func=lambda *args, **kwargs: validators(*args, **kwargs)[1],
+    )
+
+    def decorator(view):
+        if not iscoroutinefunction(view):
+            return sync_decorator(view)
+
+        @wraps(view)
+        async def wrapper(request, *args, **kwargs):
+            etag, last_modified = await sync_to_async(validators)(request, *args, **kwargs)
+            etag = quote_etag(etag) if etag is not None else None
+            last_modified = timegm(last_modified.utctimetuple()) if last_modified else None
+            response = get_conditional_response(
+                request, etag=etag, last_modified=last_modified
+            )
+            if response is None:
+                response = await view(request, *args, **kwargs)
+            if request.method in ("GET", "HEAD"):
+                if last_modified and not response.has_header("Last-Modified"):
+                    response["Last-Modified"] = http_date(last_modified)
+                if etag:
+                    response.setdefault("ETag", etag)
+            return response
+
+        return wrapper
+
+    return decorator
+
+
+def request_validators(request, validators_func, *args, **kwargs):
+    """
+    Return the validators of a request, computed by `validators_func` on the first call.
+
+    The views use them to version the pages they cache, without querying them again.
+
+    Args:
+        request (HttpRequest): The request.
+        validators_func (callable): The function computing the validators.
+        *args: The positional arguments of the view.
+        **kwargs: The keyword arguments of the view.
+
+    Returns:
+        tuple: The ETag and the last modification date.
+    """
+    if not hasattr(request, "_validators"):
+        request._validators = validators_func(request, *args, **kwargs)
+    return request._validators
+
+
+def timestamp_validators(*timestamps):
+    """
+    Return the validators of an object from the timestamps of the rows it is built from.
+
+    Args:
+        *timestamps (datetime): The 'updated_at' values of the rows.
+
+    Returns:
+        tuple: The ETag and the last modification date, or `(None, None)` if there are
+         no timestamps.
+    """
+    timestamps = [timestamp for timestamp in timestamps if timestamp is not None]
+    if not timestamps:
+        return None, None
+    last_modified = max(timestamps)
+    return str(last_modified.timestamp()), last_modified
+
+
+def aggregate_validators(queryset, *timestamp_fields):
+    """
+    Return the validators of a list page from the most recent row and the row count.
+
+    The count makes deletions change the ETag even when the most recent row is kept.
+
+    Args:
+        queryset (QuerySet): The rows displayed by the list page.
+        *timestamp_fields (str): The timestamps of the rows, 'updated_at' by default.
+         Lookups of related rows displayed by the page can be given too.
+
+    Returns:
+        tuple: The ETag and the last modification date.
+    """
+    timestamp_fields = timestamp_fields or ("updated_at",)
+    aggregate = queryset.aggregate(
+        count=Count("pk"), **{field: Max(field) for field in timestamp_fields}
+    )
+    timestamps = [aggregate[field] for field in timestamp_fields]
+    last_modified = max(filter(None, timestamps), default=None)
+    if last_modified is None:
+        return "empty", None
+    return f"{aggregate['count']}-{last_modified.timestamp()}", last_modified
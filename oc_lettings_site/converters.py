@@ -0,0 +1,28 @@
+"""
+This module defines the path converters of the URL configurations of the project.
+
+The 'pk' converter matches the primary keys in the paths, like the 'int' converter, but
+not the numbers beyond the range of the primary keys, which would overflow the queries
+of the view. Such paths are answered with a 404.
+"""
+
+from django.urls import register_converter
+from django.urls.converters import IntConverter
+
+from .pagination import MAX_PRIMARY_KEY
+
+
+class PrimaryKeyConverter(IntConverter):
+    """
+    This converter matches a non-negative integer in the range of the primary keys.
+    """
+
+    def to_python(self, value):
+        primary_key = int(value)
+        if primary_key > MAX_PRIMARY_KEY:
+            # A ValueError makes the pattern not match
+            raise ValueError(f"{value} is out of the range of the primary keys")
+        return primary_key
+
+
+register_converter(PrimaryKeyConverter, "pk")
@@ -1,9 +1,44 @@
 from django.apps.registry import Apps
-from typing import Any
-from django.db.models import ForeignKey
+from django.core.management.color import no_style
+from django.db import connections, transaction
+from django.db.migrations.loader import MigrationLoader
+from django.db.models import Max
+from hashlib import sha256
+from logging import getLogger
+from time import monotonic
+from typing import Any, Callable, Optional
 from sys import argv
 
 
+logger = getLogger(__name__)
+
+
+def field_mapping(OldModel, NewModel) -> list:
+    """
+    Return the columns to copy from one model to another, as (source, destination) pairs.
+
+    Relations, including OneToOneField, are copied by their id column, so the related
+    objects are never fetched.
+
+    Args:
+        OldModel: The model to copy data from.
+        NewModel: The model to copy data to.
+
+    Returns:
+        list: The attribute names of the source and destination columns.
+    """
+    new_fields = {field.name: field for field in NewModel._meta.concrete_fields}
+    mapping = []
+    for field in OldModel._meta.concrete_fields:
+        new_field = new_fields.get(field.name)
+        if new_field is None:
+            continue
+        if field.is_relation != new_field.is_relation:
+            continue
+        mapping.append((field.attname, new_field.attname))
+    return mapping
+
+
 def copy_model_data(
     apps: Apps,
     schema_editor: Any,
@@ -12,10 +47,17 @@ def copy_model_data(
     new_app_name: str,
     new_model_name: str,
     force_run: bool = False,
-) -> None:
+    batch_size: int = 1000,
+    start_after: Any = None,
+    progress: Optional[Callable[[int, Any, float], None]] = None,
+) -> int:
     """
     Copy data from one model to another, it can be useful when moving a model to anothher app
 
+    The source rows are streamed in primary key order and inserted with bulk_create in
+    batches of `batch_size`, each batch in its own transaction. Foreign keys are copied
+    by id without fetching the related objects.
+
     Args:
         apps: The Django Apps registry.
         schema_editor: The Django schema editor.
@@ -23,30 +65,160 @@ def copy_model_data(
         old_model_name: The name of the old model to copy data from.
         new_app_name: The name of the new app containing the destination model.
         new_model_name: The name of the new model to copy data to.
+        force_run: Copy the data even when running the tests.
+        batch_size: The number of rows read and inserted at once.
+        start_after: Only copy the rows whose primary key is greater.
+        progress: Called after each batch with the number of rows copied so far, the
+            last primary key copied and the elapsed seconds.
 
     Returns:
-        None
+        int: The number of rows copied.
 
     """
     if "test" in argv and not force_run:
-        return
-    OldModel = apps.get_model(old_app_name, old_model_name)
-    NewModel = apps.get_model(new_app_name, new_model_name)
-
-    for old_obj in OldModel.objects.all():
-        new_obj = NewModel()
-
-        for field in old_obj._meta.fields:
-            if isinstance(field, ForeignKey):
-                RelatedModel = apps.get_model(
-                    field.related_model._meta.app_label, field.related_model.__name__
-                )
-                related_obj = RelatedModel.objects.get(
-                    pk=getattr(old_obj, field.name).pk
-                )
-                setattr(new_obj, field.name, related_obj)
-
-            elif hasattr(new_obj, field.name):
-                setattr(new_obj, field.name, getattr(old_obj, field.name))
-
-        new_obj.save()
+        return 0
+    return copy_rows(
+        apps.get_model(old_app_name, old_model_name),
+        apps.get_model(new_app_name, new_model_name),
+        using=schema_editor.connection.alias,
+        batch_size=batch_size,
+        start_after=start_after,
+        progress=progress,
+    )
+
+
+def copy_rows(
+    OldModel,
+    NewModel,
+    using: str = "default",
+    batch_size: int = 1000,
+    start_after: Any = None,
+    progress: Optional[Callable[[int, Any, float], None]] = None,
+) -> int:
+    """
+    Copy the rows of a model to another in batches, see 'copy_model_data'.
+
+    Args:
+        OldModel: The model to copy data from.
+        NewModel: The model to copy data to.
+        using: The alias of the database holding both tables.
+        batch_size: The number of rows read and inserted at once.
+        start_after: Only copy the rows whose primary key is greater.
+        progress: Called after each batch with the number of rows copied so far, the
+            last primary key copied and the elapsed seconds.
+
+    Returns:
+        int: The number of rows copied.
+    """
+    connection = connections[using]
+    mapping = field_mapping(OldModel, NewModel)
+    source_columns = [source for source, _ in mapping]
+    destination_columns = [destination for _, destination in mapping]
+    pk_index = source_columns.index(OldModel._meta.pk.attname)
+
+    # Each batch is read to a list before it is committed, as a read left open by an
+    # iterator would fail with "database is locked" on SQLite once another copy has
+    # committed a batch
+    rows = (
+        OldModel._base_manager.using(connection.alias)
+        .order_by("pk")
+        .values_list(*source_columns)
+    )
+
+    copied = 0
+    start = monotonic()
+
+    def flush(batch):
+        nonlocal copied
+        with transaction.atomic(using=connection.alias):
+            NewModel._base_manager.using(connection.alias).bulk_create(
+                [NewModel(**dict(zip(destination_columns, row))) for row in batch],
+                batch_size=batch_size,
+            )
+        copied += len(batch)
+        elapsed = monotonic() - start
+        if progress is not None:
+            progress(copied, batch[-1][pk_index], elapsed)
+        logger.info(
+            "Copied %d %s rows to %s (%.0f rows/s)",
+            copied,
+            OldModel._meta.label,
+            NewModel._meta.label,
+            copied / elapsed if elapsed else 0,
+        )
+
+    last_pk = start_after
+    while True:
+        page = rows if last_pk is None else rows.filter(pk__gt=last_pk)
+        batch = list(page[:batch_size])
+        if not batch:
+            break
+        flush(batch)
+        last_pk = batch[-1][pk_index]
+
+    with connection.cursor() as cursor:
+        for sql in connection.ops.sequence_reset_sql(no_style(), [NewModel]):
+            cursor.execute(sql)
+    return copied
+
+
+def last_copied_pk(NewModel, using: str = "default") -> Any:
+    """
+    Return the primary key of the last row committed by an interrupted copy.
+
+    The rows are copied in primary key order and each batch commits atomically, so a
+    copy can resume after the greatest primary key of the destination table.
+
+    Args:
+        NewModel: The model the data is copied to.
+        using: The alias of the database.
+
+    Returns:
+        The greatest primary key of the destination table, or None if it is empty.
+    """
+    return NewModel._base_manager.using(using).aggregate(last_pk=Max("pk"))["last_pk"]
+
+
+def table_checksum(Model, columns: list, using: str = "default", batch_size: int = 1000):
+    """
+    Return the number of rows of a model and a checksum of the given columns.
+
+    The rows are streamed in primary key order, so the checksums of a source table and
+    of its copy are equal when every row was copied unchanged.
+
+    Args:
+        Model: The model to checksum.
+        columns: The attribute names of the columns to include.
+        using: The alias of the database.
+        batch_size: The number of rows read at once.
+
+    Returns:
+        tuple: The row count and the hexadecimal SHA-256 digest.
+    """
+    digest = sha256()
+    count = 0
+    rows = Model._base_manager.using(using).order_by("pk").values_list(*columns)
+    for row in rows.iterator(chunk_size=batch_size):
+        digest.update(repr(row).encode())
+        count += 1
+    return count, digest.hexdigest()
+
+
+def migration_state_apps(nodes: list, using: str = "default") -> Apps:
+    """
+    Return the app registry of the models as they were at the given migrations.
+
+    The apps which are not named in `nodes` are taken at their latest migration, so the
+    registry can hold both the models of an old app and their new version.
+
+    Args:
+        nodes: The (app_label, migration_name) pairs.
+        using: The alias of the database whose migration history is loaded.
+
+    Returns:
+        Apps: The app registry of the historical models.
+    """
+    loader = MigrationLoader(connections[using])
+    pinned = {app_label for app_label, _ in nodes}
+    leaves = [node for node in loader.graph.leaf_nodes() if node[0] not in pinned]
+    return loader.project_state(list(nodes) + leaves, at_end=True).apps
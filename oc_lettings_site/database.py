@@ -0,0 +1,221 @@
+"""
+This module contains the database tuning and routing layer of the project.
+
+The 'configure_sqlite' receiver applies the SQLITE_PRAGMAS setting to every new SQLite
+connection: WAL journaling lets the public pages read while the admin writes, and the
+cache, mmap and busy-timeout pragmas reduce the cost of each query. Combined with
+CONN_MAX_AGE, a connection and its page cache are reused across requests.
+
+The 'public_view' decorator marks the read-only views of the project. Each request to one
+of them picks a database among PUBLIC_READ_DATABASES, round-robin or least-loaded, and the
+'PublicViewRouter' sends its reads there. The admin and all writes use the default
+database, and a client which has just written is pinned to it for REPLICA_STICKY_SECONDS
+by the 'ReplicaStickinessMiddleware' so that it reads its own writes.
+
+A page cached by a view reading from a replica is stored with the validators read from
+that replica, see 'oc_lettings_site.page_cache'. A page rendered from a replica lagging
+behind a write is thus cached with the previous version, and replaced once the replica
+has received the write, instead of outliving the invalidation of the write.
+"""
+
+from contextvars import ContextVar
+from functools import wraps
+from itertools import count
+from threading import Lock
+from time import time
+
+from asgiref.sync import iscoroutinefunction
+from django.conf import settings
+from django.db import connections
+
+from .asynchronous import AsyncCapableMiddleware
+
+
+# Pragmas which change the database file and cannot run on a read-only connection
+WRITE_PRAGMAS = ("journal_mode", "synchronous")
+
+STICKY_COOKIE = "primary_until"
+
+_read_database = ContextVar("read_database", default=None)
+_pinned_to_primary = ContextVar("pinned_to_primary", default=False)
+_round_robin = count()
+_in_flight = {}
+_in_flight_lock = Lock()
+
+
+def configure_sqlite(sender, connection, **kwargs):
+    """
+    Apply the SQLITE_PRAGMAS setting to a new SQLite connection.
+
+    Args:
+        sender (type): The database wrapper class.
+        connection (DatabaseWrapper): The new connection.
+
+    Returns:
+        None
+    """
+    if connection.vendor != "sqlite":
+        return
+    read_only = connection.alias in settings.PUBLIC_READ_DATABASES
+    with connection.cursor() as cursor:
+        for pragma, value in settings.SQLITE_PRAGMAS.items():
+            if read_only and pragma in WRITE_PRAGMAS:
+                continue
+            cursor.execute(f"PRAGMA {pragma} = {value}")
+        if read_only:
+            cursor.execute("PRAGMA query_only = 1")
+
+
+def database_path(alias):
+    """
+    Return the path of the SQLite file of a database alias, without any URI syntax.
+
+    Args:
+        alias (str): The database alias.
+
+    Returns:
+        str: The path of the database file.
+    """
+    name = str(connections.databases[alias]["NAME"])
+    if name.startswith("file:"):
+        name = name[len("file:"):].split("?", 1)[0]
+    return name
+
+
+def select_read_database():
+    """
+    Return the database the next public view should read from.
+
+    Returns:
+        str: One of PUBLIC_READ_DATABASES, or None to read from the default database.
+    """
+    databases = settings.PUBLIC_READ_DATABASES
+    if not databases or _pinned_to_primary.get():
+        return None
+    if settings.REPLICA_SELECTION == "least_loaded":
+        with _in_flight_lock:
+            return min(databases, key=lambda alias: _in_flight.get(alias, 0))
+    return databases[next(_round_robin) % len(databases)]
+
+
+def public_view(view):
+    """
+    Mark a read-only public view, so that its reads go to one of PUBLIC_READ_DATABASES.
+
+    The anonymous reads of the view also skip the session and user middleware, see
+    'oc_lettings_site.middleware'. The view can be synchronous or asynchronous. The
+    selected database is held in a context variable, which 'sync_to_async' passes on to
+    the thread running the queries.
+
+    Args:
+        view (callable): The view function.
+
+    Returns:
+        callable: The decorated view.
+    """
+
+    def acquire():
+        alias = select_read_database()
+        if alias is None:
+            return alias, None
+        with _in_flight_lock:
+            _in_flight[alias] = _in_flight.get(alias, 0) + 1
+        return alias, _read_database.set(alias)
+
+    def release(alias, token):
+        if alias is None:
+            return
+        _read_database.reset(token)
+        with _in_flight_lock:
+            _in_flight[alias] -= 1
+
+    if iscoroutinefunction(view):
+
+        @wraps(view)
+        async def async_wrapper(request, *args, **kwargs):
+            alias, token = acquire()
+            try:
+                return await view(request, *args, **kwargs)
+            finally:
+                release(alias, token)
+
+        async_wrapper.public = True
+        return async_wrapper
+
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        alias, token = acquire()
+        try:
+            return view(request, *args, **kwargs)
+        finally:
+            release(alias, token)
+
+    wrapper.public = True
+    return wrapper
+
+
+class PublicViewRouter:
+    """
+    This database router sends the reads of the public views to the selected replica.
+
+    Everything else, including the admin and all writes, uses the default database.
+    """
+
+    def db_for_read(self, model, **hints):
+        return _read_database.get()
+
+    def db_for_write(self, model, **hints):
+        return None
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        if db in settings.PUBLIC_READ_DATABASES:
+            return False
+        return None
+
+
+class ReplicaStickinessMiddleware(AsyncCapableMiddleware):
+    """
+    This middleware pins a client which has just written to the default database.
+
+    A request with an unsafe method sets a cookie holding the time until which the
+    following requests of the client read from the default database, so that they are
+    not served by a replica which has not yet received the write.
+    """
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        token = _pinned_to_primary.set(self.pinned(request))
+        try:
+            response = self.get_response(request)
+        finally:
+            _pinned_to_primary.reset(token)
+        return self.process_response(request, response)
+
+    async def __acall__(self, request):
+        token = _pinned_to_primary.set(self.pinned(request))
+        try:
+            response = await self.get_response(request)
+        finally:
+            _pinned_to_primary.reset(token)
+        return self.process_response(request, response)
+
+    def pinned(self, request):
+        try:
+            return float(request.COOKIES.get(STICKY_COOKIE, 0)) > time()
+        except ValueError:
+            return False
+
+    def process_response(self, request, response):
+        if request.method not in ("GET", "HEAD", "OPTIONS", "TRACE"):
+            response.set_cookie(
+                STICKY_COOKIE,
+                str(time() + settings.REPLICA_STICKY_SECONDS),
+                max_age=settings.REPLICA_STICKY_SECONDS,
+                httponly=True,
+                samesite="Lax",
+            )
+        return response
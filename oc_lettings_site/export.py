@@ -0,0 +1,294 @@
+"""
+This module implements the streaming export of the lettings and profiles.
+
+The rows are read with a server-side iterator over a `values_list()` query which joins
+the related address or user, so no model instance is built and only one chunk of rows is
+held in memory at a time. They are written incrementally as CSV, JSONL or a compact
+columnar format, by the 'export_data' management command and by the admin actions.
+
+The columnar format is a file starting with COLUMNAR_MAGIC, followed by row groups of
+at most `row_group_size` rows. Each row group is a 4-byte big-endian length followed by
+a zlib-compressed JSON object holding the number of rows and the values of each column.
+A string column with few distinct values in a row group is dictionary encoded, like in
+Parquet. 'read_columnar' reads such a file back.
+"""
+
+import csv
+import json
+import struct
+import zlib
+from datetime import date, datetime
+from logging import getLogger
+from time import monotonic
+
+from django.apps import apps
+from django.conf import settings
+from django.http import StreamingHttpResponse
+
+from .api import lookups
+
+
+logger = getLogger(__name__)
+
+# The exported models and their columns, as dotted paths through the related models
+EXPORTS = {
+    "lettings": (
+        "lettings.Letting",
+        (
+            "id",
+            "title",
+            "address.number",
+            "address.street",
+            "address.city",
+            "address.state",
+            "address.zip_code",
+            "address.country_iso_code",
+            "address.latitude",
+            "address.longitude",
+            "updated_at",
+        ),
+    ),
+    "profiles": (
+        "profiles.Profile",
+        (
+            "id",
+            "user.username",
+            "user.first_name",
+            "user.last_name",
+            "user.email",
+            "favorite_city",
+            "updated_at",
+        ),
+    ),
+}
+FORMATS = ("csv", "jsonl", "columnar")
+COLUMNAR_MAGIC = b"OCLCOL1\n"
+
+
+def export_rows(queryset, columns, chunk_size=None):
+    """
+    Stream the given columns of the rows of a queryset, in primary key order.
+
+    Args:
+        queryset (QuerySet): The rows to export.
+        columns (tuple): The dotted paths of the columns.
+        chunk_size (int, optional): The number of rows fetched at once, the
+         STREAMING_CHUNK_SIZE setting by default.
+
+    Returns:
+        iterator: A tuple of values for each row.
+    """
+    chunk_size = chunk_size or settings.STREAMING_CHUNK_SIZE
+    rows = queryset.order_by("pk").values_list(*lookups(columns))
+    return rows.iterator(chunk_size=chunk_size)
+
+
+def _json_value(value):
+    """
+    Return the JSON representation of the values json does not serialize.
+    """
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+
+class _Echo:
+    """
+    This class is a file-like object returning what is written, for the csv writer.
+    """
+
+    def write(self, value):
+        return value
+
+
+def csv_chunks(rows, columns):
+    """
+    Yield the CSV lines of the rows, header first.
+
+    Args:
+        rows (iterable): The tuples of values.
+        columns (tuple): The names of the columns.
+
+    Yields:
+        str: A CSV line.
+    """
+    writer = csv.writer(_Echo())
+    yield writer.writerow(columns)
+    for row in rows:
+        yield writer.writerow(row)
+
+
+def jsonl_chunks(rows, columns):
+    """
+    Yield the JSON lines of the rows.
+
+    Args:
+        rows (iterable): The tuples of values.
+        columns (tuple): The names of the columns.
+
+    Yields:
+        str: A JSON object followed by a newline.
+    """
+    encoder = json.JSONEncoder(separators=(",", ":"), default=_json_value)
+    for row in rows:
+        yield encoder.encode(dict(zip(columns, row))) + "\n"
+
+
+def _encode_column(values):
+    """
+    Return the JSON value of a column of a row group, dictionary encoded if worthwhile.
+    """
+    if all(isinstance(value, str) for value in values):
+        dictionary = list(dict.fromkeys(values))
+        if len(dictionary) * 2 <= len(values):
+            positions = {value: index for index, value in enumerate(dictionary)}
+            return {"dictionary": dictionary, "indexes": [positions[v] for v in values]}
+    return values
+
+
+def columnar_chunks(rows, columns, row_group_size=10000):
+    """
+    Yield the bytes of the columnar file of the rows, see the module docstring.
+
+    Args:
+        rows (iterable): The tuples of values.
+        columns (tuple): The names of the columns.
+        row_group_size (int): The maximum number of rows of a row group.
+
+    Yields:
+        bytes: The header, then each compressed row group.
+    """
+    yield COLUMNAR_MAGIC
+    encoder = json.JSONEncoder(separators=(",", ":"), default=_json_value)
+    group = []
+
+    def encode(group):
+        values = {
+            name: _encode_column(list(column))
+            for name, column in zip(columns, zip(*group))
+        }
+        payload = zlib.compress(
+            encoder.encode({"rows": len(group), "columns": values}).encode()
+        )
+        return struct.pack(">I", len(payload)) + payload
+
+    for row in rows:
+        group.append(row)
+        if len(group) >= row_group_size:
+            yield encode(group)
+            group = []
+    if group:
+        yield encode(group)
+
+
+def read_columnar(file):
+    """
+    Read a columnar file written by 'columnar_chunks'.
+
+    Args:
+        file (file): The file, opened in binary mode.
+
+    Yields:
+        dict: The values of each column of a row group.
+
+    Raises:
+        ValueError: If the file does not start with COLUMNAR_MAGIC.
+    """
+    if file.read(len(COLUMNAR_MAGIC)) != COLUMNAR_MAGIC:
+        raise ValueError("Not a columnar export file.")
+    while True:
+        size = file.read(4)
+        if not size:
+            return
+        group = json.loads(zlib.decompress(file.read(struct.unpack(">I", size)[0])))
+        yield {
+            name: [values["dictionary"][index] for index in values["indexes"]]
+            if isinstance(values, dict)
+            else values
+            for name, values in group["columns"].items()
+        }
+
+
+CHUNK_WRITERS = {"csv": csv_chunks, "jsonl": jsonl_chunks, "columnar": columnar_chunks}
+
+
+class ThroughputCounter:
+    """
+    This class counts the rows passing through an iterator and reports the throughput.
+
+    Attributes:
+        count (int): The number of rows read so far.
+    """
+
+    def __init__(self, rows):
+        self.rows = rows
+        self.count = 0
+        self.start = monotonic()
+
+    def __iter__(self):
+        for row in self.rows:
+            self.count += 1
+            yield row
+
+    @property
+    def elapsed(self):
+        """
+        Return the seconds elapsed since the counter was created.
+        """
+        return monotonic() - self.start
+
+    def report(self):
+        """
+        Return a summary of the number of rows, the duration and the throughput.
+        """
+        elapsed = self.elapsed
+        rate = self.count / elapsed if elapsed else 0
+        return f"Exported {self.count} rows in {elapsed:.1f} s ({rate:.0f} rows/s)"
+
+
+def export_action(export_name, format):
+    """
+    Return an admin action streaming the selected rows in the given format.
+
+    Args:
+        export_name (str): The key of the export in EXPORTS.
+        format (str): 'csv' or 'jsonl'.
+
+    Returns:
+        callable: The admin action.
+    """
+    _, columns = EXPORTS[export_name]
+    content_type = {"csv": "text/csv", "jsonl": "application/x-ndjson"}[format]
+
+    def action(modeladmin, request, queryset):
+        counter = ThroughputCounter(export_rows(queryset, columns))
+
+        def chunks():
+            yield from CHUNK_WRITERS[format](counter, columns)
+            logger.info(
+                "User %s: %s of %s", request.user, counter.report(), export_name
+            )
+
+        response = StreamingHttpResponse(chunks(), content_type=content_type)
+        response["Content-Disposition"] = (
+            f'attachment; filename="{export_name}.{format}"'
+        )
+        return response
+
+    action.__name__ = f"export_{format}"
+    action.short_description = f"Export the selected rows as {format.upper()}"
+    return action
+
+
+def export_queryset(export_name):
+    """
+    Return the queryset of all the rows of an export.
+
+    Args:
+        export_name (str): The key of the export in EXPORTS.
+
+    Returns:
+        QuerySet: The rows of the exported model.
+    """
+    model_label, _ = EXPORTS[export_name]
+    return apps.get_model(model_label)._default_manager.all()
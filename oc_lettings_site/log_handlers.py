@@ -0,0 +1,178 @@
+"""
+This module defines the non-blocking logging handler of the project.
+
+The 'QueueFileHandler' formats a record in the request thread and puts it on a bounded
+in-memory queue; a background thread drains the queue in batches, writes each batch to a
+rotating log file and flushes it once. Request latency is therefore decoupled from the
+disk writes and from the lock of the file handler. When the queue is full the record is
+dropped and counted instead of blocking the request.
+
+The gunicorn workers append to the same file, so they must not rotate it themselves:
+two workers renaming it at once would lose records. Under gunicorn, LOG_MAX_BYTES is
+0 and the file is rotated by logrotate, or any tool moving it aside; each handler opens
+the file again once it has been moved or removed, like the 'WatchedFileHandler'.
+"""
+
+import atexit
+import logging
+import os
+from logging.handlers import QueueHandler, RotatingFileHandler
+from queue import Empty, Full, Queue
+from threading import Lock, Thread
+
+
+_STOP = object()
+
+
+class BatchRotatingFileHandler(RotatingFileHandler):
+    """
+    This class is a rotating file handler able to write a batch of records with one flush.
+
+    The file is opened again when it has been moved or removed since it was opened. It is
+    never rotated by the handler when `maxBytes` is 0.
+    """
+
+    def emit_batch(self, records):
+        """
+        Write the given records to the log file, rotating it when needed, then flush it.
+
+        Args:
+            records (list): The log records to write.
+
+        Returns:
+            None
+        """
+        with self.lock:
+            try:
+                self._close_if_moved()
+                if self.stream is None:
+                    self.stream = self._open()
+                for record in records:
+                    if self.shouldRollover(record):
+                        self.doRollover()
+                    self.stream.write(self.format(record) + self.terminator)
+                self.stream.flush()
+            except Exception:
+                self.handleError(records[-1])
+
+    def _close_if_moved(self):
+        """
+        Close the stream if its file is no longer at the path of the log, e.g. after
+        logrotate renamed it, so that the next write opens a new one.
+        """
+        if self.stream is None:
+            return
+        try:
+            current = os.stat(self.baseFilename)
+        except FileNotFoundError:
+            current = None
+        opened = os.fstat(self.stream.fileno())
+        if current is None or (current.st_dev, current.st_ino) != (opened.st_dev, opened.st_ino):
+            self.stream.close()
+            self.stream = None
+
+
+class QueueFileHandler(QueueHandler):
+    """
+    This class is a logging handler writing to a rotating file from a background thread.
+
+    Attributes:
+        dropped (int): The number of records dropped because the queue was full.
+        target (BatchRotatingFileHandler): The handler writing the batches to the file.
+    """
+
+    def __init__(
+        self,
+        filename,
+        max_queue_size=10000,
+        batch_size=256,
+        max_bytes=10 * 1024 * 1024,
+        backup_count=5,
+    ):
+        super().__init__(Queue(max_queue_size))
+        self.batch_size = batch_size
+        self.dropped = 0
+        self._reported_dropped = 0
+        self._dropped_lock = Lock()
+        self.target = BatchRotatingFileHandler(
+            filename, maxBytes=max_bytes, backupCount=backup_count, delay=True
+        )
+        self._start()
+        atexit.register(self.close)
+        if hasattr(os, "register_at_fork"):
+            os.register_at_fork(after_in_child=self._restart)
+
+    def _start(self):
+        """
+        Start the thread draining the queue.
+        """
+        self._thread = Thread(target=self._drain, name="QueueFileHandler", daemon=True)
+        self._thread.start()
+
+    def _restart(self):
+        """
+        Start a new queue and thread in a process forked by gunicorn, as threads do not
+        survive a fork.
+        """
+        self.queue = Queue(self.queue.maxsize)
+        self._dropped_lock = Lock()
+        self._start()
+
+    def enqueue(self, record):
+        """
+        Put a record on the queue, dropping it if the queue is full.
+        """
+        try:
+            self.queue.put_nowait(record)
+        except Full:
+            with self._dropped_lock:
+                self.dropped += 1
+
+    def _drain(self):
+        """
+        Write the queued records to the file in batches until the handler is closed.
+        """
+        while True:
+            batch = [self.queue.get()]
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self.queue.get_nowait())
+                except Empty:
+                    break
+            stop = _STOP in batch
+            records = [record for record in batch if record is not _STOP]
+            report = self._dropped_report()
+            if report is not None:
+                records.append(report)
+            if records:
+                self.target.emit_batch(records)
+            if stop:
+                return
+
+    def _dropped_report(self):
+        """
+        Return a record reporting the records dropped since the last report, if any.
+        """
+        with self._dropped_lock:
+            dropped = self.dropped - self._reported_dropped
+            self._reported_dropped = self.dropped
+        if not dropped:
+            return None
+        return logging.makeLogRecord(
+            {
+                "name": __name__,
+                "levelno": logging.WARNING,
+                "levelname": "WARNING",
+                "msg": f"{dropped} log records dropped, the log queue was full",
+            }
+        )
+
+    def close(self):
+        """
+        Write the remaining queued records, then close the log file.
+        """
+        if self._thread.is_alive():
+            self.queue.put(_STOP)
+            self._thread.join()
+        self.target.close()
+        super().close()
@@ -0,0 +1,55 @@
+"""
+This module defines the 'build_css' management command.
+
+It writes the purged and the critical stylesheets built from the stylesheet of the theme
+next to it, see 'oc_lettings_site.stylesheets', and reports their sizes. It runs before
+`collectstatic`, and with `--check` fails if the written stylesheets are out of date, as
+after a change of the templates.
+"""
+
+import gzip
+import os
+
+from django.contrib.staticfiles import finders
+from django.core.management.base import BaseCommand, CommandError
+
+from oc_lettings_site.stylesheets import SOURCE, build, read_static
+
+
+class Command(BaseCommand):
+    help = "Build the purged and the critical stylesheets from the stylesheet of the theme."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--check",
+            action="store_true",
+            help="Fail if the written stylesheets differ from the built ones.",
+        )
+
+    def handle(self, *args, check, **options):
+        directory = os.path.dirname(os.path.dirname(finders.find(SOURCE)))
+        self.report(SOURCE, read_static(SOURCE))
+        outdated = []
+        for path, content in build().items():
+            self.report(path, content)
+            filename = os.path.join(directory, *path.split("/"))
+            if not check:
+                with open(filename, "w", encoding="utf-8") as file:
+                    file.write(content)
+            elif not os.path.exists(filename):
+                outdated.append(path)
+            else:
+                with open(filename, encoding="utf-8") as file:
+                    if file.read() != content:
+                        outdated.append(path)
+        if outdated:
+            raise CommandError(
+                f"{', '.join(outdated)} out of date, run 'manage.py build_css' to rebuild."
+            )
+
+    def report(self, path, content):
+        data = content.encode("utf-8")
+        compressed = gzip.compress(data)
+        self.stdout.write(
+            f"{path:<24} {len(data) / 1024:8.1f} KB, {len(compressed) / 1024:6.1f} KB gzipped"
+        )
@@ -0,0 +1,199 @@
+"""
+This module defines the 'copy_model_data' management command.
+
+It copies the rows of models to other models, typically when moving a model to another
+app, with the batched engine of 'oc_lettings_site.data_migration_utils'. Each batch is
+committed with the rows it inserts, so an interrupted copy resumes after the last
+committed primary key instead of starting over. Models which do not depend on each
+other are copied in parallel, and the row counts and checksums of the source and
+destination tables are compared at the end.
+
+The models are looked up in the installed apps, or as they were at the migrations given
+with `--state`, e.g. `--state oc_lettings_site.0002_auto_20240518_1512` for the models
+removed from 'oc_lettings_site' once they were moved to 'lettings' and 'profiles'.
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+
+from django.apps import apps
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections
+
+from oc_lettings_site.data_migration_utils import (
+    copy_rows,
+    field_mapping,
+    last_copied_pk,
+    migration_state_apps,
+    table_checksum,
+)
+
+
+def dependency_waves(pairs):
+    """
+    Group the (source, destination) model pairs in waves which can be copied in parallel.
+
+    A pair is placed after the pairs whose destination model it has a relation to.
+
+    Args:
+        pairs (list): The (source model, destination model) pairs.
+
+    Returns:
+        list: The waves, each a list of pairs.
+
+    Raises:
+        CommandError: If the relations between the destination models form a cycle.
+    """
+    destinations = {NewModel for _, NewModel in pairs}
+    remaining = list(pairs)
+    done = set()
+    waves = []
+    while remaining:
+        wave = [
+            (OldModel, NewModel)
+            for OldModel, NewModel in remaining
+            if all(
+                field.related_model in done or field.related_model is NewModel
+                for field in NewModel._meta.concrete_fields
+                if field.is_relation and field.related_model in destinations
+            )
+        ]
+        if not wave:
+            raise CommandError("The models to copy have circular relations.")
+        waves.append(wave)
+        done.update(NewModel for _, NewModel in wave)
+        remaining = [pair for pair in remaining if pair not in wave]
+    return waves
+
+
+class Command(BaseCommand):
+    help = (
+        "Copy the rows of models to other models, e.g. "
+        "'copy_model_data old_app.Letting:new_app.Letting'."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "pairs",
+            nargs="+",
+            metavar="source:destination",
+            help="The source and destination models, as app_label.ModelName.",
+        )
+        parser.add_argument(
+            "--state",
+            action="append",
+            default=[],
+            metavar="app_label.migration_name",
+            help="Look the models of an app up as they were at this migration.",
+        )
+        parser.add_argument("--batch-size", type=int, default=1000)
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=4,
+            help="The number of models copied in parallel.",
+        )
+        parser.add_argument(
+            "--database",
+            default=DEFAULT_DB_ALIAS,
+            help="The database holding the source and destination tables.",
+        )
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Only report the number of rows left to copy.",
+        )
+        parser.add_argument(
+            "--no-verify",
+            action="store_true",
+            help="Skip the comparison of the row counts and checksums.",
+        )
+
+    def handle(self, *args, **options):
+        using = options["database"]
+        registry = apps
+        if options["state"]:
+            nodes = [tuple(state.split(".", 1)) for state in options["state"]]
+            registry = migration_state_apps(nodes, using)
+        pairs = [self.parse_pair(registry, pair) for pair in options["pairs"]]
+        batch_size = options["batch_size"]
+
+        if options["dry_run"]:
+            for OldModel, NewModel in pairs:
+                self.stdout.write(
+                    f"{OldModel._meta.label} -> {NewModel._meta.label}: "
+                    f"{self.rows_left(OldModel, NewModel, using)} rows to copy"
+                )
+            return
+
+        for wave in dependency_waves(pairs):
+            with ThreadPoolExecutor(max_workers=options["workers"]) as executor:
+                futures = [
+                    executor.submit(self.copy, OldModel, NewModel, using, batch_size)
+                    for OldModel, NewModel in wave
+                ]
+                for future in futures:
+                    future.result()
+
+        if not options["no_verify"]:
+            self.verify(pairs, using, batch_size)
+
+    def parse_pair(self, registry, pair):
+        try:
+            source, destination = pair.split(":")
+            return registry.get_model(source), registry.get_model(destination)
+        except (ValueError, LookupError) as error:
+            raise CommandError(f"Invalid model pair '{pair}': {error}")
+
+    def rows_left(self, OldModel, NewModel, using):
+        rows = OldModel._base_manager.using(using)
+        last_pk = last_copied_pk(NewModel, using)
+        if last_pk is not None:
+            rows = rows.filter(pk__gt=last_pk)
+        return rows.count()
+
+    def copy(self, OldModel, NewModel, using, batch_size):
+        label = f"{OldModel._meta.label} -> {NewModel._meta.label}"
+        try:
+            last_pk = last_copied_pk(NewModel, using)
+            if last_pk is not None:
+                self.stdout.write(f"{label}: resuming after primary key {last_pk}")
+
+            def progress(copied, pk, elapsed):
+                self.stdout.write(
+                    f"{label}: {copied} rows copied, last primary key {pk} "
+                    f"({copied / elapsed if elapsed else 0:.0f} rows/s)"
+                )
+
+            copied = copy_rows(
+                OldModel,
+                NewModel,
+                using=using,
+                batch_size=batch_size,
+                start_after=last_pk,
+                progress=progress,
+            )
+            self.stdout.write(f"{label}: done, {copied} rows copied")
+        finally:
+            connections[using].close()
+
+    def verify(self, pairs, using, batch_size):
+        failures = []
+        for OldModel, NewModel in pairs:
+            mapping = field_mapping(OldModel, NewModel)
+            source = table_checksum(
+                OldModel, [column for column, _ in mapping], using, batch_size
+            )
+            destination = table_checksum(
+                NewModel, [column for _, column in mapping], using, batch_size
+            )
+            label = f"{OldModel._meta.label} -> {NewModel._meta.label}"
+            if source == destination:
+                self.stdout.write(f"{label}: verified {source[0]} rows, checksum {source[1]}")
+            else:
+                failures.append(label)
+                self.stderr.write(
+                    f"{label}: mismatch, source {source[0]} rows {source[1]}, "
+                    f"destination {destination[0]} rows {destination[1]}"
+                )
+        if failures:
+            raise CommandError(f"Verification failed for {', '.join(failures)}.")
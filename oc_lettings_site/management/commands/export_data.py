@@ -0,0 +1,59 @@
+"""
+This module defines the 'export_data' management command.
+
+It streams the lettings or the profiles with their related rows to a CSV, JSONL or
+columnar file with constant memory, and reports the throughput, see
+'oc_lettings_site.export'. Unlike `dumpdata`, it never loads the whole table.
+"""
+
+import sys
+
+from django.core.management.base import BaseCommand
+from django.db import DEFAULT_DB_ALIAS
+
+from oc_lettings_site.export import (
+    CHUNK_WRITERS,
+    EXPORTS,
+    FORMATS,
+    ThroughputCounter,
+    export_queryset,
+    export_rows,
+)
+
+
+class Command(BaseCommand):
+    help = "Stream the lettings or the profiles to a CSV, JSONL or columnar file."
+
+    def add_arguments(self, parser):
+        parser.add_argument("export", choices=sorted(EXPORTS))
+        parser.add_argument("--format", choices=FORMATS, default="csv")
+        parser.add_argument(
+            "--output",
+            default="-",
+            help="The file to write, the standard output by default.",
+        )
+        parser.add_argument("--chunk-size", type=int, default=None)
+        parser.add_argument("--database", default=DEFAULT_DB_ALIAS)
+
+    def handle(self, *args, export, format, output, chunk_size, database, **options):
+        _, columns = EXPORTS[export]
+        queryset = export_queryset(export).using(database)
+        counter = ThroughputCounter(export_rows(queryset, columns, chunk_size))
+        chunks = CHUNK_WRITERS[format](counter, columns)
+        if output != "-":
+            binary = format == "columnar"
+            with open(
+                output,
+                "wb" if binary else "w",
+                encoding=None if binary else "utf-8",
+                newline=None if binary else "",
+            ) as file:
+                for chunk in chunks:
+                    file.write(chunk)
+        elif format == "columnar":
+            for chunk in chunks:
+                sys.stdout.buffer.write(chunk)
+        else:
+            for chunk in chunks:
+                self.stdout.write(chunk, ending="")
+        self.stderr.write(f"{counter.report()} of {export}")
@@ -0,0 +1,41 @@
+"""
+This module defines the 'query_log' management command.
+
+It switches the slow-query log and the SQL summary of the requests on or off for all
+the running workers, by creating or removing the QUERY_LOG_SWITCH_FILE, see
+'oc_lettings_site.query_log'. Without argument, it reports whether the log is on.
+"""
+
+import os
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from oc_lettings_site.query_log import forget_switch, query_log_enabled
+
+
+class Command(BaseCommand):
+    help = "Switch the query log of the running server on or off, or report its state."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "state",
+            nargs="?",
+            choices=("on", "off"),
+            help="Switch the query log on or off.",
+        )
+
+    def handle(self, *args, state, **options):
+        path = settings.QUERY_LOG_SWITCH_FILE
+        if state == "on":
+            with open(path, "a"):
+                pass
+        elif state == "off" and os.path.exists(path):
+            os.remove(path)
+        forget_switch()
+        if settings.QUERY_LOG:
+            self.stdout.write("The query log is on, as the QUERY_LOG setting is set.")
+        elif query_log_enabled():
+            self.stdout.write(f"The query log is on, until {path} is removed.")
+        else:
+            self.stdout.write("The query log is off.")
@@ -0,0 +1,71 @@
+"""
+This module defines the 'replicate_database' management command.
+
+It copies the default SQLite database to the replica files of PUBLIC_READ_DATABASES with
+the SQLite online backup API, once or every `--interval` seconds, so that the replicas
+can be tested locally. The copy is made in place, so that the persistent read-only
+connections of the running server see the new content.
+"""
+
+import sqlite3
+from time import monotonic, sleep
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from oc_lettings_site.database import database_path
+
+
+def replicate(source_path, target_path, busy_timeout=5000):
+    """
+    Copy the SQLite database at `source_path` to `target_path`.
+
+    Args:
+        source_path (str): The path of the database to copy.
+        target_path (str): The path of the replica, created if it does not exist.
+        busy_timeout (int): Milliseconds to wait for the readers of the replica.
+
+    Returns:
+        None
+    """
+    source = sqlite3.connect(source_path)
+    target = sqlite3.connect(target_path)
+    try:
+        target.execute(f"PRAGMA busy_timeout = {int(busy_timeout)}")
+        source.backup(target)
+    finally:
+        target.close()
+        source.close()
+
+
+class Command(BaseCommand):
+    help = "Copy the default database to the replica databases."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--interval",
+            type=float,
+            default=0,
+            help="Replicate again every INTERVAL seconds until interrupted.",
+        )
+
+    def handle(self, *args, interval, **options):
+        primary = database_path("default")
+        replicas = [
+            (alias, database_path(alias))
+            for alias in settings.PUBLIC_READ_DATABASES
+            if database_path(alias) != primary
+        ]
+        if not replicas:
+            raise CommandError("No replica database is configured, see DATABASE_REPLICAS.")
+        while True:
+            for alias, path in replicas:
+                start = monotonic()
+                replicate(primary, path, settings.SQLITE_PRAGMAS.get("busy_timeout", 5000))
+                self.stdout.write(
+                    f"Replicated {primary} to {alias} ({path}) "
+                    f"in {(monotonic() - start) * 1000:.1f} ms"
+                )
+            if not interval:
+                return
+            sleep(interval)
@@ -0,0 +1,237 @@
+"""
+This module contains the Prometheus instrumentation of the project.
+
+The 'MetricsMiddleware' counts the requests and observes their latency per route, the
+name of the URL pattern which served them, like 'lettings_index' or 'profile'. While a
+request runs, its queries are timed by the 'time_query' execute wrapper, installed on
+every new database connection, and the rendering of its templates by the
+'DjangoTemplates' backend, and both are added to the counters of its route. Outside a
+request, as in the management commands, the wrappers only read a context variable.
+
+A streaming response is observed when it has been sent, as its rows are queried and
+rendered while it is iterated.
+
+Each gunicorn worker is a process of its own, so the metrics are written to files in
+PROMETHEUS_MULTIPROC_DIR when it is set, as by 'gunicorn.conf.py', and the '/metrics'
+view aggregates the files of all the workers. Without it, as under `runserver`, they are
+kept in memory.
+"""
+
+import os
+from contextvars import ContextVar
+from time import perf_counter
+
+from django.conf import settings
+from django.template.backends.django import DjangoTemplates as DjangoTemplatesBackend
+from prometheus_client import REGISTRY, CollectorRegistry, Counter, Histogram, generate_latest
+from prometheus_client.multiprocess import MultiProcessCollector
+
+from .asynchronous import AsyncCapableMiddleware
+from .streaming import ContextStream
+
+
+UNMATCHED_ROUTE = "unmatched"
+
+REQUESTS = Counter(
+    "http_requests", "Requests by route, method and status.", ["route", "method", "status"]
+)
+LATENCY = Histogram(
+    "http_request_duration_seconds",
+    "Time to build the response of the requests, by route.",
+    ["route"],
+    buckets=settings.METRICS_LATENCY_BUCKETS,
+)
+QUERIES = Counter("db_queries", "Queries run by the requests, by route.", ["route"])
+QUERY_SECONDS = Counter(
+    "db_query_seconds", "Time spent running the queries of the requests, by route.", ["route"]
+)
+TEMPLATE_SECONDS = Counter(
+    "template_render_seconds",
+    "Time spent rendering the templates of the requests, by route.",
+    ["route"],
+)
+
+_request_stats = ContextVar("request_stats", default=None)
+
+
+class RequestStats:
+    """
+    This class holds the timings of the request being served.
+    """
+
+    __slots__ = ("start", "queries", "query_seconds", "template_seconds")
+
+    def __init__(self):
+        self.start = perf_counter()
+        self.queries = 0
+        self.query_seconds = 0.0
+        self.template_seconds = 0.0
+
+
+def time_query(execute, sql, params, many, context):
+    """
+    Run a query, adding its duration to the timings of the current request.
+
+    Args:
+        execute (callable): The next execute wrapper, or the execution of the query.
+        sql (str): The SQL of the query.
+        params (list): Its parameters.
+        many (bool): True for an `executemany` call.
+        context (dict): The connection and the cursor of the query.
+
+    Returns:
+        The result of the execution.
+    """
+    stats = _request_stats.get()
+    if stats is None:
+        return execute(sql, params, many, context)
+    start = perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        stats.queries += 1
+        stats.query_seconds += perf_counter() - start
+
+
+def instrument_connection(sender, connection, **kwargs):
+    """
+    Install the 'time_query' execute wrapper on a new connection.
+
+    It is inserted first, so that the wrappers installed and removed later with
+    `connection.execute_wrapper()` leave it in place, and it times them as well.
+
+    Args:
+        sender (type): The database wrapper class.
+        connection (DatabaseWrapper): The new connection.
+
+    Returns:
+        None
+    """
+    if time_query not in connection.execute_wrappers:
+        connection.execute_wrappers.insert(0, time_query)
+
+
+class TimedTemplate:
+    """
+    This class wraps a template of the 'DjangoTemplates' backend and times its rendering.
+    """
+
+    def __init__(self, backend_template):
+        self.backend_template = backend_template
+
+    def __getattr__(self, name):
+        return getattr(self.backend_template, name)
+
+    def render(self, context=None, request=None):
+        stats = _request_stats.get()
+        if stats is None:
+            return self.backend_template.render(context, request)
+        start = perf_counter()
+        try:
+            return self.backend_template.render(context, request)
+        finally:
+            stats.template_seconds += perf_counter() - start
+
+
+class DjangoTemplates(DjangoTemplatesBackend):
+    """
+    This template backend is Django's, timing the rendering of its templates.
+
+    The templates included by a template are rendered by the engine and timed with it.
+    """
+
+    def from_string(self, template_code):
+        return TimedTemplate(super().from_string(template_code))
+
+    def get_template(self, template_name):
+        return TimedTemplate(super().get_template(template_name))
+
+
+def route_name(request):
+    """
+    Return the route of a request, the name of the URL pattern which served it.
+
+    Args:
+        request (HttpRequest): The request.
+
+    Returns:
+        str: The view name of the URL pattern, or UNMATCHED_ROUTE if none matched.
+    """
+    match = request.resolver_match
+    return match.view_name if match is not None else UNMATCHED_ROUTE
+
+
+def observe(request, response, stats):
+    """
+    Add a served request to the metrics of its route.
+
+    Args:
+        request (HttpRequest): The request.
+        response (HttpResponse): Its response.
+        stats (RequestStats): Its timings.
+
+    Returns:
+        None
+    """
+    route = route_name(request)
+    REQUESTS.labels(route, request.method, str(response.status_code)).inc()
+    LATENCY.labels(route).observe(perf_counter() - stats.start)
+    if stats.queries:
+        QUERIES.labels(route).inc(stats.queries)
+        QUERY_SECONDS.labels(route).inc(stats.query_seconds)
+    if stats.template_seconds:
+        TEMPLATE_SECONDS.labels(route).inc(stats.template_seconds)
+
+
+class MetricsMiddleware(AsyncCapableMiddleware):
+    """
+    This middleware records the metrics of the requests, see the module docstring.
+    """
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        stats = RequestStats()
+        token = _request_stats.set(stats)
+        try:
+            response = self.get_response(request)
+        finally:
+            _request_stats.reset(token)
+        return self.process_response(request, response, stats)
+
+    async def __acall__(self, request):
+        stats = RequestStats()
+        token = _request_stats.set(stats)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _request_stats.reset(token)
+        return self.process_response(request, response, stats)
+
+    def process_response(self, request, response, stats):
+        if response.streaming:
+            response.streaming_content = ContextStream(
+                response.streaming_content,
+                _request_stats,
+                stats,
+                lambda: observe(request, response, stats),
+            )
+        else:
+            observe(request, response, stats)
+        return response
+
+
+def exposition():
+    """
+    Return the metrics in the Prometheus text format, aggregated across the workers when
+    PROMETHEUS_MULTIPROC_DIR is set.
+
+    Returns:
+        bytes: The metrics.
+    """
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        registry = CollectorRegistry()
+        MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return generate_latest(registry)
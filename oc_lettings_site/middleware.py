@@ -0,0 +1,126 @@
+"""
+This module contains the lean middleware path of the anonymous requests to the public
+views.
+
+The session, CSRF, authentication and messages middleware run on every request: they
+read the session cookie, attach a lazy user and a message storage to the request, may
+load the session from its table and add their headers to the response. The views marked
+by 'public_view' use none of it, so the subclasses below pass a read of one of them by a
+client without a session cookie straight on to the next middleware. A client with a
+session, like a logged-in administrator, and the other views, like the admin, go
+through the whole stack. Only the safe methods take the lean path, so that every write
+is still checked against CSRF.
+
+The admin system checks, which look for these middleware in MIDDLEWARE, accept their
+subclasses.
+"""
+
+from functools import lru_cache
+
+from django.conf import settings
+from django.contrib.auth.middleware import AuthenticationMiddleware
+from django.contrib.messages.middleware import MessageMiddleware
+from django.contrib.sessions.middleware import SessionMiddleware
+from django.core.signals import setting_changed
+from django.middleware.csrf import CsrfViewMiddleware
+from django.urls import Resolver404, resolve
+
+
+SAFE_METHODS = ("GET", "HEAD", "OPTIONS")
+
+
+@lru_cache(maxsize=4096)
+def is_public_path(path, urlconf=None):
+    """
+    Return whether a path is served by a view marked by 'public_view'.
+
+    The answers for the last paths are kept, as resolving a path again would cost a good
+    part of what the lean path saves.
+
+    Args:
+        path (str): The path of the request.
+        urlconf (str, optional): The URLconf of the request, if it is not ROOT_URLCONF.
+
+    Returns:
+        bool: True if the view of the path is public.
+    """
+    try:
+        return getattr(resolve(path, urlconf).func, "public", False)
+    except Resolver404:
+        return False
+
+
+def takes_lean_path(request):
+    """
+    Return whether a request skips the session, CSRF, authentication and messages
+    middleware, see the module docstring.
+
+    The answer is kept on the request for the following middleware.
+
+    Args:
+        request (HttpRequest): The request.
+
+    Returns:
+        bool: True if the request takes the lean path.
+    """
+    try:
+        return request._lean_path
+    except AttributeError:
+        pass
+    request._lean_path = (
+        request.method in SAFE_METHODS
+        and settings.SESSION_COOKIE_NAME not in request.COOKIES
+        and is_public_path(request.path_info, getattr(request, "urlconf", None))
+    )
+    return request._lean_path
+
+
+def clear_public_paths(setting, **kwargs):
+    """
+    Forget the public paths when the URLconf changes, as in the tests.
+    """
+    if setting == "ROOT_URLCONF":
+        is_public_path.cache_clear()
+
+
+setting_changed.connect(clear_public_paths)
+
+
+class LeanPathMixin:
+    """
+    This mixin passes the requests taking the lean path on to the next middleware.
+    """
+
+    def __call__(self, request):
+        if takes_lean_path(request):
+            return self.get_response(request)
+        return super().__call__(request)
+
+
+class LeanSessionMiddleware(LeanPathMixin, SessionMiddleware):
+    """
+    This middleware is Django's, skipped on the lean path.
+    """
+
+
+class LeanCsrfViewMiddleware(LeanPathMixin, CsrfViewMiddleware):
+    """
+    This middleware is Django's, skipped on the lean path.
+    """
+
+    def process_view(self, request, callback, callback_args, callback_kwargs):
+        if takes_lean_path(request):
+            return None
+        return super().process_view(request, callback, callback_args, callback_kwargs)
+
+
+class LeanAuthenticationMiddleware(LeanPathMixin, AuthenticationMiddleware):
+    """
+    This middleware is Django's, skipped on the lean path.
+    """
+
+
+class LeanMessageMiddleware(LeanPathMixin, MessageMiddleware):
+    """
+    This middleware is Django's, skipped on the lean path.
+    """
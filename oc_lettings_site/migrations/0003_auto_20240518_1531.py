@@ -6,6 +6,8 @@ from django.db import migrations
 class Migration(migrations.Migration):
     dependencies = [
         ("oc_lettings_site", "0002_auto_20240518_1512"),
+        ("lettings", "0002_auto_20240518_1420"),
+        ("profiles", "0002_auto_20240518_1513"),
     ]
 
     operations = [
@@ -0,0 +1,132 @@
+"""
+This module provides the rendered-page cache used by the detail views of the project.
+
+The rendered HTML of a letting or profile page is stored in the cache configured under
+the 'pages' alias of the CACHES setting, keyed on the letting id or the username. Any
+Django cache backend can be plugged in there; the counting backends defined below also
+report the number of entries evicted to respect their size bound.
+
+Each page is stored with its version, the ETag computed from the 'updated_at' columns
+of its rows, and it is only served to a request computing the same version. A page
+cached by another process, or rendered from a lagging replica, is thus replaced as soon
+as its rows change, without any invalidation reaching that cache. The signal receivers
+of the 'lettings' and 'profiles' applications also remove the entries whose rows are
+saved or deleted, and the entries expire after PAGE_CACHE_TIMEOUT seconds, for the
+changes which do not update the timestamps.
+"""
+
+from threading import Lock
+
+from django.core.cache import caches
+from django.core.cache.backends.filebased import FileBasedCache
+from django.core.cache.backends.locmem import LocMemCache
+
+
+PAGE_CACHE_ALIAS = "pages"
+
+_stats = {"hits": 0, "misses": 0, "evictions": 0, "invalidations": 0}
+_stats_lock = Lock()
+
+
+def _increment(counter, value=1):
+    """
+    Increment one of the counters returned by 'stats'.
+    """
+    with _stats_lock:
+        _stats[counter] += value
+
+
+def stats():
+    """
+    Return the page cache counters of the current process.
+
+    Returns:
+        dict: The number of hits, misses, evictions and invalidations.
+    """
+    with _stats_lock:
+        return dict(_stats)
+
+
+def reset_stats():
+    """
+    Reset the page cache counters of the current process to zero.
+    """
+    with _stats_lock:
+        for counter in _stats:
+            _stats[counter] = 0
+
+
+def letting_key(letting_id):
+    """
+    Return the cache key of the page of the given letting.
+    """
+    return f"letting:{letting_id}"
+
+
+def profile_key(username):
+    """
+    Return the cache key of the page of the given profile.
+    """
+    return f"profile:{username}"
+
+
+def get_page(key, version):
+    """
+    Return the rendered page stored under the given key, or None on a miss.
+
+    Args:
+        key (str): The cache key of the page.
+        version (str): The current version of the page.
+
+    Returns:
+        bytes: The rendered page, or None if it is not cached with this version.
+    """
+    entry = caches[PAGE_CACHE_ALIAS].get(key)
+    content = entry[1] if entry is not None and entry[0] == version else None
+    _increment("misses" if content is None else "hits")
+    return content
+
+
+def set_page(key, version, content):
+    """
+    Store a rendered page under the given key.
+
+    Args:
+        key (str): The cache key of the page.
+        version (str): The version of the page, the ETag of the rows it was rendered from.
+        content (bytes): The rendered page.
+    """
+    caches[PAGE_CACHE_ALIAS].set(key, (version, content))
+
+
+def invalidate(*keys):
+    """
+    Remove the pages stored under the given keys.
+
+    Args:
+        *keys (str): The cache keys of the pages to remove.
+    """
+    caches[PAGE_CACHE_ALIAS].delete_many(keys)
+    _increment("invalidations", len(keys))
+
+
+class CountingLocMemCache(LocMemCache):
+    """
+    This class is a local-memory LRU cache counting the entries evicted by MAX_ENTRIES.
+    """
+
+    def _cull(self):
+        before = len(self._cache)
+        super()._cull()
+        _increment("evictions", before - len(self._cache))
+
+
+class CountingFileBasedCache(FileBasedCache):
+    """
+    This class is a file-based cache counting the entries evicted by MAX_ENTRIES.
+    """
+
+    def _cull(self):
+        before = len(self._list_cache_files())
+        super()._cull()
+        _increment("evictions", before - len(self._list_cache_files()))
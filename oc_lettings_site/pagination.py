@@ -0,0 +1,139 @@
+"""
+This module provides keyset (cursor) pagination for the list views of the project.
+
+Instead of OFFSET scans, each page is fetched with a `WHERE id > cursor` (or `id < cursor`)
+clause on the primary key, so the cost of a page does not depend on how deep it is in
+the list. The cursors are the primary keys of the first and last rows of the page, which
+keeps them stable when rows are added or removed elsewhere in the table.
+"""
+
+from django.conf import settings
+
+
+# The range of the primary keys, outside which the database driver raises OverflowError
+MIN_PRIMARY_KEY = -(2**63)
+MAX_PRIMARY_KEY = 2**63 - 1
+
+
+class KeysetPage:
+    """
+    This class represents a single page returned by the 'KeysetPaginator'.
+
+    Attributes:
+        object_list (list): The objects of the page, ordered by primary key. They can
+         be model instances or `values()` rows including the 'id' key.
+        has_next (bool): Whether there are objects after this page.
+        has_previous (bool): Whether there are objects before this page.
+    """
+
+    def __init__(self, object_list, has_next, has_previous):
+        self.object_list = object_list
+        self.has_next = has_next
+        self.has_previous = has_previous
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    @property
+    def next_cursor(self):
+        """
+        Return the cursor of the next page, or None if this is the last page.
+        """
+        if not self.has_next or not self.object_list:
+            return None
+        return _primary_key(self.object_list[-1])
+
+    @property
+    def previous_cursor(self):
+        """
+        Return the cursor of the previous page, or None if this is the first page.
+        """
+        if not self.has_previous or not self.object_list:
+            return None
+        return _primary_key(self.object_list[0])
+
+
+class KeysetPaginator:
+    """
+    This class paginates a queryset by primary key without using OFFSET.
+
+    Attributes:
+        queryset (QuerySet): The queryset to paginate.
+        per_page (int): The maximum number of objects on a page.
+    """
+
+    def __init__(self, queryset, per_page=None):
+        self.queryset = queryset
+        self.per_page = per_page or settings.PAGINATION_PAGE_SIZE
+
+    def page(self, after=None, before=None):
+        """
+        Return the page following the `after` cursor or preceding the `before` cursor.
+
+        Args:
+            after (int, optional): Return the objects whose primary key is greater.
+            before (int, optional): Return the objects whose primary key is lower.
+
+        Returns:
+            KeysetPage: The requested page. The first page is returned if no cursor
+             is given. An empty page links to no other page, as it has no cursor.
+        """
+        if before is not None:
+            rows = list(
+                self.queryset.filter(pk__lt=before).order_by("-pk")[: self.per_page + 1]
+            )
+            has_previous = len(rows) > self.per_page
+            rows = rows[: self.per_page]
+            rows.reverse()
+            return KeysetPage(rows, has_next=bool(rows), has_previous=has_previous)
+
+        queryset = self.queryset.order_by("pk")
+        if after is not None:
+            queryset = queryset.filter(pk__gt=after)
+        rows = list(queryset[: self.per_page + 1])
+        has_next = len(rows) > self.per_page
+        return KeysetPage(
+            rows[: self.per_page],
+            has_next=has_next,
+            has_previous=after is not None and bool(rows),
+        )
+
+    def page_from_request(self, request):
+        """
+        Return the page designated by the `after` or `before` GET parameters.
+
+        Malformed cursors are ignored and the first page is returned instead.
+
+        Args:
+            request (HttpRequest): The request object.
+
+        Returns:
+            KeysetPage: The requested page.
+        """
+        return self.page(
+            after=_parse_cursor(request.GET.get("after")),
+            before=_parse_cursor(request.GET.get("before")),
+        )
+
+
+def _parse_cursor(value):
+    """
+    Convert a cursor GET parameter to a primary key, or None if it is missing or invalid.
+
+    A cursor outside the range of the primary keys is invalid.
+    """
+    try:
+        cursor = int(value)
+    except (TypeError, ValueError):
+        return None
+    return cursor if MIN_PRIMARY_KEY <= cursor <= MAX_PRIMARY_KEY else None
+
+
+def _primary_key(row):
+    """
+    Return the primary key of a model instance or of a `values()` row.
+    """
+    return row["id"] if isinstance(row, dict) else row.pk
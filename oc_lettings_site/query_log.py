@@ -0,0 +1,323 @@
+"""
+This module contains the slow-query log and the SQL profile of the requests.
+
+When the query log is on, the 'QueryLogMiddleware' follows the queries of each request
+through the 'log_query' execute wrapper, installed on every new database connection:
+
+- a query slower than QUERY_LOG_SLOW_MS is logged with the route of the request, the
+  line of the project which ran it, and its plan from EXPLAIN QUERY PLAN. Its
+  parameters, which can hold session keys or usernames, are only logged when
+  QUERY_LOG_PARAMS is set;
+- a query run QUERY_LOG_REPEATED_QUERIES times or more by a request, whatever its
+  parameters, is logged as a likely N+1 query, like a relation read for every row of a
+  template without 'select_related';
+- a summary line gives the number and the time of the queries of each request.
+
+The log is on when QUERY_LOG is set. It can also be switched on and off at runtime for
+all the workers with `manage.py query_log on|off`, which creates or removes the
+QUERY_LOG_SWITCH_FILE. The workers look for the file at most once a second, so when the
+log is off the middleware reads a flag and the wrapper a context variable. The file and
+its directory must not be writable by other users, who could switch the log on.
+"""
+
+import os
+import sys
+import sysconfig
+from contextvars import ContextVar
+from logging import getLogger
+from time import monotonic, perf_counter
+
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.db import DatabaseError
+from django.template.base import Template
+
+from .asynchronous import AsyncCapableMiddleware
+from .metrics import route_name
+from .streaming import ContextStream
+
+
+logger = getLogger(__name__)
+
+# Seconds between two checks of the switch file
+SWITCH_CHECK_SECONDS = 1.0
+
+PROJECT_DIR = os.path.join(str(settings.BASE_DIR), "")
+LIBRARY_DIRS = tuple(
+    os.path.join(sysconfig.get_paths()[name], "") for name in ("stdlib", "purelib", "platlib")
+)
+TEMPLATE_FILE = Template.render.__code__.co_filename
+# The instrumentation is not the origin of the queries it runs
+INSTRUMENTATION_FILES = (__file__, route_name.__code__.co_filename)
+
+_request_queries = ContextVar("request_queries", default=None)
+_switch_checked_at = float("-inf")
+_switched_on = False
+
+
+def query_log_enabled():
+    """
+    Return whether the query log is on, from the QUERY_LOG setting or the switch file.
+
+    Returns:
+        bool: True if the queries of the requests are logged.
+    """
+    global _switch_checked_at, _switched_on
+    if settings.QUERY_LOG:
+        return True
+    now = monotonic()
+    if now - _switch_checked_at >= SWITCH_CHECK_SECONDS:
+        _switched_on = os.path.exists(settings.QUERY_LOG_SWITCH_FILE)
+        _switch_checked_at = now
+    return _switched_on
+
+
+def forget_switch(setting=None, **kwargs):
+    """
+    Look for the switch file again on the next request, as when its setting changes in
+    the tests.
+    """
+    global _switch_checked_at
+    if setting in (None, "QUERY_LOG_SWITCH_FILE"):
+        _switch_checked_at = float("-inf")
+
+
+setting_changed.connect(forget_switch)
+
+
+def query_origin():
+    """
+    Return where the query being run comes from.
+
+    Returns:
+        str: The file, line and function of the innermost frame of the project outside
+        its instrumentation, followed by the innermost template being rendered if any.
+    """
+    template_name = None
+    frame = sys._getframe(1)
+    while frame is not None:
+        code = frame.f_code
+        filename = code.co_filename
+        if template_name is None and filename == TEMPLATE_FILE and code.co_name == "render":
+            template = frame.f_locals.get("self")
+            if isinstance(template, Template) and template.origin is not None:
+                template_name = template.origin.template_name
+        elif (
+            filename.startswith(PROJECT_DIR)
+            and not filename.startswith(LIBRARY_DIRS)
+            and filename not in INSTRUMENTATION_FILES
+        ):
+            path = os.path.relpath(filename, PROJECT_DIR)
+            origin = f"{path}:{frame.f_lineno} in {code.co_name}"
+            if template_name is not None:
+                origin = f"{origin}, rendering {template_name}"
+            return origin
+        frame = frame.f_back
+    return "an unknown line"
+
+
+def explain(sql, params, many, connection):
+    """
+    Return the plan of a query, from the EXPLAIN prefix of the database.
+
+    The plan is queried with a cursor of its own, without the execute wrappers, so that
+    the results of the query are left to its cursor. The errors of the database driver
+    are not translated by such a cursor.
+
+    Args:
+        sql (str): The SQL of the query.
+        params (list): Its parameters.
+        many (bool): True for an `executemany` call, which is not explained, like the
+         statements other than SELECT and WITH.
+        connection (DatabaseWrapper): The connection which ran the query.
+
+    Returns:
+        str: The lines of the plan, indented by their depth in the plan of SQLite.
+    """
+    if many or not sql.lstrip()[:6].upper().startswith(("SELECT", "WITH")):
+        return "  No plan for this statement."
+    try:
+        cursor = connection.create_cursor()
+        try:
+            cursor.execute(f"{connection.ops.explain_query_prefix()} {sql}", params)
+            rows = cursor.fetchall()
+        finally:
+            cursor.close()
+    except (DatabaseError, connection.Database.Error) as error:
+        return f"  No plan: {error}"
+    lines, depths = [], {}
+    for row in rows:
+        depth = 1
+        if len(row) == 4:
+            # The (id, parent, notused, detail) rows of SQLite
+            depth = depths[row[0]] = depths.get(row[1], 0) + 1
+        lines.append(f"{'  ' * depth}{row[-1]}")
+    return "\n".join(lines)
+
+
+class RequestQueries:
+    """
+    This class holds the queries of the request being served.
+
+    Each SQL statement is recorded with its number of runs, its total time and where it
+    was first run from.
+    """
+
+    __slots__ = ("request", "count", "seconds", "slow", "statements")
+
+    def __init__(self, request):
+        self.request = request
+        self.count = 0
+        self.seconds = 0.0
+        self.slow = 0
+        self.statements = {}
+
+    def record(self, sql, params, many, elapsed, connection):
+        """
+        Record a query of the request, and log it if it is slow.
+
+        Args:
+            sql (str): The SQL of the query.
+            params (list): Its parameters.
+            many (bool): True for an `executemany` call.
+            elapsed (float): Its duration, in seconds.
+            connection (DatabaseWrapper): The connection which ran it.
+
+        Returns:
+            None
+        """
+        self.count += 1
+        self.seconds += elapsed
+        statement = self.statements.get(sql)
+        if statement is None:
+            statement = self.statements[sql] = [0, 0.0, query_origin()]
+        statement[0] += 1
+        statement[1] += elapsed
+        if elapsed * 1000 >= settings.QUERY_LOG_SLOW_MS:
+            self.slow += 1
+            logger.warning(
+                "Slow query, %.1f ms in %s at %s: %s\n%s",
+                elapsed * 1000,
+                route_name(self.request),
+                query_origin(),
+                f"{sql}; params {params!r}" if settings.QUERY_LOG_PARAMS else sql,
+                explain(sql, params, many, connection),
+            )
+
+    def summarize(self, response):
+        """
+        Log the repeated queries and the summary of the queries of the request.
+
+        Args:
+            response (HttpResponse): The response of the request.
+
+        Returns:
+            None
+        """
+        route = route_name(self.request)
+        repeated = 0
+        for sql, (count, seconds, origin) in self.statements.items():
+            if count >= settings.QUERY_LOG_REPEATED_QUERIES:
+                repeated += 1
+                logger.warning(
+                    "Repeated query, likely N+1: run %d times in %.1f ms in %s at %s: %s",
+                    count,
+                    seconds * 1000,
+                    route,
+                    origin,
+                    sql,
+                )
+        logger.info(
+            "Queries of %s %s (%s, %d): %d in %.1f ms, %d distinct, %d slow, %d repeated",
+            self.request.method,
+            self.request.path,
+            route,
+            response.status_code,
+            self.count,
+            self.seconds * 1000,
+            len(self.statements),
+            self.slow,
+            repeated,
+        )
+
+
+def log_query(execute, sql, params, many, context):
+    """
+    Run a query, recording it in the queries of the current request.
+
+    Args:
+        execute (callable): The next execute wrapper, or the execution of the query.
+        sql (str): The SQL of the query.
+        params (list): Its parameters.
+        many (bool): True for an `executemany` call.
+        context (dict): The connection and the cursor of the query.
+
+    Returns:
+        The result of the execution.
+    """
+    queries = _request_queries.get()
+    if queries is None:
+        return execute(sql, params, many, context)
+    start = perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        queries.record(sql, params, many, perf_counter() - start, context["connection"])
+
+
+def log_connection_queries(sender, connection, **kwargs):
+    """
+    Install the 'log_query' execute wrapper first on a new connection, as the metrics one.
+
+    Args:
+        sender (type): The database wrapper class.
+        connection (DatabaseWrapper): The new connection.
+
+    Returns:
+        None
+    """
+    if log_query not in connection.execute_wrappers:
+        connection.execute_wrappers.insert(0, log_query)
+
+
+class QueryLogMiddleware(AsyncCapableMiddleware):
+    """
+    This middleware follows the queries of the requests while the query log is on, see
+    the module docstring.
+    """
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        if not query_log_enabled():
+            return self.get_response(request)
+        queries = RequestQueries(request)
+        token = _request_queries.set(queries)
+        try:
+            response = self.get_response(request)
+        finally:
+            _request_queries.reset(token)
+        return self.process_response(response, queries)
+
+    async def __acall__(self, request):
+        if not query_log_enabled():
+            return await self.get_response(request)
+        queries = RequestQueries(request)
+        token = _request_queries.set(queries)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _request_queries.reset(token)
+        return self.process_response(response, queries)
+
+    def process_response(self, response, queries):
+        if response.streaming:
+            response.streaming_content = ContextStream(
+                response.streaming_content,
+                _request_queries,
+                queries,
+                lambda: queries.summarize(response),
+            )
+        else:
+            queries.summarize(response)
+        return response
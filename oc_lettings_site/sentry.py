@@ -0,0 +1,140 @@
+"""
+This module contains the Sentry sampling configuration of the project.
+
+Tracing every request is a measurable CPU and memory cost, so transactions are sampled
+per route by 'traces_sampler': static files are almost never traced, the other routes
+are traced at the base rate, and a route that recently answered with a 5xx or took
+longer than the slow-request threshold is always traced for a while. Sentry decides
+whether to trace a request before it runs, so the routes to boost are reported after
+the fact by 'SamplingFeedbackMiddleware'.
+
+A route is the name of the URL pattern serving the request, like 'profile', as in the
+metrics of the project, so one slow profile boosts the tracing of all of them, and the
+boosted routes are as few as the URL patterns. The sampler resolves the path of the
+request to its route, keeping the answers for the last paths.
+"""
+
+from functools import lru_cache
+from time import monotonic
+
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.urls import Resolver404, resolve
+
+from .asynchronous import AsyncCapableMiddleware
+from .metrics import UNMATCHED_ROUTE, route_name
+
+
+# The most routes boosted at once, should the URL patterns be that many
+MAX_BOOSTED_ROUTES = 1000
+
+_boosted_until = {}
+
+
+def _request_path(sampling_context):
+    """
+    Return the path of the request being sampled, for WSGI and ASGI requests.
+    """
+    environ = sampling_context.get("wsgi_environ")
+    if environ is not None:
+        return environ.get("PATH_INFO", "")
+    scope = sampling_context.get("asgi_scope")
+    if scope is not None:
+        return scope.get("path", "")
+    return ""
+
+
+@lru_cache(maxsize=4096)
+def path_route(path):
+    """
+    Return the route of a path, the view name of the URL pattern matching it.
+
+    Args:
+        path (str): The path of the request.
+
+    Returns:
+        str: The view name, or UNMATCHED_ROUTE if no URL pattern matches the path.
+    """
+    try:
+        return resolve(path).view_name
+    except Resolver404:
+        return UNMATCHED_ROUTE
+
+
+def clear_path_routes(setting, **kwargs):
+    """
+    Forget the routes of the paths when the URLconf changes, as in the tests.
+    """
+    if setting == "ROOT_URLCONF":
+        path_route.cache_clear()
+
+
+setting_changed.connect(clear_path_routes)
+
+
+def boost(route):
+    """
+    Trace every request to the given route for the next SENTRY_BOOST_SECONDS.
+
+    When MAX_BOOSTED_ROUTES routes are boosted, the expired ones are removed first, and
+    a new route is not boosted if none has expired.
+
+    Args:
+        route (str): The view name of the URL pattern of the request.
+
+    Returns:
+        None
+    """
+    now = monotonic()
+    if route not in _boosted_until and len(_boosted_until) >= MAX_BOOSTED_ROUTES:
+        for expired in [key for key, until in _boosted_until.items() if until <= now]:
+            del _boosted_until[expired]
+        if len(_boosted_until) >= MAX_BOOSTED_ROUTES:
+            return
+    _boosted_until[route] = now + settings.SENTRY_BOOST_SECONDS
+
+
+def traces_sampler(sampling_context):
+    """
+    Return the probability of tracing the request described by the sampling context.
+
+    Args:
+        sampling_context (dict): The sampling context built by the Sentry SDK.
+
+    Returns:
+        float: The sample rate of the request, between 0 and 1.
+    """
+    parent_sampled = sampling_context.get("parent_sampled")
+    if parent_sampled is not None:
+        return float(parent_sampled)
+    path = _request_path(sampling_context)
+    if path.startswith(settings.SENTRY_QUIET_PATHS):
+        return settings.SENTRY_QUIET_SAMPLE_RATE
+    if _boosted_until and _boosted_until.get(path_route(path), 0) > monotonic():
+        return 1.0
+    return settings.SENTRY_TRACES_SAMPLE_RATE
+
+
+class SamplingFeedbackMiddleware(AsyncCapableMiddleware):
+    """
+    This middleware boosts the sampling of the routes answering slowly or with a 5xx.
+    """
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        start = monotonic()
+        response = self.get_response(request)
+        self.feedback(request, response, start)
+        return response
+
+    async def __acall__(self, request):
+        start = monotonic()
+        response = await self.get_response(request)
+        self.feedback(request, response, start)
+        return response
+
+    def feedback(self, request, response, start):
+        elapsed_ms = (monotonic() - start) * 1000
+        if response.status_code >= 500 or elapsed_ms > settings.SENTRY_SLOW_REQUEST_MS:
+            boost(route_name(request))
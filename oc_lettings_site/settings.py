@@ -45,26 +45,41 @@ INSTALLED_APPS = [
     "django.contrib.sessions",
     "django.contrib.messages",
     "django.contrib.staticfiles",
-    "lettings",
-    "profiles",
+    "lettings.apps.LettingsConfig",
+    "profiles.apps.ProfilesConfig",
 ]
 
+# The static files are served before the other middleware run, and the metrics of the
+# other requests are recorded, see 'oc_lettings_site.metrics', and their queries logged
+# when the query log is on, see 'oc_lettings_site.query_log'. The session, CSRF,
+# authentication and messages middleware are skipped by the anonymous reads of the public
+# views, see 'oc_lettings_site.middleware'.
 MIDDLEWARE = [
     "django.middleware.security.SecurityMiddleware",
-    "django.contrib.sessions.middleware.SessionMiddleware",
+    "oc_lettings_site.asynchronous.AsyncWhiteNoiseMiddleware",
+    "oc_lettings_site.metrics.MetricsMiddleware",
+    "oc_lettings_site.query_log.QueryLogMiddleware",
+    "oc_lettings_site.database.ReplicaStickinessMiddleware",
+    "oc_lettings_site.middleware.LeanSessionMiddleware",
     "django.middleware.common.CommonMiddleware",
-    "django.middleware.csrf.CsrfViewMiddleware",
-    "django.contrib.auth.middleware.AuthenticationMiddleware",
-    "django.contrib.messages.middleware.MessageMiddleware",
+    "oc_lettings_site.middleware.LeanCsrfViewMiddleware",
+    "oc_lettings_site.middleware.LeanAuthenticationMiddleware",
+    "oc_lettings_site.middleware.LeanMessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
-    "whitenoise.middleware.WhiteNoiseMiddleware",
 ]
 
+# Route the lettings and profiles pages to their asynchronous views, set by the ASGI
+# entry point. Under WSGI, each asynchronous view would run in an event loop of its own.
+ASYNC_VIEWS = os.environ.get("ASYNC_VIEWS", "false").lower() == "true"
+# Threads running the synchronous code of the requests of each ASGI worker
+ASGI_THREADS = int(os.environ.get("ASGI_THREADS", 4))
+
 ROOT_URLCONF = "oc_lettings_site.urls"
 
 TEMPLATES = [
     {
-        "BACKEND": "django.template.backends.django.DjangoTemplates",
+        # Django's backend, timing the rendering for the metrics
+        "BACKEND": "oc_lettings_site.metrics.DjangoTemplates",
         "DIRS": [
             os.path.join(BASE_DIR, "templates"),
             os.path.join(BASE_DIR, "lettings/templates"),
@@ -89,13 +104,85 @@ WSGI_APPLICATION = "oc_lettings_site.wsgi.application"
 # Database
 # https://docs.djangoproject.com/en/3.0/ref/settings/#databases
 
+DATABASE_PATH = os.environ.get(
+    "DATABASE_PATH", os.path.join(BASE_DIR, "oc-lettings-site.sqlite3")
+)
+
+# Seconds a connection is kept open across requests, 0 closes it after each request
+DATABASE_CONN_MAX_AGE = int(os.environ.get("DATABASE_CONN_MAX_AGE", 600))
+
 DATABASES = {
     "default": {
         "ENGINE": "django.db.backends.sqlite3",
-        "NAME": os.path.join(BASE_DIR, "oc-lettings-site.sqlite3"),
+        "NAME": DATABASE_PATH,
+        "CONN_MAX_AGE": DATABASE_CONN_MAX_AGE,
     }
 }
 
+# Pragmas applied to every new SQLite connection by oc_lettings_site.database
+SQLITE_PRAGMAS = {
+    "journal_mode": "wal",
+    "synchronous": "normal",
+    "busy_timeout": int(os.environ.get("SQLITE_BUSY_TIMEOUT", 5000)),
+    "cache_size": int(os.environ.get("SQLITE_CACHE_SIZE", -20000)),
+    "mmap_size": int(os.environ.get("SQLITE_MMAP_SIZE", 256 * 1024 * 1024)),
+    "temp_store": "memory",
+}
+
+# Databases the public views read from, see oc_lettings_site.database.PublicViewRouter.
+# When DATABASE_READ_ONLY_VIEWS is "true", they read through a read-only connection to
+# the database file. DATABASE_REPLICAS is a comma-separated list of replica files, kept
+# in sync with `manage.py replicate_database`.
+PUBLIC_READ_DATABASES = []
+if os.environ.get("DATABASE_READ_ONLY_VIEWS", "false").lower() == "true":
+    PUBLIC_READ_DATABASES.append("readonly")
+    DATABASES["readonly"] = {
+        "ENGINE": "django.db.backends.sqlite3",
+        "NAME": f"file:{DATABASE_PATH}?mode=ro",
+        "CONN_MAX_AGE": DATABASE_CONN_MAX_AGE,
+        "TEST": {"MIRROR": "default"},
+    }
+for index, replica_path in enumerate(
+    filter(None, os.environ.get("DATABASE_REPLICAS", "").split(",")), start=1
+):
+    PUBLIC_READ_DATABASES.append(f"replica{index}")
+    DATABASES[f"replica{index}"] = {
+        "ENGINE": "django.db.backends.sqlite3",
+        "NAME": f"file:{replica_path}?mode=ro",
+        "CONN_MAX_AGE": DATABASE_CONN_MAX_AGE,
+        "TEST": {"MIRROR": "default"},
+    }
+
+# "round_robin" or "least_loaded"
+REPLICA_SELECTION = os.environ.get("REPLICA_SELECTION", "round_robin")
+# Seconds a client reads from the default database after a write
+REPLICA_STICKY_SECONDS = int(os.environ.get("REPLICA_STICKY_SECONDS", 10))
+
+DATABASE_ROUTERS = ["oc_lettings_site.database.PublicViewRouter"]
+
+
+# Cache
+# https://docs.djangoproject.com/en/3.0/topics/cache/
+
+# The 'pages' cache stores the rendered letting and profile pages, with the version of
+# their rows, see 'oc_lettings_site.page_cache'. Its backend can be swapped for
+# CountingFileBasedCache or any Redis-compatible Django backend, shared by the workers.
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+    },
+    "pages": {
+        "BACKEND": os.environ.get(
+            "PAGE_CACHE_BACKEND", "oc_lettings_site.page_cache.CountingLocMemCache"
+        ),
+        "LOCATION": os.environ.get("PAGE_CACHE_LOCATION", "pages"),
+        "TIMEOUT": int(os.environ.get("PAGE_CACHE_TIMEOUT", 3600)),
+        "OPTIONS": {
+            "MAX_ENTRIES": int(os.environ.get("PAGE_CACHE_MAX_ENTRIES", 1000)),
+        },
+    },
+}
+
 
 # Password validation
 # https://docs.djangoproject.com/en/3.0/ref/settings/#auth-password-validators
@@ -142,15 +229,86 @@ STATICFILES_DIRS = [
 
 DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 
+# Number of rows per page of the keyset-paginated list views
+PAGINATION_PAGE_SIZE = 50
+
+# Number of rows rendered per chunk by the streaming list views
+STREAMING_CHUNK_SIZE = 500
+
+# Maximum number of ids fetched at once by the batch endpoints of the JSON API
+API_BATCH_MAX_IDS = 100
+
+# Tables with more rows are counted from the database statistics in the admin lists, see
+# oc_lettings_site.admin_utils.EstimatedCountPaginator
+ADMIN_EXACT_COUNT_LIMIT = int(os.environ.get("ADMIN_EXACT_COUNT_LIMIT", 100000))
+
+# Bearer token granting access to the /metrics endpoint, which staff users can also read
+METRICS_TOKEN = os.environ.get("METRICS_TOKEN", "")
+# Upper bounds, in seconds, of the buckets of the request latency histograms
+METRICS_LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Slow-query log and SQL summary of the requests, see oc_lettings_site.query_log. It is
+# on when QUERY_LOG is "true" or the switch file exists, see `manage.py query_log`.
+QUERY_LOG = os.environ.get("QUERY_LOG", "false").lower() == "true"
+# The switch file lies in the project directory, or in the RUN_DIR of the deployment: it,
+# like its directory, must not be writable by other users, who could switch the log on
+QUERY_LOG_SWITCH_FILE = os.environ.get(
+    "QUERY_LOG_SWITCH_FILE",
+    os.path.join(os.environ.get("RUN_DIR", BASE_DIR), "oc-lettings-query-log"),
+)
+# Queries slower than this are logged with their plan
+QUERY_LOG_SLOW_MS = int(os.environ.get("QUERY_LOG_SLOW_MS", 100))
+# The parameters of the slow queries, which can hold personal data, are only logged when
+# QUERY_LOG_PARAMS is "true"
+QUERY_LOG_PARAMS = os.environ.get("QUERY_LOG_PARAMS", "false").lower() == "true"
+# Queries run this many times by a request are logged as likely N+1 queries
+QUERY_LOG_REPEATED_QUERIES = int(os.environ.get("QUERY_LOG_REPEATED_QUERIES", 5))
+
 sentry_dsn = os.environ.get("SENTRY_DSN")
 
+# Share of the requests traced by Sentry, see oc_lettings_site.sentry.traces_sampler
+SENTRY_TRACES_SAMPLE_RATE = float(os.environ.get("SENTRY_TRACES_SAMPLE_RATE", 0.1))
+# Share of the traced requests which are also profiled
+SENTRY_PROFILES_SAMPLE_RATE = float(os.environ.get("SENTRY_PROFILES_SAMPLE_RATE", 0.1))
+# Paths traced at SENTRY_QUIET_SAMPLE_RATE instead of the base rate
+SENTRY_QUIET_PATHS = ("/static/", "/favicon.ico")
+SENTRY_QUIET_SAMPLE_RATE = float(os.environ.get("SENTRY_QUIET_SAMPLE_RATE", 0.001))
+# Requests slower than this, or answered with a 5xx, get their path always traced
+# for SENTRY_BOOST_SECONDS
+SENTRY_SLOW_REQUEST_MS = int(os.environ.get("SENTRY_SLOW_REQUEST_MS", 500))
+SENTRY_BOOST_SECONDS = int(os.environ.get("SENTRY_BOOST_SECONDS", 300))
+
 if sentry_dsn:
+    from oc_lettings_site.sentry import traces_sampler
+
     sentry_sdk.init(
         dsn=sentry_dsn,
-        traces_sample_rate=1.0,
-        profiles_sample_rate=1.0,
+        traces_sampler=traces_sampler,
+        profiles_sample_rate=SENTRY_PROFILES_SAMPLE_RATE,
+    )
+    MIDDLEWARE.insert(0, "oc_lettings_site.sentry.SamplingFeedbackMiddleware")
+
+# The log file is written by a background thread from a bounded queue unless
+# ASYNC_LOGGING is "false", in which case each record is written by the request thread.
+# It is rotated past LOG_MAX_BYTES, or by logrotate when it is 0, as under gunicorn.
+ASYNC_LOGGING = os.environ.get("ASYNC_LOGGING", "true").lower() != "false"
+
+LOG_FILE_HANDLER = {
+    "level": "INFO",
+    "class": "logging.handlers.WatchedFileHandler",
+    "filename": os.path.join(os.path.dirname(__file__), "info.log"),
+    "formatter": "verbose",
+}
+if ASYNC_LOGGING:
+    LOG_FILE_HANDLER.update(
+        {
+            "class": "oc_lettings_site.log_handlers.QueueFileHandler",
+            "max_queue_size": int(os.environ.get("LOG_QUEUE_SIZE", 10000)),
+            "batch_size": int(os.environ.get("LOG_BATCH_SIZE", 256)),
+            "max_bytes": int(os.environ.get("LOG_MAX_BYTES", 10 * 1024 * 1024)),
+            "backup_count": int(os.environ.get("LOG_BACKUP_COUNT", 5)),
+        }
     )
-
 
 LOGGING = {
     "version": 1,
@@ -177,12 +335,7 @@ LOGGING = {
             "class": "logging.StreamHandler",
             "formatter": "simple",
         },
-        "file": {
-            "level": "INFO",
-            "class": "logging.FileHandler",
-            "filename": os.path.join(os.path.dirname(__file__), "info.log"),
-            "formatter": "verbose",
-        },
+        "file": LOG_FILE_HANDLER,
         "sentry": {
             "level": "ERROR",
             "class": "sentry_sdk.integrations.logging.EventHandler",
@@ -191,7 +344,7 @@ LOGGING = {
     "loggers": {
         "django": {
             "handlers": ["console", "file", "sentry"],
-            "level": "DEBUG",
+            "level": "INFO",
             "propagate": True,
         },
         "oc_lettings_site": {
@@ -212,4 +365,5 @@ LOGGING = {
     },
 }
 
-STORAGE = "whitenoise.storage.CompressedStaticFilesStorage"
+# Hashed and precompressed by collectstatic, see 'oc_lettings_site.staticfiles'
+STATICFILES_STORAGE = "oc_lettings_site.staticfiles.CompressedManifestStorage"
@@ -0,0 +1,135 @@
+"""
+This module contains the static files pipeline of the project.
+
+At `collectstatic` time, 'CompressedManifestStorage' copies every asset under a name
+holding the hash of its content, e.g. 'css/styles.0f1e2d3c4b5a.css', writes the
+original-to-hashed mapping to 'staticfiles.json', and precompresses each file with gzip
+and, when the Brotli package is installed, brotli. WhiteNoise then serves the
+precompressed variant accepted by the client and, as a hashed name changes whenever the
+content does, caches the hashed files for ten years with `Cache-Control: immutable`.
+
+A template referencing an asset missing from the manifest would only fail when it is
+rendered, so the 'check_template_assets' deploy check, run by
+`manage.py check --deploy` after `collectstatic`, fails the build instead.
+"""
+
+import re
+from logging import getLogger
+from pathlib import Path
+
+from django.conf import settings
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.core.checks import Error, Tags, register
+from django.core.files.storage import FileSystemStorage
+from django.template import engines
+from whitenoise.storage import CompressedManifestStaticFilesStorage
+
+
+# Matches the literal paths of the {% static %} and {% inline_stylesheet %} tags, the
+# only ones known before rendering
+STATIC_TAG = re.compile(r"""{%\s*(?:static|inline_stylesheet)\s+(['"])(?P<path>[^'"]+)\1""")
+
+logger = getLogger(__name__)
+
+
+class CompressedManifestStorage(CompressedManifestStaticFilesStorage):
+    """
+    This storage hashes and precompresses the static files, see the module docstring.
+
+    Until `collectstatic` has written the manifest, as in development and in the tests,
+    the URLs of the assets keep their original names. A stylesheet referencing a file
+    which does not exist, like the unused images of the theme in 'css/styles.css', keeps
+    the reference unchanged with a warning instead of failing `collectstatic`.
+    """
+
+    def url(self, name, force=False):
+        if not self.hashed_files:
+            return FileSystemStorage.url(self, name)
+        return super().url(name, force)
+
+    def url_converter(self, name, hashed_files, template=None):
+        converter = super().url_converter(name, hashed_files, template)
+
+        def convert_existing(matchobj):
+            try:
+                return converter(matchobj)
+            except ValueError:
+                matched, url = matchobj.groups()
+                logger.warning("%s references the missing file %s", name, url)
+                return matched
+
+        return convert_existing
+
+
+def project_templates():
+    """
+    Return the template files of the project.
+
+    The templates of third-party applications, like the admin, are left out.
+
+    Returns:
+        list: The paths of the HTML and SVG templates under BASE_DIR.
+    """
+    base_dir = Path(settings.BASE_DIR).resolve()
+    directories = [
+        Path(directory).resolve()
+        for engine in engines.all()
+        for directory in getattr(engine, "template_dirs", ())
+    ]
+    return [
+        template
+        for directory in dict.fromkeys(directories)
+        if directory == base_dir or base_dir in directory.parents
+        for pattern in ("*.html", "*.svg")
+        for template in sorted(directory.rglob(pattern))
+    ]
+
+
+def template_assets():
+    """
+    Return the assets referenced by the {% static %} tags of the templates of the project.
+
+    The assets of third-party applications, like the admin, are collected with them.
+
+    Returns:
+        dict: The template files referencing each asset path, by asset path.
+    """
+    assets = {}
+    for template in project_templates():
+        for match in STATIC_TAG.finditer(template.read_text(errors="ignore")):
+            assets.setdefault(match.group("path"), []).append(str(template))
+    return assets
+
+
+@register(Tags.staticfiles, deploy=True)
+def check_template_assets(app_configs, **kwargs):
+    """
+    Report the assets referenced by a template but missing from the static manifest.
+
+    Args:
+        app_configs (list): The applications to check, or None for all of them.
+
+    Returns:
+        list: The errors found.
+    """
+    manifest = getattr(staticfiles_storage, "hashed_files", None)
+    if manifest is None:
+        return []
+    if not manifest:
+        return [
+            Error(
+                "The static files manifest is missing.",
+                hint=f"Run 'manage.py collectstatic' to create it in {settings.STATIC_ROOT}.",
+                id="oc_lettings_site.E001",
+            )
+        ]
+    return [
+        Error(
+            f"The static asset '{path}' is missing from the manifest.",
+            hint=f"Referenced by {', '.join(sorted(set(templates)))}.",
+            obj=path,
+            id="oc_lettings_site.E002",
+        )
+        for path, templates in sorted(template_assets().items())
+        if staticfiles_storage.hash_key(staticfiles_storage.clean_name(path)) not in manifest
+    ]
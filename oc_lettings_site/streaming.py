@@ -0,0 +1,96 @@
+"""
+This module provides a streaming renderer for the list pages of the project.
+
+The page template is rendered once around a placeholder, and the rows are then rendered
+from a server-side iterator and sent in chunks through a StreamingHttpResponse. The time
+to first byte and the memory used by a request therefore stay flat whatever the number
+of rows in the table.
+
+The rows are queried and rendered after the middleware have returned the response, so
+the middleware following the queries of a request produce its parts in a 'ContextStream'.
+"""
+
+from django.conf import settings
+from django.http import StreamingHttpResponse
+from django.template.loader import get_template, render_to_string
+from django.utils.safestring import mark_safe
+
+
+STREAM_PLACEHOLDER = mark_safe("<!-- stream-placeholder -->")
+
+
+def stream_list(request, template_name, context, queryset, item_template_name, item_name):
+    """
+    Render a list page, streaming the rows of the queryset in chunks.
+
+    The page template must output the `stream_placeholder` context variable where the
+    rows are expected. Each row is rendered with the item template, which receives the
+    row under `item_name`.
+
+    Args:
+        request (HttpRequest): The request object.
+        template_name (str): The template of the page.
+        context (dict): The context of the page.
+        queryset (QuerySet): The rows to stream.
+        item_template_name (str): The template used to render a single row.
+        item_name (str): The name of the row in the item template context.
+
+    Returns:
+        StreamingHttpResponse: The response streaming the rendered page.
+    """
+    page = render_to_string(
+        template_name,
+        dict(context, stream_placeholder=STREAM_PLACEHOLDER),
+        request=request,
+    )
+    head, _, tail = page.partition(STREAM_PLACEHOLDER)
+    item_template = get_template(item_template_name)
+    chunk_size = settings.STREAMING_CHUNK_SIZE
+
+    def render():
+        yield head
+        chunk = []
+        for row in queryset.iterator(chunk_size=chunk_size):
+            chunk.append(item_template.render({item_name: row}))
+            if len(chunk) >= chunk_size:
+                yield "".join(chunk)
+                chunk = []
+        if chunk:
+            yield "".join(chunk)
+        yield tail
+
+    return StreamingHttpResponse(render())
+
+
+class ContextStream:
+    """
+    This iterator produces the parts of a streaming content while a context variable holds
+    the given value, and calls `on_close` once it is exhausted or closed.
+
+    The variable is set around each part, as the parts of a response served over ASGI are
+    produced in separate calls of 'sync_to_async'.
+    """
+
+    def __init__(self, content, variable, value, on_close):
+        self.content = iter(content)
+        self.variable = variable
+        self.value = value
+        self.on_close = on_close
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        token = self.variable.set(self.value)
+        try:
+            return next(self.content)
+        except StopIteration:
+            self.close()
+            raise
+        finally:
+            self.variable.reset(token)
+
+    def close(self):
+        on_close, self.on_close = self.on_close, None
+        if on_close is not None:
+            on_close()
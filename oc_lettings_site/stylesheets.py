@@ -0,0 +1,366 @@
+"""
+This module contains the build step trimming the stylesheet of the theme.
+
+'css/styles.css' is the whole SB UI Kit theme, about 400 KB of Bootstrap and theme
+rules, of which the templates use a small fraction. `manage.py build_css` parses it and
+writes two stylesheets next to it:
+
+- 'css/styles.purged.css', the rules which can match the pages, loaded by 'base.html'
+  without blocking the rendering;
+- 'css/critical.css', the subset styling the top of the pages, the layout before the
+  content block of 'base.html' and the content of a page up to its title, inlined in
+  the head of the pages by the {% inline_stylesheet %} tag.
+
+As PurgeCSS does, the names used by the pages are all the words of the project templates,
+including the SVG icons, and scripts. A selector is kept when all its classes, ids and
+element names are among them. Attribute selectors, pseudo-classes and their arguments,
+like the selectors of :not(), are ignored, so a selector is only dropped when it cannot
+match. The custom properties no kept rule reads, the keyframes no kept rule animates and
+the font faces of unused families are then dropped, and the kept font faces swap the
+font in when it loads instead of hiding the text until then.
+"""
+
+import re
+
+from django.contrib.staticfiles import finders
+
+from .staticfiles import project_templates
+
+
+SOURCE = "css/styles.css"
+PURGED = "css/styles.purged.css"
+CRITICAL = "css/critical.css"
+
+# The scripts of the project, whose strings may name classes
+SCRIPTS = ("js/scripts.js",)
+
+# The at-rules whose rules apply under a condition, and are purged like the others
+CONDITIONAL_RULES = ("@media", "@supports", "@layer", "@container")
+
+STRING = r"""("(?:\\.|[^"\\])*"|'(?:\\.|[^'\\])*')"""
+COMMENT = re.compile(STRING + r"|/\*(!?).*?\*/", re.S)
+BLOCK_TOKEN = re.compile(STRING + r"|[{};]")
+LIST_TOKEN = re.compile(STRING + r"|[()\[\],]")
+DECLARATION_TOKEN = re.compile(STRING + r"|[()\[\];]")
+SPACE = re.compile(STRING + r"|\s+")
+SELECTOR_SPACE = re.compile(r"\s*([,>+~])\s*")
+ATTRIBUTE = re.compile(r"\[[^\]]*\]")
+ARGUMENTS = re.compile(r"\([^()]*\)")
+PSEUDO = re.compile(r"::?[\w-]+")
+NAME = re.compile(r"[.#]?([\w-]+)")
+WORD = re.compile(r"[\w-]+")
+VARIABLE = re.compile(r"var\(\s*(--[\w-]+)")
+
+
+def strip_comments(text):
+    """
+    Remove the comments of a stylesheet.
+
+    Args:
+        text (str): The stylesheet.
+
+    Returns:
+        tuple: The stylesheet without comments, and the license comments, starting with
+        '/*!', which were removed.
+    """
+    licenses = []
+
+    def replace(match):
+        if match.group(1):
+            return match.group(1)
+        if match.group(2):
+            licenses.append(match.group())
+        return ""
+
+    return COMMENT.sub(replace, text), licenses
+
+
+def split(text, token):
+    """
+    Split a list at its separators outside strings, parentheses and brackets.
+
+    Args:
+        text (str): The list, like a selector list or the declarations of a rule.
+        token (Pattern): LIST_TOKEN to split at the commas, DECLARATION_TOKEN at the
+         semicolons.
+
+    Returns:
+        list: The non-empty items, stripped.
+    """
+    items, depth, start = [], 0, 0
+    for match in token.finditer(text):
+        character = match.group()
+        if match.group(1):
+            continue
+        if character in "([":
+            depth += 1
+        elif character in ")]":
+            depth -= 1
+        elif depth == 0:
+            items.append(text[start:match.start()])
+            start = match.end()
+    items.append(text[start:])
+    return [item.strip() for item in items if item.strip()]
+
+
+def parse(text):
+    """
+    Parse a stylesheet without comments into a tree of nodes.
+
+    A node is a tuple of its kind, its prelude and its body:
+
+    - ("statement", "@charset ...", None) for an at-rule without block;
+    - ("rule", selectors or at-rule, declarations), like a style rule or @font-face;
+    - ("group", at-rule, nodes), like @media or @keyframes.
+
+    Args:
+        text (str): The stylesheet.
+
+    Returns:
+        list: The nodes.
+    """
+    nodes, depth, start, prelude_end = [], 0, 0, 0
+    for match in BLOCK_TOKEN.finditer(text):
+        character = match.group()
+        if match.group(1):
+            continue
+        if character == "{":
+            if depth == 0:
+                prelude_end = match.start()
+            depth += 1
+        elif character == "}":
+            depth -= 1
+            if depth == 0:
+                prelude = text[start:prelude_end].strip()
+                body = text[prelude_end + 1:match.start()]
+                if "{" in body:
+                    nodes.append(("group", prelude, parse(body)))
+                else:
+                    nodes.append(("rule", prelude, body))
+                start = match.end()
+        elif depth == 0:
+            statement = text[start:match.start()].strip()
+            if statement:
+                nodes.append(("statement", statement, None))
+            start = match.end()
+    return nodes
+
+
+def selector_names(selector):
+    """
+    Return the class, id and element names a selector requires.
+
+    Args:
+        selector (str): A single selector.
+
+    Returns:
+        list: The names, without their '.' and '#' prefixes.
+    """
+    selector = ATTRIBUTE.sub("", selector)
+    while True:
+        stripped = ARGUMENTS.sub("", selector)
+        if stripped == selector:
+            break
+        selector = stripped
+    return NAME.findall(PSEUDO.sub("", selector))
+
+
+def purge(nodes, names):
+    """
+    Remove the selectors which cannot match, and the rules left without selectors.
+
+    Args:
+        nodes (list): The nodes of the stylesheet, see 'parse'.
+        names (set): The class, id and element names used by the pages.
+
+    Returns:
+        list: The remaining nodes.
+    """
+    kept = []
+    for kind, prelude, body in nodes:
+        if kind == "rule" and not prelude.startswith("@"):
+            selectors = [
+                selector
+                for selector in split(prelude, LIST_TOKEN)
+                if all(name in names for name in selector_names(selector))
+            ]
+            if selectors:
+                kept.append((kind, ",".join(selectors), body))
+        elif kind == "group" and prelude.startswith(CONDITIONAL_RULES):
+            children = purge(body, names)
+            if children:
+                kept.append((kind, prelude, children))
+        else:
+            kept.append((kind, prelude, body))
+    return kept
+
+
+def _declarations(nodes):
+    """
+    Yield the declarations of the style rules, as (name, value) tuples.
+    """
+    for kind, prelude, body in nodes:
+        if kind == "group" and prelude.startswith(CONDITIONAL_RULES):
+            yield from _declarations(body)
+        elif kind == "rule" and not prelude.startswith("@"):
+            for declaration in split(body, DECLARATION_TOKEN):
+                name, _, value = declaration.partition(":")
+                yield name.strip(), value
+
+
+def _without_properties(nodes, unused):
+    """
+    Return the nodes without the declarations of the unused custom properties.
+    """
+    kept = []
+    for kind, prelude, body in nodes:
+        if kind == "group" and prelude.startswith(CONDITIONAL_RULES):
+            body = _without_properties(body, unused)
+        elif kind == "rule" and not prelude.startswith("@"):
+            declarations = [
+                declaration
+                for declaration in split(body, DECLARATION_TOKEN)
+                if declaration.partition(":")[0].strip() not in unused
+            ]
+            if not declarations:
+                continue
+            body = ";".join(declarations)
+        kept.append((kind, prelude, body))
+    return kept
+
+
+def prune(nodes, names):
+    """
+    Remove the custom properties, keyframes and font faces the style rules do not use.
+
+    Args:
+        nodes (list): The purged nodes of the stylesheet.
+        names (set): The words of the pages, which may set or read custom properties.
+
+    Returns:
+        list: The remaining nodes.
+    """
+    # A custom property may only be read by another one, removed in a previous pass
+    while True:
+        declarations = list(_declarations(nodes))
+        read = {name for _, value in declarations for name in VARIABLE.findall(value)}
+        unused = {
+            name
+            for name, _ in declarations
+            if name.startswith("--") and name not in read and name not in names
+        }
+        if not unused:
+            break
+        nodes = _without_properties(nodes, unused)
+    words = {word for _, value in declarations for word in WORD.findall(value)}
+    kept = []
+    for kind, prelude, body in nodes:
+        if prelude.startswith(("@keyframes", "@-webkit-keyframes")):
+            if prelude.split()[-1] not in words:
+                continue
+        elif prelude.startswith("@font-face"):
+            family = dict(
+                (name.strip(), value.strip(" \"'"))
+                for name, _, value in (
+                    declaration.partition(":") for declaration in split(body, DECLARATION_TOKEN)
+                )
+            ).get("font-family")
+            if family not in words:
+                continue
+            if "font-display" not in body:
+                body = f"{body.rstrip().rstrip(';')};font-display:swap"
+        kept.append((kind, prelude, body))
+    return kept
+
+
+def _compact(text, selector=False):
+    """
+    Collapse the white space of a prelude or a value, outside its strings.
+    """
+    text = SPACE.sub(lambda match: match.group(1) or " ", text).strip()
+    if selector:
+        text = SELECTOR_SPACE.sub(r"\1", text)
+    return text
+
+
+def serialize(nodes):
+    """
+    Return the minified stylesheet of the given nodes.
+
+    Args:
+        nodes (list): The nodes, see 'parse'.
+
+    Returns:
+        str: The stylesheet.
+    """
+    parts = []
+    for kind, prelude, body in nodes:
+        prelude = _compact(prelude, selector=not prelude.startswith("@"))
+        if kind == "statement":
+            parts.append(f"{prelude};")
+        elif kind == "group":
+            parts.append(f"{prelude}{{{serialize(body)}}}")
+        else:
+            declarations = ";".join(
+                f"{name.strip()}:{_compact(value)}"
+                for name, _, value in (
+                    declaration.partition(":") for declaration in split(body, DECLARATION_TOKEN)
+                )
+            )
+            parts.append(f"{prelude}{{{declarations}}}")
+    return "".join(parts)
+
+
+def above_the_fold(template):
+    """
+    Return the part of a template displayed at the top of the pages.
+
+    Args:
+        template (str): The source of a template.
+
+    Returns:
+        str: The layout before the content block for the base template, the content up
+        to the title for a page, or nothing for a fragment without title.
+    """
+    layout, block, _ = template.partition("{% block content %}")
+    if block and "{% extends" not in layout:
+        return layout
+    title, end, _ = template.partition("</h1>")
+    return title if end else ""
+
+
+def read_static(path):
+    """
+    Return the content of a static file of the project.
+
+    Args:
+        path (str): The static path of the file.
+
+    Returns:
+        str: Its content.
+    """
+    with open(finders.find(path), encoding="utf-8") as file:
+        return file.read()
+
+
+def build():
+    """
+    Build the purged and the critical stylesheets from the stylesheet of the theme.
+
+    Returns:
+        dict: The content of each built stylesheet, by static path.
+    """
+    text, licenses = strip_comments(read_static(SOURCE))
+    nodes = parse(text)
+    templates = [template.read_text(encoding="utf-8") for template in project_templates()]
+    scripts = [read_static(path) for path in SCRIPTS]
+    names = set(WORD.findall("\n".join(templates + scripts)))
+    critical_names = set(WORD.findall("\n".join(map(above_the_fold, templates))))
+    purged = prune(purge(nodes, names), names)
+    statements = [node for node in purged if node[0] == "statement"]
+    rules = [node for node in purged if node[0] != "statement"]
+    return {
+        PURGED: serialize(statements) + "\n".join(licenses) + "\n" + serialize(rules) + "\n",
+        # A <style> element ignores @charset, and the licenses stay in the stylesheet
+        CRITICAL: serialize(prune(purge(rules, critical_names), critical_names)) + "\n",
+    }
@@ -0,0 +1,81 @@
+"""
+This module defines the {% inline_stylesheet %} template tag.
+
+It outputs the content of a static stylesheet, to be placed in a <style> element so that
+the browser renders the page without waiting for a request. Once `collectstatic` has
+written the manifest, the hashed copy is read, and the relative URLs of the stylesheet,
+like its fonts, are made absolute since the page is not in the directory of the
+stylesheet. The content of each stylesheet is read once per process.
+"""
+
+import re
+from functools import lru_cache
+from urllib.parse import urljoin
+
+from django import template
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.core.signals import setting_changed
+from django.templatetags.static import static
+from django.utils.safestring import mark_safe
+
+from oc_lettings_site.stylesheets import read_static
+
+
+register = template.Library()
+
+URL = re.compile(r"""url\(\s*(['"]?)(?P<url>[^'")]+)\1\s*\)""")
+
+
+def _absolute(base_url):
+    def replace(match):
+        url = match.group("url")
+        if url.startswith(("data:", "#", "/")) or "//" in url:
+            return match.group()
+        return f'url("{urljoin(base_url, url)}")'
+
+    return replace
+
+
+@lru_cache(maxsize=None)
+def stylesheet(path):
+    """
+    Return the content of a static stylesheet, with absolute URLs.
+
+    Args:
+        path (str): The static path of the stylesheet.
+
+    Returns:
+        str: The content, safe to place in a <style> element.
+    """
+    if getattr(staticfiles_storage, "hashed_files", None):
+        with staticfiles_storage.open(staticfiles_storage.stored_name(path)) as file:
+            content = file.read().decode("utf-8")
+    else:
+        content = read_static(path)
+    # A '</' would close the <style> element, and '\/' is the same '/' to CSS
+    return URL.sub(_absolute(static(path)), content).replace("</", "<\\/")
+
+
+@register.simple_tag
+def inline_stylesheet(path):
+    """
+    Output the content of a static stylesheet, see 'stylesheet'.
+
+    Args:
+        path (str): The static path of the stylesheet.
+
+    Returns:
+        str: The content of the stylesheet.
+    """
+    return mark_safe(stylesheet(path))
+
+
+def clear_stylesheets(setting, **kwargs):
+    """
+    Forget the stylesheets read when the static files settings change, as in the tests.
+    """
+    if setting.startswith("STATIC"):
+        stylesheet.cache_clear()
+
+
+setting_changed.connect(clear_stylesheets)
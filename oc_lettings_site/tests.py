@@ -8,8 +8,58 @@ These tests help ensure the correct functionality of the application by testing
  individual units of code.
 """
 
-from django.test import TestCase
+import csv
+import json
+import logging
+import os
+import re
+import runpy
+import sqlite3
+import subprocess
+import sys
+import threading
+from contextlib import closing
+from io import StringIO
+from tempfile import TemporaryDirectory
+from time import sleep
+from unittest import mock
+
+from asgiref.sync import async_to_sync, iscoroutinefunction
+from asgiref.testing import ApplicationCommunicator
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.core.signals import request_finished, request_started
+from django.db import connection, connections
+from django.http import HttpResponse
+from django.templatetags.static import static
+from django.test import RequestFactory, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import resolve, reverse
+from prometheus_client import REGISTRY
+from prometheus_client.parser import text_string_to_metric_families
+from lettings.models import Address, Letting
+from profiles.models import Profile, ProfileQuerySet
+from .admin_utils import EstimatedCountPaginator
+from .asynchronous import ASGIHandler, AsyncWhiteNoiseMiddleware
+from .data_migration_utils import copy_model_data, copy_rows, migration_state_apps
+from .database import (
+    STICKY_COOKIE,
+    PublicViewRouter,
+    ReplicaStickinessMiddleware,
+    public_view,
+)
+from .management.commands.replicate_database import replicate
+from .metrics import exposition, time_query
+from .middleware import is_public_path
+from .query_log import explain, log_query
+from .export import read_columnar
+from .log_handlers import QueueFileHandler
+from . import sentry
+from .sentry import SamplingFeedbackMiddleware, traces_sampler
+from .staticfiles import check_template_assets
+from .stylesheets import above_the_fold, parse, prune, purge, serialize, strip_comments
+from .templatetags.stylesheets import stylesheet
 from .views import index
 
 
@@ -69,3 +119,2036 @@ class TestIndexView(TestCase):
         """
         response = self.client.get(reverse("index"))
         self.assertEqual(response.status_code, 200)
+
+
+class TestQueueFileHandler(TestCase):
+    """
+    Test case for the non-blocking logging handler.
+
+    Methods:
+        test_records_written: Tests that the queued records are written to the file.
+        test_records_dropped: Tests that the records are dropped and counted when the
+        queue is full.
+        test_file_moved: Tests that the file is opened again after it has been moved.
+    """
+
+    def setUp(self):
+        self.directory = TemporaryDirectory()
+        self.filename = os.path.join(self.directory.name, "info.log")
+        self.handler = QueueFileHandler(
+            self.filename, max_queue_size=1, batch_size=1
+        )
+        self.logger = logging.Logger("test_queue_file_handler")
+        self.logger.addHandler(self.handler)
+
+    def tearDown(self):
+        self.handler.close()
+        self.directory.cleanup()
+
+    def read_log(self):
+        with open(self.filename) as log_file:
+            return log_file.read()
+
+    def test_records_written(self):
+        """
+        Test that the queued records are written to the file when the handler is closed.
+
+        Args:
+            self (TestQueueFileHandler): Instance of the test case.
+
+        Raises:
+            AssertionError: If a record is missing from the log file.
+
+        Returns:
+            None
+        """
+        self.logger.warning("first %s", "record")
+        self.handler.close()
+        self.assertIn("first record", self.read_log())
+
+    def test_records_dropped(self):
+        """
+        Test that the records are dropped and counted when the queue is full.
+
+        The file handler lock is held so that the background thread cannot write.
+
+        Args:
+            self (TestQueueFileHandler): Instance of the test case.
+
+        Raises:
+            AssertionError: If the dropped records are not counted and reported.
+
+        Returns:
+            None
+        """
+        with self.handler.target.lock:
+            self.logger.warning("written by the thread")
+            while not self.handler.queue.empty():
+                sleep(0.001)
+            self.logger.warning("queued")
+            self.logger.warning("dropped")
+        self.handler.close()
+        self.assertEqual(self.handler.dropped, 1)
+        log = self.read_log()
+        self.assertIn("queued", log)
+        self.assertNotIn("dropped\n", log)
+        self.assertIn("1 log records dropped", log)
+
+    def test_file_moved(self):
+        """
+        Test that the records are written to a new file once the log file has been moved,
+        as by logrotate.
+
+        Args:
+            self (TestQueueFileHandler): Instance of the test case.
+
+        Raises:
+            AssertionError: If a record is written to the moved file.
+
+        Returns:
+            None
+        """
+        self.handler.target.emit_batch([logging.makeLogRecord({"msg": "before"})])
+        os.rename(self.filename, self.filename + ".1")
+        self.handler.target.emit_batch([logging.makeLogRecord({"msg": "after"})])
+        self.assertEqual(self.read_log(), "after\n")
+        with open(self.filename + ".1") as moved_file:
+            self.assertEqual(moved_file.read(), "before\n")
+
+
+@override_settings(
+    SENTRY_TRACES_SAMPLE_RATE=0.1,
+    SENTRY_QUIET_SAMPLE_RATE=0.0,
+    SENTRY_SLOW_REQUEST_MS=500,
+)
+class TestTracesSampler(TestCase):
+    """
+    Test case for the Sentry traces sampler.
+
+    The boosted routes are forgotten after each test.
+
+    Methods:
+        test_quiet_path: Tests that static files are sampled at the quiet rate.
+        test_default_path: Tests that the other paths are sampled at the base rate.
+        test_parent_sampled: Tests that the decision of the parent trace is kept.
+        test_error_boosts_path: Tests that a 5xx response boosts the sampling of its route.
+        test_boosted_routes_bounded: Tests that the number of boosted routes is bounded.
+    """
+
+    def setUp(self):
+        self.addCleanup(sentry._boosted_until.clear)
+
+    @staticmethod
+    def context(path, **extra):
+        return dict(extra, wsgi_environ={"PATH_INFO": path})
+
+    def test_quiet_path(self):
+        """
+        Test that the static files are sampled at the quiet rate.
+
+        Args:
+            self (TestTracesSampler): Instance of the test case.
+
+        Raises:
+            AssertionError: If the sample rate is not the quiet rate.
+
+        Returns:
+            None
+        """
+        self.assertEqual(traces_sampler(self.context("/static/css/styles.css")), 0.0)
+
+    def test_default_path(self):
+        """
+        Test that the other paths are sampled at the base rate.
+
+        Args:
+            self (TestTracesSampler): Instance of the test case.
+
+        Raises:
+            AssertionError: If the sample rate is not the base rate.
+
+        Returns:
+            None
+        """
+        self.assertEqual(traces_sampler(self.context("/lettings/")), 0.1)
+
+    def test_parent_sampled(self):
+        """
+        Test that the sampling decision of the parent trace is kept.
+
+        Args:
+            self (TestTracesSampler): Instance of the test case.
+
+        Raises:
+            AssertionError: If the sample rate differs from the parent decision.
+
+        Returns:
+            None
+        """
+        context = self.context("/static/js/scripts.js", parent_sampled=True)
+        self.assertEqual(traces_sampler(context), 1.0)
+
+    def test_error_boosts_path(self):
+        """
+        Test that a 5xx response makes every following request to its path traced.
+
+        Args:
+            self (TestTracesSampler): Instance of the test case.
+
+        Raises:
+            AssertionError: If the path is not sampled at 1.0 after the error.
+
+        Returns:
+            None
+        """
+        def broken(request):
+            request.resolver_match = resolve(request.path_info)
+            return HttpResponse(status=503)
+
+        SamplingFeedbackMiddleware(broken)(RequestFactory().get("/profiles/broken/"))
+        self.assertEqual(traces_sampler(self.context("/profiles/broken/")), 1.0)
+        self.assertEqual(traces_sampler(self.context("/profiles/other/")), 1.0)
+        self.assertEqual(traces_sampler(self.context("/profiles/")), 0.1)
+
+    def test_boosted_routes_bounded(self):
+        """
+        Test that no route is boosted beyond MAX_BOOSTED_ROUTES, unless one has expired.
+
+        Args:
+            self (TestTracesSampler): Instance of the test case.
+
+        Raises:
+            AssertionError: If more routes are boosted, or an expired one is kept.
+
+        Returns:
+            None
+        """
+        with mock.patch.object(sentry, "MAX_BOOSTED_ROUTES", 2):
+            sentry.boost("first")
+            sentry.boost("second")
+            sentry.boost("third")
+            self.assertEqual(list(sentry._boosted_until), ["first", "second"])
+            with override_settings(SENTRY_BOOST_SECONDS=-1):
+                sentry.boost("first")
+            sentry.boost("third")
+            self.assertEqual(list(sentry._boosted_until), ["second", "third"])
+
+
+class TestDatabaseTuning(TestCase):
+    """
+    Test case for the database tuning layer.
+
+    Methods:
+        test_pragmas_applied: Tests that the SQLite pragmas are applied to the connection.
+        test_public_view_reads_routed: Tests that the reads of a public view are routed
+        to the public read database.
+    """
+
+    def test_pragmas_applied(self):
+        """
+        Test that the SQLITE_PRAGMAS setting is applied to the database connection.
+
+        Args:
+            self (TestDatabaseTuning): Instance of the test case.
+
+        Raises:
+            AssertionError: If the busy timeout differs from the setting.
+
+        Returns:
+            None
+        """
+        with connection.cursor() as cursor:
+            cursor.execute("PRAGMA busy_timeout")
+            busy_timeout = cursor.fetchone()[0]
+        self.assertEqual(busy_timeout, settings.SQLITE_PRAGMAS["busy_timeout"])
+
+    @override_settings(PUBLIC_READ_DATABASES=["readonly"])
+    def test_public_view_reads_routed(self):
+        """
+        Test that only the reads made by a public view go to the public read database.
+
+        Args:
+            self (TestDatabaseTuning): Instance of the test case.
+
+        Raises:
+            AssertionError: If a read is routed to the wrong database.
+
+        Returns:
+            None
+        """
+        router = PublicViewRouter()
+        view = public_view(lambda request: router.db_for_read(None))
+        self.assertEqual(view(None), "readonly")
+        self.assertIsNone(router.db_for_read(None))
+        self.assertIsNone(router.db_for_write(None))
+
+
+@override_settings(
+    PUBLIC_READ_DATABASES=["replica1", "replica2"], REPLICA_STICKY_SECONDS=10
+)
+class TestReplicaRouting(TestCase):
+    """
+    Test case for the routing of the public views to the replica databases.
+
+    Methods:
+        test_round_robin: Tests that the requests alternate between the replicas.
+        test_least_loaded: Tests that a request goes to the replica with the fewest
+        requests in flight.
+        test_sticky_after_write: Tests that a client reads from the default database
+        after a write.
+        test_replicate: Tests that the replication copies the database content.
+    """
+
+    def setUp(self):
+        self.router = PublicViewRouter()
+        self.view = public_view(lambda request: self.router.db_for_read(None))
+
+    def test_round_robin(self):
+        """
+        Test that consecutive public requests alternate between the replicas.
+
+        Args:
+            self (TestReplicaRouting): Instance of the test case.
+
+        Raises:
+            AssertionError: If the same replica serves two consecutive requests.
+
+        Returns:
+            None
+        """
+        first, second, third = self.view(None), self.view(None), self.view(None)
+        self.assertNotEqual(first, second)
+        self.assertEqual(first, third)
+
+    @override_settings(REPLICA_SELECTION="least_loaded")
+    def test_least_loaded(self):
+        """
+        Test that a request nested in another goes to the other, less loaded, replica.
+
+        Args:
+            self (TestReplicaRouting): Instance of the test case.
+
+        Raises:
+            AssertionError: If both requests are routed to the same replica.
+
+        Returns:
+            None
+        """
+        outer = public_view(lambda request: (self.router.db_for_read(None), self.view(None)))
+        first, second = outer(None)
+        self.assertNotEqual(first, second)
+
+    def test_sticky_after_write(self):
+        """
+        Test that a client which has just written reads from the default database.
+
+        Args:
+            self (TestReplicaRouting): Instance of the test case.
+
+        Raises:
+            AssertionError: If the request following the write reads from a replica.
+
+        Returns:
+            None
+        """
+        middleware = ReplicaStickinessMiddleware(lambda request: HttpResponse())
+        response = middleware(RequestFactory().post("/admin/"))
+        cookie = response.cookies[STICKY_COOKIE].value
+        request = RequestFactory().get("/lettings/")
+        request.COOKIES[STICKY_COOKIE] = cookie
+        routed = ReplicaStickinessMiddleware(
+            lambda request: HttpResponse(self.view(request) or "default")
+        )(request)
+        self.assertEqual(routed.content, b"default")
+
+    def test_replicate(self):
+        """
+        Test that the replication copies the content of the source database.
+
+        Args:
+            self (TestReplicaRouting): Instance of the test case.
+
+        Raises:
+            AssertionError: If the replica does not contain the source rows.
+
+        Returns:
+            None
+        """
+        with TemporaryDirectory() as directory:
+            source = os.path.join(directory, "source.sqlite3")
+            target = os.path.join(directory, "target.sqlite3")
+            with closing(sqlite3.connect(source)) as database:
+                database.execute("CREATE TABLE letting (title TEXT)")
+                database.execute("INSERT INTO letting VALUES ('Test Letting')")
+                database.commit()
+            replicate(source, target)
+            with closing(sqlite3.connect(target)) as database:
+                rows = database.execute("SELECT title FROM letting").fetchall()
+        self.assertEqual(rows, [("Test Letting",)])
+
+
+class TestCopyModelData(TransactionTestCase):
+    """
+    Test case for the batched copy of the data of a model to another app.
+
+    The tables of the models of the 'oc_lettings_site' app, removed by its migrations,
+    are recreated from the migration state for the duration of the tests.
+
+    Methods:
+        test_copy_lettings: Tests that the addresses and lettings are copied with their
+        primary keys and one-to-one relations.
+        test_copy_profiles: Tests that the profiles are copied with their user.
+        test_command_resumes: Tests that the command resumes an interrupted copy and
+        verifies the result.
+        test_command_dry_run: Tests that the dry run reports the rows left to copy.
+        test_command_parallel_sqlite_file: Tests that independent models are copied in
+        parallel on a SQLite database file.
+    """
+
+    def setUp(self):
+        self.apps = migration_state_apps(
+            [("oc_lettings_site", "0002_auto_20240518_1512")]
+        )
+        self.old_models = [
+            self.apps.get_model("oc_lettings_site", name)
+            for name in ("Address", "Letting", "Profile")
+        ]
+        with connection.schema_editor() as schema_editor:
+            for model in self.old_models:
+                schema_editor.create_model(model)
+
+    def tearDown(self):
+        with connection.schema_editor() as schema_editor:
+            for model in reversed(self.old_models):
+                schema_editor.delete_model(model)
+
+    def copy(self, model_name, new_app_name, **kwargs):
+        with connection.schema_editor() as schema_editor:
+            return copy_model_data(
+                self.apps,
+                schema_editor,
+                "oc_lettings_site",
+                model_name,
+                new_app_name,
+                model_name,
+                force_run=True,
+                **kwargs,
+            )
+
+    def create_old_lettings(self):
+        OldAddress, OldLetting, _ = self.old_models
+        for i in range(1, 6):
+            OldAddress.objects.create(
+                id=i * 10,
+                number=i,
+                street="Test Street",
+                city="Test City",
+                state="TS",
+                zip_code=12345,
+                country_iso_code="TSC",
+            )
+            OldLetting.objects.create(id=i, title=f"Test Letting {i}", address_id=i * 10)
+
+    def interrupt(self, copied, last_pk, elapsed):
+        raise KeyboardInterrupt
+
+    def test_copy_lettings(self):
+        """
+        Test that the addresses and lettings are copied in batches with their relations.
+
+        Args:
+            self (TestCopyModelData): Instance of the test case.
+
+        Raises:
+            AssertionError: If a row, a primary key or a relation is not copied, or if
+            the progress is not reported after each batch.
+
+        Returns:
+            None
+        """
+        self.create_old_lettings()
+        reports = []
+        self.copy("Address", "lettings", batch_size=2)
+        copied = self.copy(
+            "Letting",
+            "lettings",
+            batch_size=2,
+            progress=lambda count, last_pk, elapsed: reports.append((count, last_pk)),
+        )
+        self.assertEqual(copied, 5)
+        self.assertEqual(reports, [(2, 2), (4, 4), (5, 5)])
+        Letting = self.apps.get_model("lettings", "Letting")
+        self.assertEqual(
+            list(Letting.objects.order_by("id").values_list("id", "address_id")),
+            [(i, i * 10) for i in range(1, 6)],
+        )
+
+    def test_copy_profiles(self):
+        """
+        Test that the profiles are copied with their user.
+
+        Args:
+            self (TestCopyModelData): Instance of the test case.
+
+        Raises:
+            AssertionError: If the profile or its user is not copied.
+
+        Returns:
+            None
+        """
+        user = User.objects.create(username="testuser")
+        self.old_models[2].objects.create(user_id=user.id, favorite_city="Test City")
+        self.assertEqual(self.copy("Profile", "profiles"), 1)
+        Profile = self.apps.get_model("profiles", "Profile")
+        self.assertEqual(
+            list(Profile.objects.values_list("user_id", "favorite_city")),
+            [(user.id, "Test City")],
+        )
+
+    def test_command_resumes(self):
+        """
+        Test that the command resumes an interrupted copy without duplicating rows.
+
+        The first copy of the addresses is interrupted after its first batch.
+
+        Args:
+            self (TestCopyModelData): Instance of the test case.
+
+        Raises:
+            AssertionError: If the command does not resume after the committed batch or
+            if the verification does not pass.
+
+        Returns:
+            None
+        """
+        self.create_old_lettings()
+        with self.assertRaises(KeyboardInterrupt):
+            copy_rows(
+                self.old_models[0],
+                self.apps.get_model("lettings", "Address"),
+                batch_size=2,
+                progress=self.interrupt,
+            )
+        stdout = StringIO()
+        call_command(
+            "copy_model_data",
+            "oc_lettings_site.Address:lettings.Address",
+            "oc_lettings_site.Letting:lettings.Letting",
+            state=["oc_lettings_site.0002_auto_20240518_1512"],
+            batch_size=2,
+            stdout=stdout,
+        )
+        output = stdout.getvalue()
+        self.assertIn("resuming after primary key 20", output)
+        self.assertIn("oc_lettings_site.Address -> lettings.Address: done, 3 rows", output)
+        self.assertIn("verified 5 rows", output)
+
+    def test_command_dry_run(self):
+        """
+        Test that the dry run reports the rows left to copy and copies nothing.
+
+        Args:
+            self (TestCopyModelData): Instance of the test case.
+
+        Raises:
+            AssertionError: If the reported count is wrong or a row is copied.
+
+        Returns:
+            None
+        """
+        self.create_old_lettings()
+        stdout = StringIO()
+        call_command(
+            "copy_model_data",
+            "oc_lettings_site.Letting:lettings.Letting",
+            state=["oc_lettings_site.0002_auto_20240518_1512"],
+            dry_run=True,
+            stdout=stdout,
+        )
+        self.assertIn("5 rows to copy", stdout.getvalue())
+        self.assertFalse(self.apps.get_model("lettings", "Letting").objects.exists())
+
+    def file_database(self, directory):
+        """
+        Add a migrated SQLite database in a file of `directory`, removed after the test,
+        and return its alias.
+        """
+        alias = "copy_file"
+        connections.databases[alias] = dict(
+            connections.databases["default"], NAME=os.path.join(directory, "copy.sqlite3")
+        )
+
+        def remove():
+            connections[alias].close()
+            del connections.databases[alias]
+            if hasattr(connections._connections, alias):
+                delattr(connections._connections, alias)
+
+        self.addCleanup(remove)
+        call_command("migrate", database=alias, verbosity=0)
+        with connections[alias].schema_editor() as schema_editor:
+            for model in self.old_models:
+                schema_editor.create_model(model)
+        return alias
+
+    def test_command_parallel_sqlite_file(self):
+        """
+        Test that the addresses and profiles, which do not depend on each other, are
+        copied in parallel on a SQLite database file, where a transaction reading the
+        source table while another thread commits a batch fails with "database is
+        locked". The in-memory test database does not have this lock.
+
+        Args:
+            self (TestCopyModelData): Instance of the test case.
+
+        Raises:
+            OperationalError: If a copy fails on the lock of the database.
+            AssertionError: If the verification does not pass.
+
+        Returns:
+            None
+        """
+        OldAddress, _, OldProfile = self.old_models
+        with TemporaryDirectory() as directory:
+            alias = self.file_database(directory)
+            OldAddress.objects.using(alias).bulk_create(
+                OldAddress(
+                    id=i,
+                    number=i % 10000,
+                    street="Test Street",
+                    city="Test City",
+                    state="TS",
+                    zip_code=12345,
+                    country_iso_code="TSC",
+                )
+                for i in range(1, 1001)
+            )
+            User.objects.using(alias).bulk_create(
+                User(id=i, username=f"user{i}") for i in range(1, 1001)
+            )
+            OldProfile.objects.using(alias).bulk_create(
+                OldProfile(user_id=i, favorite_city="Test City") for i in range(1, 1001)
+            )
+            stdout = StringIO()
+            call_command(
+                "copy_model_data",
+                "oc_lettings_site.Address:lettings.Address",
+                "oc_lettings_site.Profile:profiles.Profile",
+                state=["oc_lettings_site.0002_auto_20240518_1512"],
+                batch_size=10,
+                workers=2,
+                database=alias,
+                stdout=stdout,
+            )
+        self.assertEqual(stdout.getvalue().count("verified 1000 rows"), 2)
+
+
+class TestExportData(TestCase):
+    """
+    Test case for the streaming export of the lettings and profiles.
+
+    Methods:
+        setUp: Sets up the test environment.
+        test_export_csv: Tests the CSV export of the lettings with their address.
+        test_export_jsonl: Tests the JSONL export of the profiles with their user.
+        test_export_columnar: Tests that the columnar export reads back identically.
+        test_admin_action: Tests that the admin action streams the selected lettings.
+    """
+
+    def setUp(self):
+        for i in range(5):
+            address = Address.objects.create(
+                number=i,
+                street=f"Street {i}",
+                city="Test City",
+                state="TS",
+                zip_code=12345,
+                country_iso_code="TSC",
+            )
+            Letting.objects.create(address=address, title=f"Letting {i}")
+        self.user = User.objects.create_superuser(
+            username="admin", email="admin@example.com", password="12345"
+        )
+        Profile.objects.create(user=self.user, favorite_city="Paris")
+
+    def test_export_csv(self):
+        """
+        Test that the CSV export has a header and a row per letting, read with a
+        single query.
+
+        Args:
+            self (TestExportData): Instance of the test case.
+
+        Raises:
+            AssertionError: If the rows differ from the lettings or more than one query
+            is executed.
+
+        Returns:
+            None
+        """
+        with TemporaryDirectory() as directory:
+            path = os.path.join(directory, "lettings.csv")
+            with self.assertNumQueries(1):
+                call_command("export_data", "lettings", output=path, stderr=StringIO())
+            with open(path, newline="") as file:
+                rows = list(csv.DictReader(file))
+        self.assertEqual(len(rows), 5)
+        self.assertEqual(rows[0]["title"], "Letting 0")
+        self.assertEqual(rows[4]["address.street"], "Street 4")
+
+    def test_export_jsonl(self):
+        """
+        Test that the JSONL export writes one object per profile to the standard output
+        and reports the throughput.
+
+        Args:
+            self (TestExportData): Instance of the test case.
+
+        Raises:
+            AssertionError: If the objects differ from the profiles or the throughput
+            is not reported.
+
+        Returns:
+            None
+        """
+        output, errors = StringIO(), StringIO()
+        call_command(
+            "export_data", "profiles", format="jsonl", stdout=output, stderr=errors
+        )
+        rows = [json.loads(line) for line in output.getvalue().splitlines()]
+        self.assertEqual(len(rows), 1)
+        self.assertEqual(rows[0]["user.username"], "admin")
+        self.assertEqual(rows[0]["favorite_city"], "Paris")
+        self.assertIn("Exported 1 rows", errors.getvalue())
+
+    def test_export_columnar(self):
+        """
+        Test that the columnar export is split in row groups, dictionary encodes the
+        repeated strings and reads back to the exported values.
+
+        Args:
+            self (TestExportData): Instance of the test case.
+
+        Raises:
+            AssertionError: If the values read back differ from the lettings.
+
+        Returns:
+            None
+        """
+        with TemporaryDirectory() as directory:
+            path = os.path.join(directory, "lettings.col")
+            call_command(
+                "export_data",
+                "lettings",
+                format="columnar",
+                output=path,
+                stderr=StringIO(),
+            )
+            with open(path, "rb") as file:
+                groups = list(read_columnar(file))
+        self.assertEqual(len(groups), 1)
+        self.assertEqual(groups[0]["title"], [f"Letting {i}" for i in range(5)])
+        self.assertEqual(groups[0]["address.city"], ["Test City"] * 5)
+        self.assertEqual(groups[0]["address.zip_code"], [12345] * 5)
+
+    def test_admin_action(self):
+        """
+        Test that the CSV admin action streams the selected lettings only.
+
+        Args:
+            self (TestExportData): Instance of the test case.
+
+        Raises:
+            AssertionError: If the response is not a CSV attachment of the selection.
+
+        Returns:
+            None
+        """
+        self.client.force_login(self.user)
+        selected = Letting.objects.order_by("pk")[:2]
+        response = self.client.post(
+            reverse("admin:lettings_letting_changelist"),
+            {
+                "action": "export_csv",
+                "_selected_action": [letting.pk for letting in selected],
+            },
+        )
+        self.assertEqual(response["Content-Type"], "text/csv")
+        content = b"".join(response.streaming_content).decode()
+        self.assertEqual(len(content.splitlines()), 3)
+        self.assertIn("Letting 1", content)
+        self.assertNotIn("Letting 2", content)
+
+
+class TestEstimatedCountPaginator(TestCase):
+    """
+    Test case for the estimated-count paginator of the admin lists.
+
+    Methods:
+        setUp: Sets up the test environment.
+        test_unfiltered_estimate: Tests that an unfiltered large table is estimated.
+        test_filtered_exact: Tests that a filtered list is counted exactly.
+        test_small_table_exact: Tests that a small table is counted exactly.
+    """
+
+    def setUp(self):
+        for i in range(3):
+            User.objects.create_user(username=f"testuser{i}")
+        User.objects.get(username="testuser1").delete()
+
+    @override_settings(ADMIN_EXACT_COUNT_LIMIT=1)
+    def test_unfiltered_estimate(self):
+        """
+        Test that the count of an unfiltered large table comes from the greatest rowid,
+        without a COUNT query.
+
+        Args:
+            self (TestEstimatedCountPaginator): Instance of the test case.
+
+        Raises:
+            AssertionError: If the count is exact or a COUNT query is executed.
+
+        Returns:
+            None
+        """
+        paginator = EstimatedCountPaginator(User.objects.order_by("pk"), 10)
+        with CaptureQueriesContext(connection) as context:
+            count = paginator.count
+        self.assertEqual(count, User.objects.order_by("-pk").first().pk)
+        self.assertFalse(any("COUNT" in query["sql"] for query in context.captured_queries))
+
+    @override_settings(ADMIN_EXACT_COUNT_LIMIT=1)
+    def test_filtered_exact(self):
+        """
+        Test that a filtered list is counted exactly.
+
+        Args:
+            self (TestEstimatedCountPaginator): Instance of the test case.
+
+        Raises:
+            AssertionError: If the count is not exact.
+
+        Returns:
+            None
+        """
+        queryset = User.objects.filter(username__gte="testuser").order_by("pk")
+        self.assertEqual(EstimatedCountPaginator(queryset, 10).count, 2)
+
+    def test_small_table_exact(self):
+        """
+        Test that a table below ADMIN_EXACT_COUNT_LIMIT is counted exactly.
+
+        Args:
+            self (TestEstimatedCountPaginator): Instance of the test case.
+
+        Raises:
+            AssertionError: If the count is not exact.
+
+        Returns:
+            None
+        """
+        paginator = EstimatedCountPaginator(User.objects.order_by("pk"), 10)
+        self.assertEqual(paginator.count, 2)
+
+
+class TestGunicornConfig(TestCase):
+    """
+    Test case for the gunicorn configuration of the project.
+
+    Methods:
+        load_config: Loads the configuration with the given environment variables.
+        test_gthread_defaults: Tests the default worker model.
+        test_sync_workers: Tests the number of sync workers.
+        test_environment_overrides: Tests that the environment variables override the
+        defaults.
+        test_asgi_workers: Tests the ASGI worker configuration.
+        test_shared_secret: Tests that the workers share a generated secret key.
+        test_post_fork_closes_connections: Tests that a forked worker closes the
+        inherited database connections.
+        test_metrics_directory: Tests the directory of the metrics files of the workers.
+        test_shared_page_cache: Tests that several workers share the page cache, emptied
+        when the server starts.
+        test_shared_log_file: Tests that several workers do not rotate the log file.
+    """
+
+    def load_config(self, **environ):
+        """
+        Load gunicorn.conf.py with the given environment variables and return its values.
+        """
+        path = os.path.join(settings.BASE_DIR, "gunicorn.conf.py")
+        names = (
+            "WEB_CONCURRENCY",
+            "GUNICORN_WORKER_CLASS",
+            "GUNICORN_THREADS",
+            "PROMETHEUS_MULTIPROC_DIR",
+            "PAGE_CACHE_BACKEND",
+            "PAGE_CACHE_LOCATION",
+            "LOG_MAX_BYTES",
+        )
+        with mock.patch.dict(os.environ, environ):
+            for name in names:
+                if name not in environ:
+                    os.environ.pop(name, None)
+            config = runpy.run_path(path)
+            config["environ"] = dict(os.environ)
+        return config
+
+    def test_gthread_defaults(self):
+        """
+        Test that the app is preloaded in threaded workers sized from the CPUs, which are
+        recycled with a jitter.
+
+        Args:
+            self (TestGunicornConfig): Instance of the test case.
+
+        Raises:
+            AssertionError: If a default value differs from the expected one.
+
+        Returns:
+            None
+        """
+        config = self.load_config()
+        self.assertEqual(config["worker_class"], "gthread")
+        self.assertEqual(config["workers"], max(2, config["available_cpus"]()))
+        self.assertEqual(config["threads"], 4)
+        self.assertTrue(config["preload_app"])
+        self.assertEqual(config["max_requests"], 1000)
+        self.assertEqual(config["max_requests_jitter"], 100)
+
+    def test_sync_workers(self):
+        """
+        Test that the sync workers get 2 x CPUs + 1 single-threaded processes.
+
+        Args:
+            self (TestGunicornConfig): Instance of the test case.
+
+        Raises:
+            AssertionError: If the number of workers or threads differs.
+
+        Returns:
+            None
+        """
+        config = self.load_config(GUNICORN_WORKER_CLASS="sync")
+        self.assertEqual(config["workers"], 2 * config["available_cpus"]() + 1)
+        self.assertEqual(config["threads"], 1)
+        self.assertEqual(config["default_workers"]("sync", 4), 9)
+
+    def test_environment_overrides(self):
+        """
+        Test that the number of workers and threads can be set from the environment.
+
+        Args:
+            self (TestGunicornConfig): Instance of the test case.
+
+        Raises:
+            AssertionError: If the environment variables are ignored.
+
+        Returns:
+            None
+        """
+        config = self.load_config(
+            WEB_CONCURRENCY="3", GUNICORN_THREADS="8", GUNICORN_PRELOAD="false"
+        )
+        self.assertEqual(config["workers"], 3)
+        self.assertEqual(config["threads"], 8)
+        self.assertFalse(config["preload_app"])
+
+    def test_asgi_workers(self):
+        """
+        Test that the uvicorn workers serve the ASGI application, one per CPU.
+
+        Args:
+            self (TestGunicornConfig): Instance of the test case.
+
+        Raises:
+            AssertionError: If the application or the number of workers differs.
+
+        Returns:
+            None
+        """
+        config = self.load_config(GUNICORN_WORKER_CLASS="uvicorn.workers.UvicornWorker")
+        self.assertEqual(config["wsgi_app"], "oc_lettings_site.asgi:application")
+        self.assertEqual(config["workers"], config["available_cpus"]())
+        self.assertEqual(self.load_config()["wsgi_app"], "oc_lettings_site.wsgi:application")
+
+    def test_shared_secret(self):
+        """
+        Test that a secret key is generated for all the workers when none is configured.
+
+        Args:
+            self (TestGunicornConfig): Instance of the test case.
+
+        Raises:
+            AssertionError: If no secret is generated or a configured one is replaced.
+
+        Returns:
+            None
+        """
+        self.assertTrue(self.load_config(DJANGO_SECRET="")["environ"]["DJANGO_SECRET"])
+        config = self.load_config(DJANGO_SECRET="configured")
+        self.assertEqual(config["environ"]["DJANGO_SECRET"], "configured")
+
+    def test_post_fork_closes_connections(self):
+        """
+        Test that the post_fork hook closes every database connection of the worker.
+
+        Args:
+            self (TestGunicornConfig): Instance of the test case.
+
+        Raises:
+            AssertionError: If a connection is left open.
+
+        Returns:
+            None
+        """
+        config = self.load_config()
+        inherited = [mock.Mock(), mock.Mock()]
+        with mock.patch("django.db.connections") as connections:
+            connections.all.return_value = inherited
+            config["post_fork"](None, None)
+        for inherited_connection in inherited:
+            inherited_connection.close.assert_called_once_with()
+
+    def test_metrics_directory(self):
+        """
+        Test that the workers write their metrics to a directory emptied when the server
+        starts, and that the files of an exited worker are marked dead.
+
+        Args:
+            self (TestGunicornConfig): Instance of the test case.
+
+        Raises:
+            AssertionError: If the directory is not set, created or emptied, or an exited
+            worker is not marked dead.
+
+        Returns:
+            None
+        """
+        environ = self.load_config()["environ"]
+        self.assertEqual(
+            os.path.basename(environ["PROMETHEUS_MULTIPROC_DIR"]), "oc-lettings-metrics"
+        )
+        with TemporaryDirectory() as directory:
+            metrics_dir = os.path.join(directory, "metrics")
+            config = self.load_config(PROMETHEUS_MULTIPROC_DIR=metrics_dir)
+            self.assertEqual(config["environ"]["PROMETHEUS_MULTIPROC_DIR"], metrics_dir)
+            with mock.patch.dict(os.environ, PROMETHEUS_MULTIPROC_DIR=metrics_dir):
+                config["on_starting"](None)
+                self.assertEqual(os.listdir(metrics_dir), [])
+                with open(os.path.join(metrics_dir, "counter_1.db"), "wb"):
+                    pass
+                config["on_starting"](None)
+                self.assertEqual(os.listdir(metrics_dir), [])
+            with mock.patch("prometheus_client.multiprocess.mark_process_dead") as mark_dead:
+                config["child_exit"](None, mock.Mock(pid=1234))
+            mark_dead.assert_called_once_with(1234)
+
+    def test_shared_page_cache(self):
+        """
+        Test that several workers cache the pages in files they share, emptied when the
+        server starts, and that a page cache local to each worker is refused.
+
+        Args:
+            self (TestGunicornConfig): Instance of the test case.
+
+        Raises:
+            AssertionError: If the page cache of several workers is not shared or not
+            emptied, or a single worker does not keep the default one.
+
+        Returns:
+            None
+        """
+        environ = self.load_config(WEB_CONCURRENCY="2")["environ"]
+        self.assertEqual(
+            environ["PAGE_CACHE_BACKEND"], "oc_lettings_site.page_cache.CountingFileBasedCache"
+        )
+        self.assertEqual(os.path.basename(environ["PAGE_CACHE_LOCATION"]), "oc-lettings-pages")
+        self.assertNotIn("PAGE_CACHE_BACKEND", self.load_config(WEB_CONCURRENCY="1")["environ"])
+        with TemporaryDirectory() as directory:
+            pages_dir = os.path.join(directory, "pages")
+            config = self.load_config(WEB_CONCURRENCY="2", PAGE_CACHE_LOCATION=pages_dir)
+            os.makedirs(pages_dir)
+            with open(os.path.join(pages_dir, "page.djcache"), "wb"):
+                pass
+            environ = {
+                "PROMETHEUS_MULTIPROC_DIR": os.path.join(directory, "metrics"),
+                "PAGE_CACHE_BACKEND": config["environ"]["PAGE_CACHE_BACKEND"],
+                "PAGE_CACHE_LOCATION": pages_dir,
+            }
+            with mock.patch.dict(os.environ, environ):
+                config["on_starting"](None)
+            self.assertEqual(os.listdir(pages_dir), [])
+        with self.assertRaises(RuntimeError):
+            self.load_config(
+                WEB_CONCURRENCY="2",
+                PAGE_CACHE_BACKEND="oc_lettings_site.page_cache.CountingLocMemCache",
+            )
+
+    def test_shared_log_file(self):
+        """
+        Test that several workers leave the rotation of the log file to logrotate.
+
+        Args:
+            self (TestGunicornConfig): Instance of the test case.
+
+        Raises:
+            AssertionError: If several workers rotate the log file, or a single worker
+            does not.
+
+        Returns:
+            None
+        """
+        self.assertEqual(self.load_config(WEB_CONCURRENCY="2")["environ"]["LOG_MAX_BYTES"], "0")
+        self.assertNotIn("LOG_MAX_BYTES", self.load_config(WEB_CONCURRENCY="1")["environ"])
+
+
+class TestAsynchronous(TransactionTestCase):
+    """
+    Test case for the ASGI support of the project.
+
+    Methods:
+        setUp: Sets up the test environment.
+        asgi_get: Sends a GET request to the ASGI handler and returns the response.
+        test_middleware_async_mode: Tests that the middleware of the project run in
+        asynchronous mode.
+        test_streaming_response: Tests that a streaming response querying the database
+        is served.
+        test_request_threads: Tests that the requests reuse the threads of the handler.
+    """
+
+    def setUp(self):
+        for i in range(3):
+            address = Address.objects.create(
+                number=i,
+                street="Test Street",
+                city="Test City",
+                state="TS",
+                zip_code=12345,
+                country_iso_code="TSC",
+            )
+            Letting.objects.create(address=address, title=f"Streamed Letting {i}")
+
+    def asgi_get(self, application, path, query_string=b""):
+        """
+        Send a GET request to the ASGI application and return its status and body.
+        """
+
+        async def get():
+            scope = {
+                "type": "http",
+                "method": "GET",
+                "path": path,
+                "query_string": query_string,
+                "headers": [(b"host", b"testserver")],
+            }
+            communicator = ApplicationCommunicator(application, scope)
+            await communicator.send_input({"type": "http.request"})
+            start = await communicator.receive_output(5)
+            body = b""
+            while True:
+                message = await communicator.receive_output(5)
+                body += message.get("body", b"")
+                if not message.get("more_body"):
+                    break
+            await communicator.wait(5)
+            return start["status"], body
+
+        return async_to_sync(get)()
+
+    def test_middleware_async_mode(self):
+        """
+        Test that the middleware of the project wrap an asynchronous handler without a
+        thread, with the behavior of their synchronous mode.
+
+        Args:
+            self (TestAsynchronous): Instance of the test case.
+
+        Raises:
+            AssertionError: If a middleware is not asynchronous or behaves differently.
+
+        Returns:
+            None
+        """
+
+        async def get_response(request):
+            request.resolver_match = resolve(request.path_info)
+            return HttpResponse(status=503)
+
+        self.addCleanup(sentry._boosted_until.clear)
+        stickiness = ReplicaStickinessMiddleware(get_response)
+        feedback = SamplingFeedbackMiddleware(get_response)
+        self.assertTrue(iscoroutinefunction(stickiness))
+        self.assertTrue(iscoroutinefunction(feedback))
+        response = async_to_sync(stickiness)(RequestFactory().post("/admin/"))
+        self.assertIn(STICKY_COOKIE, response.cookies)
+        async_to_sync(feedback)(RequestFactory().get("/profiles/async/"))
+        context = {"wsgi_environ": {"PATH_INFO": "/profiles/async/"}}
+        self.assertEqual(traces_sampler(context), 1.0)
+
+    def test_streaming_response(self):
+        """
+        Test that the streamed lettings index, whose iterator queries the database, is
+        served by the ASGI handler, which closes it once sent.
+
+        Args:
+            self (TestAsynchronous): Instance of the test case.
+
+        Raises:
+            AssertionError: If the response is not a 200 listing every letting, or its
+            request is not finished and recorded in the metrics.
+
+        Returns:
+            None
+        """
+        labels = {"route": "lettings_index", "method": "GET", "status": "200"}
+        requests = REGISTRY.get_sample_value("http_requests_total", labels) or 0
+        finished = []
+
+        def record_finished(**kwargs):
+            finished.append(True)
+
+        request_finished.connect(record_finished)
+        self.addCleanup(request_finished.disconnect, record_finished)
+        status, body = self.asgi_get(ASGIHandler(), "/lettings/", b"stream=1")
+        self.assertEqual(status, 200)
+        for i in range(3):
+            self.assertIn(f"Streamed Letting {i}".encode(), body)
+        self.assertEqual(finished, [True])
+        self.assertEqual(REGISTRY.get_sample_value("http_requests_total", labels), requests + 1)
+
+    @override_settings(ASGI_THREADS=1)
+    def test_request_threads(self):
+        """
+        Test that the synchronous code of successive requests runs in the same long-lived
+        thread of the handler, which keeps its database connection.
+
+        Args:
+            self (TestAsynchronous): Instance of the test case.
+
+        Raises:
+            AssertionError: If the requests run in different or new threads.
+
+        Returns:
+            None
+        """
+        threads = []
+
+        def record_thread(**kwargs):
+            threads.append(threading.current_thread())
+
+        application = ASGIHandler()
+        request_started.connect(record_thread)
+        try:
+            for _ in range(2):
+                self.assertEqual(self.asgi_get(application, "/")[0], 200)
+        finally:
+            request_started.disconnect(record_thread)
+        self.assertEqual(len(threads), 2)
+        self.assertIs(threads[0], threads[1])
+        self.assertTrue(threads[0].name.startswith("asgi"))
+
+
+class TestStaticFiles(TestCase):
+    """
+    Test case for the static files pipeline.
+
+    Methods:
+        collect: Collects a small set of static files into a temporary STATIC_ROOT.
+        test_url_without_manifest: Tests that the assets keep their names and the check
+        fails before collectstatic.
+        test_hashed_and_compressed: Tests that collectstatic hashes and precompresses the
+        assets.
+        test_immutable_caching: Tests that the hashed assets are cached for ever.
+        test_check_template_assets: Tests that a template referencing an asset missing
+        from the manifest fails the check.
+    """
+
+    def collect(self, directory):
+        """
+        Collect the files of a temporary static directory, with a stylesheet referencing
+        an existing and a missing image, and return the settings override in effect.
+        """
+        source = os.path.join(directory, "source")
+        os.makedirs(os.path.join(source, "css"))
+        os.makedirs(os.path.join(source, "img"))
+        with open(os.path.join(source, "css", "site.css"), "w") as file:
+            file.write(
+                'body { background: url("../img/logo.png"); }\n'
+                '.waves { background: url("../img/missing.svg"); }\n' * 50
+            )
+        with open(os.path.join(source, "img", "logo.png"), "wb") as file:
+            file.write(b"\x89PNG" + bytes(100))
+        override = override_settings(
+            STATICFILES_DIRS=[source], STATIC_ROOT=os.path.join(directory, "static")
+        )
+        override.enable()
+        self.addCleanup(override.disable)
+        call_command(
+            "collectstatic", interactive=False, ignore_patterns=["admin"], verbosity=0
+        )
+
+    def test_url_without_manifest(self):
+        """
+        Test that the URL of an asset keeps its name until collectstatic has run, while
+        the deploy check reports the missing manifest.
+
+        Args:
+            self (TestStaticFiles): Instance of the test case.
+
+        Raises:
+            AssertionError: If the URL or the errors differ.
+
+        Returns:
+            None
+        """
+        self.assertEqual(static("css/styles.css"), "/static/css/styles.css")
+        self.assertEqual(
+            [error.id for error in check_template_assets(None)], ["oc_lettings_site.E001"]
+        )
+
+    def test_hashed_and_compressed(self):
+        """
+        Test that collectstatic writes hashed, gzip and brotli copies of the assets and
+        rewrites the references of the stylesheets, leaving the missing ones unchanged.
+
+        Args:
+            self (TestStaticFiles): Instance of the test case.
+
+        Raises:
+            AssertionError: If a hashed or compressed file is missing.
+
+        Returns:
+            None
+        """
+        with TemporaryDirectory() as directory:
+            self.collect(directory)
+            url = static("css/site.css")
+            self.assertRegex(url, r"^/static/css/site\.[0-9a-f]{12}\.css$")
+            path = os.path.join(settings.STATIC_ROOT, url[len("/static/"):])
+            for suffix in ("", ".gz", ".br"):
+                self.assertTrue(os.path.exists(path + suffix))
+            with open(path) as file:
+                content = file.read()
+            self.assertIn(static("img/logo.png").rsplit("/", 1)[1], content)
+            self.assertIn('url("../img/missing.svg")', content)
+
+    def test_immutable_caching(self):
+        """
+        Test that the hashed assets are served precompressed and cached for ever, and
+        the others for a short time.
+
+        Args:
+            self (TestStaticFiles): Instance of the test case.
+
+        Raises:
+            AssertionError: If the caching or encoding headers differ.
+
+        Returns:
+            None
+        """
+        with TemporaryDirectory() as directory:
+            self.collect(directory)
+            middleware = AsyncWhiteNoiseMiddleware(lambda request: HttpResponse(status=404))
+            request = RequestFactory().get(static("css/site.css"), HTTP_ACCEPT_ENCODING="br")
+            response = middleware(request)
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response["Content-Encoding"], "br")
+            self.assertIn("immutable", response["Cache-Control"])
+            self.assertIn("max-age=315360000", response["Cache-Control"])
+            response = middleware(RequestFactory().get("/static/css/site.css"))
+            self.assertNotIn("immutable", response["Cache-Control"])
+            response.close()
+
+    def test_check_template_assets(self):
+        """
+        Test that the deploy check reports the assets of the templates missing from the
+        manifest.
+
+        Args:
+            self (TestStaticFiles): Instance of the test case.
+
+        Raises:
+            AssertionError: If the errors differ from the expected ones.
+
+        Returns:
+            None
+        """
+        with TemporaryDirectory() as directory:
+            self.collect(directory)
+            self.assertEqual(
+                {error.obj for error in check_template_assets(None)},
+                {
+                    "css/critical.css",
+                    "css/styles.purged.css",
+                    "js/scripts.js",
+                    "assets/img/logo.png",
+                    "assets/fonts/metropolis/Metropolis-Regular.otf",
+                },
+            )
+            with override_settings(TEMPLATES=[{**settings.TEMPLATES[0], "DIRS": []}]):
+                self.assertEqual(check_template_assets(None), [])
+
+
+class TestStylesheets(TestCase):
+    """
+    Test case for the purged and critical stylesheets.
+
+    Methods:
+        test_purge: Tests that the rules which cannot match the pages are removed.
+        test_above_the_fold: Tests the part of the templates styled by the critical
+        stylesheet.
+        test_build_css_up_to_date: Tests that the written stylesheets match the templates.
+        test_inline_stylesheet: Tests that the critical stylesheet is inlined in the pages
+        with absolute URLs.
+        test_self_hosted_assets: Tests that the pages only load deferred assets of the
+        site.
+    """
+
+    def test_purge(self):
+        """
+        Test that purging keeps the selectors whose names are all used, and drops the
+        custom properties, keyframes and font faces the kept rules do not use.
+
+        Args:
+            self (TestStylesheets): Instance of the test case.
+
+        Raises:
+            AssertionError: If the purged stylesheet differs from the expected one.
+
+        Returns:
+            None
+        """
+        text, licenses = strip_comments(
+            """
+            @charset "UTF-8";
+            /*! License */
+            /* Comment */
+            :root { --used: 1px; --read: var(--used); --unused: 2px; }
+            .btn, .card > .btn:hover, .unused .btn { margin: var(--read); content: "}"; }
+            a:not(.unused)::before { animation: spin 1s; }
+            @media (min-width: 576px) { .unused { color: red; } .btn { color: blue; } }
+            @media print { .unused { color: red; } }
+            @keyframes spin { from { opacity: 0; } to { opacity: 1; } }
+            @keyframes fade { from { opacity: 0; } }
+            @font-face { font-family: "Used"; src: url("../used.otf"); }
+            @font-face { font-family: "Unused"; src: url("../unused.otf"); }
+            .text { font-family: Used, sans-serif; background: url(data:image/png;base64,A); }
+            [type=button] { cursor: pointer; }
+            """
+        )
+        names = {"btn", "card", "a", "text"}
+        self.assertEqual(licenses, ["/*! License */"])
+        self.assertEqual(
+            serialize(prune(purge(parse(text), names), names)),
+            '@charset "UTF-8";'
+            ":root{--used:1px;--read:var(--used)}"
+            '.btn,.card>.btn:hover{margin:var(--read);content:"}"}'
+            "a:not(.unused)::before{animation:spin 1s}"
+            "@media (min-width: 576px){.btn{color:blue}}"
+            "@keyframes spin{from{opacity:0}to{opacity:1}}"
+            '@font-face{font-family:"Used";src:url("../used.otf");font-display:swap}'
+            ".text{font-family:Used, sans-serif;background:url(data:image/png;base64,A)}"
+            "[type=button]{cursor:pointer}",
+        )
+
+    def test_above_the_fold(self):
+        """
+        Test that the critical part of the base template is the layout before its content
+        block, and the one of a page is its content up to its title.
+
+        Args:
+            self (TestStylesheets): Instance of the test case.
+
+        Raises:
+            AssertionError: If a returned part differs from the expected one.
+
+        Returns:
+            None
+        """
+        self.assertEqual(
+            above_the_fold('<nav class="navbar"></nav>{% block content %}{% endblock %}'),
+            '<nav class="navbar"></nav>',
+        )
+        self.assertEqual(
+            above_the_fold(
+                '{% extends "base.html" %}{% block content %}<h1 class="title">Title</h1>'
+                '<ul class="list-group"></ul>{% endblock %}'
+            ),
+            '{% extends "base.html" %}{% block content %}<h1 class="title">Title',
+        )
+        self.assertEqual(above_the_fold('<li class="list-group-item"></li>'), "")
+
+    def test_build_css_up_to_date(self):
+        """
+        Test that the purged and critical stylesheets are those built from the templates.
+
+        Args:
+            self (TestStylesheets): Instance of the test case.
+
+        Raises:
+            AssertionError: If 'build_css --check' fails.
+
+        Returns:
+            None
+        """
+        output = StringIO()
+        call_command("build_css", check=True, stdout=output)
+        self.assertIn("css/critical.css", output.getvalue())
+
+    def test_inline_stylesheet(self):
+        """
+        Test that the pages inline the critical stylesheet and load the purged one
+        without blocking, and that the inlined URLs point to the hashed files once
+        collected.
+
+        Args:
+            self (TestStylesheets): Instance of the test case.
+
+        Raises:
+            AssertionError: If the page or the inlined stylesheet differs.
+
+        Returns:
+            None
+        """
+        response = self.client.get(reverse("index"))
+        self.assertContains(response, '<style>:root{')
+        self.assertContains(response, 'url("/static/assets/fonts/metropolis/')
+        self.assertContains(response, 'href="/static/css/styles.purged.css" as="style"')
+        self.assertNotContains(response, "css/styles.css")
+        with TemporaryDirectory() as directory:
+            source = os.path.join(directory, "source")
+            os.makedirs(os.path.join(source, "css"))
+            os.makedirs(os.path.join(source, "img"))
+            with open(os.path.join(source, "css", "critical.css"), "w") as file:
+                file.write('body{background:url("../img/logo.png")}a::after{content:"</"}')
+            with open(os.path.join(source, "img", "logo.png"), "wb") as file:
+                file.write(b"\x89PNG")
+            with override_settings(
+                STATICFILES_DIRS=[source], STATIC_ROOT=os.path.join(directory, "static")
+            ):
+                call_command(
+                    "collectstatic", interactive=False, ignore_patterns=["admin"], verbosity=0
+                )
+                self.assertEqual(
+                    stylesheet("css/critical.css"),
+                    f'body{{background:url("{static("img/logo.png")}")}}'
+                    'a::after{content:"<\\/"}',
+                )
+                self.assertRegex(static("img/logo.png"), r"^/static/img/logo\.[0-9a-f]{12}\.png$")
+
+    def test_self_hosted_assets(self):
+        """
+        Test that the pages load their assets from the static files of the site, and no
+        script blocking the parsing of the page.
+
+        Args:
+            self (TestStylesheets): Instance of the test case.
+
+        Raises:
+            AssertionError: If a page loads a third-party asset or a blocking script.
+
+        Returns:
+            None
+        """
+        content = self.client.get(reverse("index")).content.decode()
+        sources = re.findall(r'(?:src|href)="([^"]+)"', content)
+        self.assertIn("/static/js/scripts.js", sources)
+        self.assertFalse([source for source in sources if "//" in source])
+        self.assertEqual(
+            re.findall(r"<script[^>]*>", content),
+            ['<script defer src="/static/js/scripts.js">'],
+        )
+
+
+class TestLeanPath(TestCase):
+    """
+    Test case for the lean middleware path of the anonymous requests to the public views.
+
+    Methods:
+        setUp: Creates a letting and an administrator.
+        test_public_paths: Tests which paths are served by public views.
+        test_anonymous_read: Tests that an anonymous read of a public view skips the
+        session and user middleware.
+        test_whole_stack: Tests that the other requests go through the whole stack.
+    """
+
+    def setUp(self):
+        address = Address.objects.create(
+            number=1,
+            street="Street",
+            city="City",
+            state="CA",
+            zip_code=99999,
+            country_iso_code="USA",
+        )
+        Letting.objects.create(title="Letting", address=address)
+        self.admin = User.objects.create_superuser("admin", "admin@example.com", "password")
+
+    def test_public_paths(self):
+        """
+        Test that the lettings, profiles and API paths are public, and the index, admin
+        and unknown paths are not.
+
+        Args:
+            self (TestLeanPath): Instance of the test case.
+
+        Raises:
+            AssertionError: If a path is wrongly classified.
+
+        Returns:
+            None
+        """
+        for path in ("/lettings/", "/lettings/1/", "/profiles/admin/", "/api/lettings/"):
+            self.assertTrue(is_public_path(path), path)
+        for path in ("/", "/admin/", "/admin/login/", "/unknown/"):
+            self.assertFalse(is_public_path(path), path)
+
+    def test_anonymous_read(self):
+        """
+        Test that an anonymous read of a public view is served without a session or a
+        user, and sets no cookie.
+
+        Args:
+            self (TestLeanPath): Instance of the test case.
+
+        Raises:
+            AssertionError: If the request went through the session or user middleware.
+
+        Returns:
+            None
+        """
+        for path in ("/lettings/", "/lettings/1/", "/profiles/"):
+            response = self.client.get(path)
+            self.assertEqual(response.status_code, 200)
+            self.assertFalse(hasattr(response.wsgi_request, "session"))
+            self.assertFalse(hasattr(response.wsgi_request, "user"))
+            self.assertFalse(response.cookies)
+
+    def test_whole_stack(self):
+        """
+        Test that the requests with a session cookie, the unsafe requests and the
+        requests of the other views go through the whole stack.
+
+        Args:
+            self (TestLeanPath): Instance of the test case.
+
+        Raises:
+            AssertionError: If one of them skipped the session or user middleware.
+
+        Returns:
+            None
+        """
+        response = self.client.get("/admin/login/")
+        self.assertTrue(hasattr(response.wsgi_request, "user"))
+        self.assertIn(settings.CSRF_COOKIE_NAME, response.cookies)
+        response = self.client.post("/api/lettings/batch/?ids=1")
+        self.assertEqual(response.status_code, 405)
+        self.assertTrue(hasattr(response.wsgi_request, "user"))
+        self.client.force_login(self.admin)
+        response = self.client.get("/lettings/1/")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.wsgi_request.user, self.admin)
+
+
+class TestMetrics(TestCase):
+    """
+    Test case for the Prometheus metrics of the project.
+
+    Methods:
+        setUp: Creates a letting and a profile.
+        sample: Returns the value of a sample of the in-memory metrics.
+        test_route_metrics: Tests the metrics recorded for the requests of each route.
+        test_streaming_response: Tests that a streaming response is observed once sent.
+        test_query_wrapper: Tests that the queries of every connection are timed.
+        test_endpoint_authorization: Tests who can read the /metrics endpoint.
+        test_multiprocess_aggregation: Tests that the metrics of the workers are
+        aggregated.
+    """
+
+    def setUp(self):
+        address = Address.objects.create(
+            number=1,
+            street="Street",
+            city="City",
+            state="CA",
+            zip_code=99999,
+            country_iso_code="USA",
+        )
+        Letting.objects.create(title="Letting", address=address)
+        user = User.objects.create_user("user1", password="password")
+        Profile.objects.create(user=user, favorite_city="City")
+
+    def sample(self, name, **labels):
+        """
+        Return the value of a sample of the in-memory metrics, 0 if it was not recorded.
+        """
+        return REGISTRY.get_sample_value(name, labels) or 0
+
+    def test_route_metrics(self):
+        """
+        Test that the requests are counted, timed and have their queries and templates
+        timed under the name of their route.
+
+        Args:
+            self (TestMetrics): Instance of the test case.
+
+        Raises:
+            AssertionError: If a metric of a route is not recorded.
+
+        Returns:
+            None
+        """
+        for path, route in (
+            ("/", "index"),
+            ("/lettings/", "lettings_index"),
+            ("/lettings/1/", "letting"),
+            ("/profiles/", "profiles_index"),
+            ("/profiles/user1/", "profile"),
+        ):
+            requests = self.sample(
+                "http_requests_total", route=route, method="GET", status="200"
+            )
+            observed = self.sample("http_request_duration_seconds_count", route=route)
+            template_seconds = self.sample("template_render_seconds_total", route=route)
+            self.assertEqual(self.client.get(path).status_code, 200)
+            self.assertEqual(
+                self.sample("http_requests_total", route=route, method="GET", status="200"),
+                requests + 1,
+                route,
+            )
+            self.assertEqual(
+                self.sample("http_request_duration_seconds_count", route=route), observed + 1
+            )
+            self.assertGreater(
+                self.sample("template_render_seconds_total", route=route), template_seconds
+            )
+        queries = self.sample("db_queries_total", route="profile")
+        with CaptureQueriesContext(connection) as captured:
+            self.client.get("/profiles/user1/")
+        self.assertEqual(
+            self.sample("db_queries_total", route="profile"), queries + len(captured)
+        )
+        self.assertGreater(self.sample("db_query_seconds_total", route="profile"), 0)
+        requests = self.sample(
+            "http_requests_total", route="unmatched", method="GET", status="404"
+        )
+        self.client.get("/unknown/")
+        self.assertEqual(
+            self.sample("http_requests_total", route="unmatched", method="GET", status="404"),
+            requests + 1,
+        )
+
+    def test_streaming_response(self):
+        """
+        Test that a streaming response is observed when it has been sent, with the queries
+        and templates of its rows.
+
+        Args:
+            self (TestMetrics): Instance of the test case.
+
+        Raises:
+            AssertionError: If the response is observed before it is sent, or not once.
+
+        Returns:
+            None
+        """
+        labels = {"route": "lettings_index", "method": "GET", "status": "200"}
+        requests = self.sample("http_requests_total", **labels)
+        queries = self.sample("db_queries_total", route="lettings_index")
+        response = self.client.get("/lettings/?stream=1")
+        self.assertTrue(response.streaming)
+        self.assertEqual(self.sample("http_requests_total", **labels), requests)
+        with CaptureQueriesContext(connection) as captured:
+            content = b"".join(response.streaming_content)
+        self.assertIn(b"Letting", content)
+        response.close()
+        self.assertEqual(self.sample("http_requests_total", **labels), requests + 1)
+        self.assertGreater(
+            self.sample("db_queries_total", route="lettings_index"), queries + len(captured)
+        )
+
+    def test_query_wrapper(self):
+        """
+        Test that the query wrappers of the metrics and the query log are installed first
+        on the connection, and stay there when another wrapper is removed.
+
+        Args:
+            self (TestMetrics): Instance of the test case.
+
+        Raises:
+            AssertionError: If a wrapper is missing or installed twice.
+
+        Returns:
+            None
+        """
+        connection.ensure_connection()
+        self.assertCountEqual(connection.execute_wrappers, [time_query, log_query])
+        with connection.execute_wrapper(lambda execute, *args: execute(*args)):
+            Letting.objects.count()
+        self.assertCountEqual(connection.execute_wrappers, [time_query, log_query])
+
+    @override_settings(METRICS_TOKEN="secret")
+    def test_endpoint_authorization(self):
+        """
+        Test that the metrics are served with the configured bearer token or to a staff
+        user, and refused otherwise.
+
+        Args:
+            self (TestMetrics): Instance of the test case.
+
+        Raises:
+            AssertionError: If an unauthorized request gets the metrics, or an authorized
+            one does not.
+
+        Returns:
+            None
+        """
+        self.client.get("/lettings/")
+        for headers in ({}, {"HTTP_AUTHORIZATION": "Bearer wrong"}):
+            response = self.client.get("/metrics", **headers)
+            self.assertEqual(response.status_code, 401)
+            self.assertEqual(response["WWW-Authenticate"], 'Bearer realm="metrics"')
+        response = self.client.get("/metrics", HTTP_AUTHORIZATION="Bearer secret")
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response["Content-Type"].startswith("text/plain; version="))
+        self.assertIn("no-cache", response["Cache-Control"])
+        names = {
+            family.name for family in text_string_to_metric_families(response.content.decode())
+        }
+        self.assertLessEqual(
+            {"http_requests", "http_request_duration_seconds", "db_queries"}, names
+        )
+        with override_settings(METRICS_TOKEN=""):
+            response = self.client.get("/metrics", HTTP_AUTHORIZATION="Bearer ")
+            self.assertEqual(response.status_code, 401)
+            self.client.force_login(User.objects.create_user("staff", is_staff=True))
+            self.assertEqual(self.client.get("/metrics").status_code, 200)
+
+    def test_multiprocess_aggregation(self):
+        """
+        Test that the metrics written by several processes to PROMETHEUS_MULTIPROC_DIR are
+        summed up by the endpoint.
+
+        Args:
+            self (TestMetrics): Instance of the test case.
+
+        Raises:
+            AssertionError: If the metrics of a process are missing.
+
+        Returns:
+            None
+        """
+        script = (
+            "import django; django.setup(); "
+            "from oc_lettings_site.metrics import LATENCY, REQUESTS; "
+            "REQUESTS.labels('profile', 'GET', '200').inc(); "
+            "LATENCY.labels('profile').observe(0.02)"
+        )
+        with TemporaryDirectory() as directory:
+            environ = dict(
+                os.environ,
+                DJANGO_SETTINGS_MODULE="oc_lettings_site.settings",
+                PROMETHEUS_MULTIPROC_DIR=directory,
+            )
+            for _ in range(2):
+                subprocess.run(
+                    [sys.executable, "-c", script],
+                    cwd=settings.BASE_DIR,
+                    env=environ,
+                    check=True,
+                )
+            with mock.patch.dict(os.environ, PROMETHEUS_MULTIPROC_DIR=directory):
+                metrics = exposition().decode()
+        samples = {
+            (sample.name, tuple(sorted(sample.labels.items()))): sample.value
+            for family in text_string_to_metric_families(metrics)
+            for sample in family.samples
+        }
+        labels = (("method", "GET"), ("route", "profile"), ("status", "200"))
+        self.assertEqual(samples[("http_requests_total", labels)], 2)
+        self.assertEqual(
+            samples[("http_request_duration_seconds_bucket", (("le", "0.025"), *labels[1:2]))],
+            2,
+        )
+
+
+class TestQueryLog(TestCase):
+    """
+    Test case for the slow-query log and the SQL summary of the requests.
+
+    Methods:
+        setUp: Creates profiles and a directory for the switch file.
+        test_off: Tests that nothing is logged while the query log is off.
+        test_summary: Tests the summary of the queries of a request.
+        test_slow_query: Tests that a slow query is logged with its origin and plan.
+        test_slow_query_params: Tests that the parameters of a slow query are only
+        logged when QUERY_LOG_PARAMS is set.
+        test_repeated_queries: Tests that the N+1 queries of a template are detected.
+        test_runtime_switch: Tests that the query log is switched by the command.
+    """
+
+    def setUp(self):
+        for i in range(6):
+            user = User.objects.create_user(f"user{i}", password="password")
+            Profile.objects.create(user=user, favorite_city="City")
+        directory = TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.switch_file = os.path.join(directory.name, "query-log")
+        switch = override_settings(QUERY_LOG=False, QUERY_LOG_SWITCH_FILE=self.switch_file)
+        switch.enable()
+        self.addCleanup(switch.disable)
+
+    def test_off(self):
+        """
+        Test that the queries are not followed while the query log is off.
+
+        Args:
+            self (TestQueryLog): Instance of the test case.
+
+        Raises:
+            AssertionError: If a query or a summary is logged.
+
+        Returns:
+            None
+        """
+        with self.assertNoLogs("oc_lettings_site.query_log"):
+            with override_settings(QUERY_LOG_SLOW_MS=0):
+                self.assertEqual(self.client.get("/profiles/").status_code, 200)
+
+    @override_settings(QUERY_LOG=True)
+    def test_summary(self):
+        """
+        Test that the queries of a request are summed up in a single line, and that the
+        profiles list runs no repeated query.
+
+        Args:
+            self (TestQueryLog): Instance of the test case.
+
+        Raises:
+            AssertionError: If the summary is missing or wrong, or a query is repeated.
+
+        Returns:
+            None
+        """
+        with self.assertLogs("oc_lettings_site.query_log", "INFO") as logs:
+            with CaptureQueriesContext(connection) as captured:
+                self.client.get("/profiles/")
+        self.assertEqual(len(logs.records), 1)
+        self.assertEqual(logs.records[0].levelname, "INFO")
+        self.assertRegex(
+            logs.records[0].getMessage(),
+            rf"^Queries of GET /profiles/ \(profiles_index, 200\): {len(captured)} in "
+            r"[0-9.]+ ms, [0-9]+ distinct, 0 slow, 0 repeated$",
+        )
+
+    @override_settings(QUERY_LOG=True, QUERY_LOG_SLOW_MS=0)
+    def test_slow_query(self):
+        """
+        Test that a query slower than the threshold is logged with its route, the line of
+        the project which ran it and its plan.
+
+        Args:
+            self (TestQueryLog): Instance of the test case.
+
+        Raises:
+            AssertionError: If the slow query is not logged with these details.
+
+        Returns:
+            None
+        """
+        with self.assertLogs("oc_lettings_site.query_log", "WARNING") as logs:
+            self.client.get("/profiles/")
+        messages = [record.getMessage() for record in logs.records]
+        validators = [message for message in messages if "aggregate_validators" in message]
+        self.assertEqual(len(validators), 1)
+        self.assertRegex(
+            validators[0],
+            r"^Slow query, [0-9.]+ ms in profiles_index at "
+            r"oc_lettings_site/conditional\.py:[0-9]+ in aggregate_validators: "
+            r"SELECT .*\n  SCAN profiles_profile USING COVERING INDEX ",
+        )
+        plan = explain("DELETE FROM x", [], False, connection)
+        self.assertEqual(plan, "  No plan for this statement.")
+        plan = explain("SELECT * FROM x", [], False, connection)
+        self.assertEqual(plan, "  No plan: no such table: x")
+        plan = explain("WITH x AS (SELECT 1) SELECT * FROM x", [], False, connection)
+        self.assertNotIn("No plan", plan)
+
+    @override_settings(QUERY_LOG=True, QUERY_LOG_SLOW_MS=0)
+    def test_slow_query_params(self):
+        """
+        Test that the parameters of the slow queries, like a username, are left out of
+        the log unless QUERY_LOG_PARAMS is set.
+
+        Args:
+            self (TestQueryLog): Instance of the test case.
+
+        Raises:
+            AssertionError: If the username is logged without QUERY_LOG_PARAMS, or not
+            logged with it.
+
+        Returns:
+            None
+        """
+        for logged in (False, True):
+            with override_settings(QUERY_LOG_PARAMS=logged):
+                with self.assertLogs("oc_lettings_site.query_log", "WARNING") as logs:
+                    self.client.get("/profiles/user1/")
+            messages = "\n".join(record.getMessage() for record in logs.records)
+            self.assertEqual("'user1'" in messages, logged)
+
+    @override_settings(QUERY_LOG=True, QUERY_LOG_REPEATED_QUERIES=5)
+    def test_repeated_queries(self):
+        """
+        Test that a user queried for every profile of the list template is reported once,
+        with the template and the view rendering it.
+
+        Args:
+            self (TestQueryLog): Instance of the test case.
+
+        Raises:
+            AssertionError: If the N+1 query is not reported as expected.
+
+        Returns:
+            None
+        """
+        with mock.patch.object(ProfileQuerySet, "for_list", ProfileQuerySet.all):
+            with self.assertLogs("oc_lettings_site.query_log", "INFO") as logs:
+                self.client.get("/profiles/")
+        warnings = [
+            record.getMessage() for record in logs.records if record.levelname == "WARNING"
+        ]
+        self.assertEqual(len(warnings), 1)
+        self.assertRegex(
+            warnings[0],
+            r"^Repeated query, likely N\+1: run 6 times in [0-9.]+ ms in profiles_index at "
+            r"profiles/views\.py:[0-9]+ in index_response, rendering profiles/index\.html: "
+            r'SELECT .* FROM "auth_user" WHERE "auth_user"\."id" = %s',
+        )
+        self.assertTrue(logs.records[-1].getMessage().endswith(", 1 repeated"))
+
+    def test_runtime_switch(self):
+        """
+        Test that the command switches the query log on and off through its file.
+
+        Args:
+            self (TestQueryLog): Instance of the test case.
+
+        Raises:
+            AssertionError: If the requests are not logged while the log is on only.
+
+        Returns:
+            None
+        """
+        output = StringIO()
+        call_command("query_log", "on", stdout=output)
+        self.assertTrue(os.path.exists(self.switch_file))
+        self.assertIn("on, until", output.getvalue())
+        with self.assertLogs("oc_lettings_site.query_log", "INFO"):
+            self.client.get("/profiles/")
+        output = StringIO()
+        call_command("query_log", "off", stdout=output)
+        self.assertFalse(os.path.exists(self.switch_file))
+        self.assertEqual(output.getvalue(), "The query log is off.\n")
+        with self.assertNoLogs("oc_lettings_site.query_log"):
+            self.client.get("/profiles/")
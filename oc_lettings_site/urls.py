@@ -11,11 +11,25 @@ matching pattern.
 from django.contrib import admin
 from django.urls import path, include
 
+from lettings import api as lettings_api
+from profiles import api as profiles_api
+from . import converters  # noqa: F401
 from . import views
 
 urlpatterns = [
     path("", views.index, name="index"),
     path("lettings/", include("lettings.urls")),
     path("profiles/", include("profiles.urls")),
+    path("api/lettings/", lettings_api.letting_list, name="api_lettings"),
+    path("api/lettings/batch/", lettings_api.letting_batch, name="api_lettings_batch"),
+    path(
+        "api/lettings/<pk:letting_id>/",
+        lettings_api.letting_detail,
+        name="api_letting",
+    ),
+    path(
+        "api/profiles/<str:username>/", profiles_api.profile_detail, name="api_profile"
+    ),
+    path("metrics", views.metrics, name="metrics"),
     path("admin/", admin.site.urls),
 ]
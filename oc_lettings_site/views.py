@@ -6,8 +6,16 @@ The views receive an HttpRequest object, perform operations based on the request
 and return an HttpResponse object.
 """
 
+import hmac
+
+from django.conf import settings
+from django.http import HttpResponse
 from django.shortcuts import render
+from django.views.decorators.cache import never_cache
 from logging import getLogger
+from prometheus_client import CONTENT_TYPE_LATEST
+
+from .metrics import exposition
 
 
 logger = getLogger(__name__)
@@ -28,3 +36,31 @@ def index(request):
         "Client with IP %s accessed the index page", request.META.get("REMOTE_ADDR")
     )
     return render(request, "oc_lettings_site/index.html")
+
+
+@never_cache
+def metrics(request):
+    """
+    Expose the metrics of the project in the Prometheus text format.
+
+    The metrics can be read by a staff user, or with the METRICS_TOKEN setting in an
+    `Authorization: Bearer` header, as by a Prometheus server.
+
+    Args:
+        request (HttpRequest): The request object.
+
+    Returns:
+        HttpResponse: The response object, holding the metrics, or a 401 response if the
+            request is not authorized.
+    """
+    scheme, _, credentials = request.META.get("HTTP_AUTHORIZATION", "").partition(" ")
+    token_valid = (
+        settings.METRICS_TOKEN
+        and scheme.lower() == "bearer"
+        and hmac.compare_digest(credentials.encode(), settings.METRICS_TOKEN.encode())
+    )
+    if not token_valid and not request.user.is_staff:
+        response = HttpResponse("Unauthorized", status=401, content_type="text/plain")
+        response["WWW-Authenticate"] = 'Bearer realm="metrics"'
+        return response
+    return HttpResponse(exposition(), content_type=CONTENT_TYPE_LATEST)
@@ -2,7 +2,10 @@
 This module defines the admin interface configurations for the Django application.
 
 It imports the models from the models module and registers them with the admin
-site using the admin.site.register function.
+site using a ModelAdmin class tuned for large tables: the user is joined to the listed
+profiles instead of being fetched for each row, the search uses the unique index of the
+usernames, the user of a profile is picked with a raw-id widget instead of a select of
+every user, and the list is paginated with an estimated count.
 
 This allows the admin site to have access to the models, enabling it to perform
 CRUD operations on them.
@@ -10,7 +13,35 @@ CRUD operations on them.
 
 from django.contrib import admin
 
+from oc_lettings_site.admin_utils import EstimatedCountPaginator, IndexedSearchMixin
+from oc_lettings_site.export import export_action
 from profiles.models import Profile
 
 
-admin.site.register(Profile)
+@admin.register(Profile)
+class ProfileAdmin(IndexedSearchMixin, admin.ModelAdmin):
+    """
+    This class defines the admin interface of the 'Profile' model.
+
+    The search matches the usernames by prefix, or anywhere, ignoring the case, when no
+    username starts with the terms. Its actions stream the selected profiles with their
+    user as CSV or JSONL.
+    """
+
+    list_display = ("username", "favorite_city", "updated_at")
+    list_select_related = ("user",)
+    list_filter = ("updated_at",)
+    search_fields = ("user__username",)
+    search_prefix_fields = ("user__username",)
+    raw_id_fields = ("user",)
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    actions = [export_action("profiles", "csv"), export_action("profiles", "jsonl")]
+
+    def username(self, profile):
+        """
+        Return the username of the user of a profile, for the list display.
+        """
+        return profile.user.username
+
+    username.admin_order_field = "user__username"
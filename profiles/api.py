@@ -0,0 +1,53 @@
+"""
+This module defines the JSON API views of the 'profiles' application.
+
+The views return the profiles with the fields selected by the `fields` parameter, see
+'oc_lettings_site.api'.
+"""
+
+from logging import getLogger
+
+from django.views.decorators.http import require_safe
+
+from oc_lettings_site.api import conditional_fields, error_response, json_response, serialize
+from oc_lettings_site.database import public_view
+from .models import Profile
+from .views import profile_validators
+
+
+logger = getLogger(__name__)
+
+FIELDS = (
+    "favorite_city",
+    "user.username",
+    "user.first_name",
+    "user.last_name",
+    "user.email",
+)
+
+
+@require_safe
+@public_view
+@conditional_fields(profile_validators, FIELDS, always=("user.username",))
+def profile_detail(request, username):
+    """
+    Return the profile of a user.
+
+    Args:
+        request (HttpRequest): The request object.
+        username (str): The username of the user.
+
+    Returns:
+        JsonResponse: The profile, or a 404 response if it does not exist, or a 400
+         response if the fields are unknown.
+    """
+    fields = request.api_fields
+    rows = serialize(Profile.objects.filter(user__username=username), fields)
+    if not rows:
+        logger.warning(
+            "Client with IP %s requested a profile that does not exist: %s",
+            request.META.get("REMOTE_ADDR"),
+            username,
+        )
+        return error_response("Profile not found.", status=404)
+    return json_response(rows[0])
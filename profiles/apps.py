@@ -21,3 +21,9 @@ class ProfilesConfig(AppConfig):
     """
 
     name = "profiles"
+
+    def ready(self):
+        """
+        Connect the signal receivers of the 'profiles' application.
+        """
+        from . import signals  # noqa: F401
@@ -0,0 +1,46 @@
+"""
+This module defines the asynchronous versions of the profiles index and detail views.
+
+They are routed instead of the views of 'profiles.views' when the ASYNC_VIEWS setting is
+set, as it is by the ASGI entry point of the project. The queries and the rendering run
+in the thread of the request with 'sync_to_async', see 'lettings.async_views'.
+"""
+
+from asgiref.sync import sync_to_async
+from oc_lettings_site.conditional import conditional
+from oc_lettings_site.database import public_view
+from .views import index_response, index_validators, profile_response, profile_validators
+
+
+@public_view
+@conditional(index_validators)
+async def index(request):
+    """
+    Display a page of profiles, as 'profiles.views.index'.
+
+    Args:
+        request (HttpRequest): The request object.
+
+    Returns:
+        HttpResponse: The response object.
+    """
+    return await sync_to_async(index_response)(request)
+
+
+@public_view
+@conditional(profile_validators)
+async def profile(request, username):
+    """
+    Display a specific profile, as 'profiles.views.profile'.
+
+    Args:
+        request (HttpRequest): The request object.
+        username (str): The username of the profile to display.
+
+    Returns:
+        HttpResponse: The response object.
+
+    Raises:
+        Http404: If no Profile exists with the given username.
+    """
+    return await sync_to_async(profile_response)(request, username)
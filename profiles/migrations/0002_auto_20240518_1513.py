@@ -30,6 +30,7 @@ def copy_data(apps: Apps, schema_editor: Any):
 class Migration(migrations.Migration):
     dependencies = [
         ("profiles", "0001_initial"),
+        ("oc_lettings_site", "0002_auto_20240518_1512"),
     ]
 
     operations = [
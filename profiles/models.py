@@ -10,6 +10,39 @@ from django.db import models
 from django.contrib.auth.models import User
 
 
+class ProfileQuerySet(models.QuerySet):
+    """
+    This class defines the custom queryset methods for the 'Profile' model.
+
+    Each method returns a queryset restricted to the columns a given page needs, so that
+    the related 'User' is fetched in the same query instead of once per profile.
+    """
+
+    def for_list(self):
+        """
+        Return the profiles joined with their user, loading only the username.
+
+        Returns:
+            ProfileQuerySet: A single-query queryset suitable for list pages.
+        """
+        return self.select_related("user").only("user__username")
+
+    def for_detail(self):
+        """
+        Return the profiles joined with their user, loading the displayed columns only.
+
+        Returns:
+            ProfileQuerySet: A single-query queryset suitable for the profile page.
+        """
+        return self.select_related("user").only(
+            "favorite_city",
+            "user__username",
+            "user__first_name",
+            "user__last_name",
+            "user__email",
+        )
+
+
 class Profile(models.Model):
     """
     This class represents the 'Profile' model for the 'profiles' application.
@@ -31,6 +64,9 @@ class Profile(models.Model):
 
     user = models.OneToOneField(User, on_delete=models.CASCADE)
     favorite_city = models.CharField(max_length=64, blank=True)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
+
+    objects = ProfileQuerySet.as_manager()
 
     def __str__(self):
         """
@@ -0,0 +1,56 @@
+"""
+This module defines the signal receivers of the 'profiles' application.
+
+The receivers invalidate the cached profile pages whenever a 'Profile' or the 'User' it
+belongs to is saved or deleted, including when the username of the user changes.
+They also touch the 'updated_at' timestamp of a profile when its user is saved, as the
+profile pages display the user fields.
+"""
+
+from django.contrib.auth.models import User
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from oc_lettings_site import page_cache
+from .models import Profile
+
+
+@receiver([post_save, post_delete], sender=Profile)
+def invalidate_profile_page(sender, instance, **kwargs):
+    """
+    Remove the cached page of the saved or deleted profile.
+    """
+    usernames = User.objects.filter(pk=instance.user_id).values_list(
+        "username", flat=True
+    )
+    page_cache.invalidate(*[page_cache.profile_key(username) for username in usernames])
+
+
+@receiver(pre_save, sender=User)
+def invalidate_renamed_user_page(sender, instance, **kwargs):
+    """
+    Remove the cached page stored under the previous username of a renamed user.
+    """
+    if instance.pk is None:
+        return
+    usernames = User.objects.filter(pk=instance.pk).exclude(
+        username=instance.username
+    ).values_list("username", flat=True)
+    page_cache.invalidate(*[page_cache.profile_key(username) for username in usernames])
+
+
+@receiver([post_save, post_delete], sender=User)
+def invalidate_user_page(sender, instance, **kwargs):
+    """
+    Remove the cached page of the profile of the saved or deleted user.
+    """
+    page_cache.invalidate(page_cache.profile_key(instance.username))
+
+
+@receiver(post_save, sender=User)
+def touch_user_profile(sender, instance, **kwargs):
+    """
+    Update the modification date of the profile of the saved user.
+    """
+    Profile.objects.filter(user=instance).update(updated_at=timezone.now())
@@ -8,10 +8,52 @@ These tests help ensure the correct functionality of the application by testing
 individual units of code.
 """
 
-from django.test import TestCase
+from asgiref.sync import async_to_sync
+from django.core.cache import caches
+from django.db import connection
+from django.http import Http404
+from django.test import RequestFactory, TestCase
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
+from . import async_views, views
 from .models import Profile
 from django.contrib.auth import get_user_model
+from oc_lettings_site import page_cache
+
+
+class QueryBudgetMixin:
+    """
+    Mixin adding a query-budget assertion to a test case.
+
+    Methods:
+        assertQueryBudget: Requests a URL and fails if the view runs more SQL queries
+        than its declared budget.
+    """
+
+    def assertQueryBudget(self, url, budget):
+        """
+        Request the given URL and assert it executes at most `budget` queries.
+
+        Args:
+            url (str): The URL to request with the test client.
+            budget (int): The maximum number of SQL queries the view may execute.
+
+        Raises:
+            AssertionError: If the view executes more queries than its budget.
+
+        Returns:
+            HttpResponse: The response returned by the view.
+        """
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(url)
+        executed = [query["sql"] for query in context.captured_queries]
+        self.assertLessEqual(
+            len(executed),
+            budget,
+            "%s executed %d queries, budget is %d:\n%s"
+            % (url, len(executed), budget, "\n".join(executed)),
+        )
+        return response
 
 
 class ProfileModelTest(TestCase):
@@ -267,3 +309,472 @@ class ProfileViewTest(TestCase):
         """
         response = self.client.get(reverse("profile", args=["invaliduser"]))
         self.assertEqual(response.status_code, 404)
+
+
+class QueryBudgetTest(QueryBudgetMixin, TestCase):
+    """
+    Test case for the number of queries executed by the views of the Profile app.
+
+    Methods:
+        setUp: Sets up the test environment.
+        test_index_view_query_budget: Tests that the index view runs a validator query
+        and a single page query whatever the number of profiles.
+        test_profile_view_query_budget: Tests that the profile view runs a validator query
+        and a single page query.
+    """
+
+    def setUp(self) -> None:
+        for i in range(10):
+            user = get_user_model().objects.create(
+                username=f"testuser{i}", password="testpassword"
+            )
+            Profile.objects.create(user=user, favorite_city="Test City")
+
+    def test_index_view_query_budget(self):
+        """
+        Test that the index view runs two queries whatever the number of profiles.
+
+        This test checks that the users are joined to the profiles instead of being
+        fetched one by one, by asserting that rendering ten profiles costs the validator
+        query and one page query.
+
+        Args:
+            self (QueryBudgetTest): Instance of the test case.
+
+        Raises:
+            AssertionError: If the index view executes more than two queries.
+
+        Returns:
+            None
+        """
+        response = self.assertQueryBudget(reverse("profiles_index"), 2)
+        self.assertContains(response, "testuser9")
+
+    def test_profile_view_query_budget(self):
+        """
+        Test that the profile view runs the validator query and a single page query.
+
+        Args:
+            self (QueryBudgetTest): Instance of the test case.
+
+        Raises:
+            AssertionError: If the profile view executes more than two queries.
+
+        Returns:
+            None
+        """
+        response = self.assertQueryBudget(reverse("profile", args=["testuser0"]), 2)
+        self.assertContains(response, "Test City")
+
+
+class ProfilePageCacheTest(TestCase):
+    """
+    Test case for the page cache of the profile view.
+
+    Methods:
+        setUp: Sets up the test environment.
+        test_profile_change_invalidates_page: Tests that saving the profile invalidates
+        the cached page.
+        test_renamed_user_invalidates_page: Tests that renaming the user invalidates the
+        page cached under the previous username.
+    """
+
+    def setUp(self) -> None:
+        caches[page_cache.PAGE_CACHE_ALIAS].clear()
+        self.user = get_user_model().objects.create(
+            username="testuser", password="testpassword"
+        )
+        self.profile = Profile.objects.create(user=self.user, favorite_city="Test City")
+
+    def test_profile_change_invalidates_page(self):
+        """
+        Test that saving a profile invalidates its cached page.
+
+        Args:
+            self (ProfilePageCacheTest): Instance of the test case.
+
+        Raises:
+            AssertionError: If the page still shows the previous favorite city.
+
+        Returns:
+            None
+        """
+        url = reverse("profile", args=["testuser"])
+        self.client.get(url)
+        self.profile.favorite_city = "Other City"
+        self.profile.save()
+        self.assertContains(self.client.get(url), "Other City")
+
+    def test_renamed_user_invalidates_page(self):
+        """
+        Test that renaming a user invalidates the page cached under the previous username.
+
+        Args:
+            self (ProfilePageCacheTest): Instance of the test case.
+
+        Raises:
+            AssertionError: If the previous username still returns the cached page.
+
+        Returns:
+            None
+        """
+        self.client.get(reverse("profile", args=["testuser"]))
+        self.user.username = "renameduser"
+        self.user.save()
+        response = self.client.get(reverse("profile", args=["testuser"]))
+        self.assertEqual(response.status_code, 404)
+
+
+class ConditionalGetTest(TestCase):
+    """
+    Test case for the conditional GET support of the profile view.
+
+    Methods:
+        setUp: Sets up the test environment.
+        test_profile_not_modified: Tests that a matching ETag returns a 304.
+        test_user_change_modifies_profile: Tests that saving the user changes the ETag.
+    """
+
+    def setUp(self) -> None:
+        self.user = get_user_model().objects.create(
+            username="testuser", password="testpassword"
+        )
+        self.profile = Profile.objects.create(user=self.user, favorite_city="Test City")
+
+    def test_profile_not_modified(self):
+        """
+        Test that a matching If-None-Match returns a 304.
+
+        Args:
+            self (ConditionalGetTest): Instance of the test case.
+
+        Raises:
+            AssertionError: If the response is not a 304.
+
+        Returns:
+            None
+        """
+        url = reverse("profile", args=["testuser"])
+        etag = self.client.get(url)["ETag"]
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+    def test_user_change_modifies_profile(self):
+        """
+        Test that saving the user of a profile changes the ETag of its page.
+
+        Args:
+            self (ConditionalGetTest): Instance of the test case.
+
+        Raises:
+            AssertionError: If the previous ETag still returns a 304.
+
+        Returns:
+            None
+        """
+        url = reverse("profile", args=["testuser"])
+        etag = self.client.get(url)["ETag"]
+        self.user.email = "testuser@example.com"
+        self.user.save()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, "testuser@example.com")
+
+
+class ProfileApiTest(QueryBudgetMixin, TestCase):
+    """
+    Test case for the JSON API of the profiles.
+
+    Methods:
+        setUp: Sets up the test environment.
+        test_profile_detail: Tests that a profile is returned with every field.
+        test_profile_sparse_fields: Tests that only the requested fields are returned.
+        test_profile_not_found: Tests that an unknown username returns a 404.
+        test_profile_conditional_fields: Tests that the fields are checked before the
+        conditional request and vary the ETag.
+    """
+
+    def setUp(self):
+        user = get_user_model().objects.create_user(
+            username="testuser", first_name="Test", password="12345"
+        )
+        Profile.objects.create(user=user, favorite_city="Test City")
+
+    def test_profile_detail(self):
+        """
+        Test that a profile is returned with its user nested, within the query budget
+        of the profile page.
+
+        Args:
+            self (ProfileApiTest): Instance of the test case.
+
+        Raises:
+            AssertionError: If the JSON differs from the profile or the view executes
+            more than two queries.
+
+        Returns:
+            None
+        """
+        response = self.assertQueryBudget(reverse("api_profile", args=["testuser"]), 2)
+        data = response.json()
+        self.assertEqual(data["favorite_city"], "Test City")
+        self.assertEqual(data["user"]["username"], "testuser")
+        self.assertEqual(data["user"]["first_name"], "Test")
+
+    def test_profile_sparse_fields(self):
+        """
+        Test that the username is always returned along with the requested fields.
+
+        Args:
+            self (ProfileApiTest): Instance of the test case.
+
+        Raises:
+            AssertionError: If the response has other fields.
+
+        Returns:
+            None
+        """
+        response = self.client.get(
+            reverse("api_profile", args=["testuser"]), {"fields": "favorite_city"}
+        )
+        self.assertEqual(
+            response.json(),
+            {"user": {"username": "testuser"}, "favorite_city": "Test City"},
+        )
+
+    def test_profile_not_found(self):
+        """
+        Test that an unknown username returns a 404 JSON error.
+
+        Args:
+            self (ProfileApiTest): Instance of the test case.
+
+        Raises:
+            AssertionError: If the status code is not 404.
+
+        Returns:
+            None
+        """
+        response = self.client.get(reverse("api_profile", args=["nobody"]))
+        self.assertEqual(response.status_code, 404)
+        self.assertIn("error", response.json())
+
+    def test_profile_conditional_fields(self):
+        """
+        Test that unknown fields return a 400 even with a matching If-None-Match, and
+        that the ETag depends on the selected fields.
+
+        Args:
+            self (ProfileApiTest): Instance of the test case.
+
+        Raises:
+            AssertionError: If unknown fields return a 304, or if the ETag of other
+            fields matches.
+
+        Returns:
+            None
+        """
+        url = reverse("api_profile", args=["testuser"])
+        etag = self.client.get(url)["ETag"]
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        response = self.client.get(url, {"fields": "password"}, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 400)
+        response = self.client.get(url, {"fields": "favorite_city"}, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response["ETag"], etag)
+
+
+class ProfileAdminTest(TestCase):
+    """
+    Test case for the admin interface of the profiles.
+
+    Methods:
+        setUp: Sets up the test environment.
+        create_profiles: Creates profiles with their user.
+        changelist_queries: Returns the number of queries of the profiles changelist.
+        test_changelist_queries_constant: Tests that the changelist does not query the
+        user of each profile.
+        test_search_prefix: Tests that the search matches the usernames by prefix.
+        test_search_fallback: Tests that the search falls back to a case-insensitive
+        search anywhere in the usernames.
+        test_change_form_raw_id: Tests that the user is picked with a raw-id widget.
+    """
+
+    def setUp(self):
+        self.admin = get_user_model().objects.create_superuser(
+            username="admin", email="admin@example.com", password="12345"
+        )
+        self.client.force_login(self.admin)
+        self.create_profiles(0, 3)
+
+    def create_profiles(self, start, stop):
+        """
+        Create the profiles numbered from `start` to `stop`, each with its user.
+        """
+        for i in range(start, stop):
+            user = get_user_model().objects.create_user(username=f"testuser{i}")
+            Profile.objects.create(user=user, favorite_city="Test City")
+
+    def changelist_queries(self):
+        """
+        Request the profiles changelist and return the number of queries it executed.
+        """
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(reverse("admin:profiles_profile_changelist"))
+        self.assertEqual(response.status_code, 200)
+        return len(context.captured_queries)
+
+    def test_changelist_queries_constant(self):
+        """
+        Test that listing more profiles does not execute more queries.
+
+        Args:
+            self (ProfileAdminTest): Instance of the test case.
+
+        Raises:
+            AssertionError: If the number of queries grows with the number of profiles.
+
+        Returns:
+            None
+        """
+        queries = self.changelist_queries()
+        self.create_profiles(3, 10)
+        self.assertEqual(self.changelist_queries(), queries)
+
+    def test_search_prefix(self):
+        """
+        Test that the search matches the usernames starting with the term, with a range
+        condition on the username index.
+
+        Args:
+            self (ProfileAdminTest): Instance of the test case.
+
+        Raises:
+            AssertionError: If the result differs from the expected profiles.
+
+        Returns:
+            None
+        """
+        self.create_profiles(10, 12)
+        response = self.client.get(
+            reverse("admin:profiles_profile_changelist"), {"q": "testuser1"}
+        )
+        self.assertEqual(
+            sorted(profile.user.username for profile in response.context["cl"].result_list),
+            ["testuser1", "testuser10", "testuser11"],
+        )
+
+    def test_search_fallback(self):
+        """
+        Test that a term in another case, or inside the usernames, still finds the
+        profiles when no username starts with it.
+
+        Args:
+            self (ProfileAdminTest): Instance of the test case.
+
+        Raises:
+            AssertionError: If the result differs from the expected profiles.
+
+        Returns:
+            None
+        """
+        for term in ("TestUser2", "user2"):
+            response = self.client.get(
+                reverse("admin:profiles_profile_changelist"), {"q": term}
+            )
+            self.assertEqual(
+                [profile.user.username for profile in response.context["cl"].result_list],
+                ["testuser2"],
+            )
+
+    def test_change_form_raw_id(self):
+        """
+        Test that the change form of a profile does not list every user in a select.
+
+        Args:
+            self (ProfileAdminTest): Instance of the test case.
+
+        Raises:
+            AssertionError: If the user field is rendered as a select.
+
+        Returns:
+            None
+        """
+        profile = Profile.objects.first()
+        response = self.client.get(
+            reverse("admin:profiles_profile_change", args=[profile.pk])
+        )
+        self.assertContains(response, 'class="vForeignKeyRawIdAdminField"')
+        self.assertNotContains(response, '<select name="user"')
+
+
+class AsyncViewsTest(TestCase):
+    """
+    Test case for the asynchronous versions of the profiles views.
+
+    Methods:
+        setUp: Sets up the test environment.
+        test_index_matches_sync: Tests that the asynchronous index renders the same page.
+        test_profile: Tests that the asynchronous profile view renders the profile.
+        test_profile_not_found: Tests that a missing profile raises Http404.
+    """
+
+    def setUp(self):
+        self.factory = RequestFactory()
+        user = get_user_model().objects.create_user(username="testuser")
+        Profile.objects.create(user=user, favorite_city="Test City")
+
+    def test_index_matches_sync(self):
+        """
+        Test that the asynchronous index renders the page of the synchronous one.
+
+        Args:
+            self (AsyncViewsTest): Instance of the test case.
+
+        Raises:
+            AssertionError: If the responses differ.
+
+        Returns:
+            None
+        """
+        request = self.factory.get(reverse("profiles_index"))
+        response = async_to_sync(async_views.index)(request)
+        expected = views.index(self.factory.get(reverse("profiles_index")))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.content, expected.content)
+
+    def test_profile(self):
+        """
+        Test that the asynchronous profile view renders the profile with its validators.
+
+        Args:
+            self (AsyncViewsTest): Instance of the test case.
+
+        Raises:
+            AssertionError: If the page or its ETag is missing.
+
+        Returns:
+            None
+        """
+        request = self.factory.get(reverse("profile", args=["testuser"]))
+        response = async_to_sync(async_views.profile)(request, "testuser")
+        self.assertContains(response, "Test City")
+        self.assertTrue(response.has_header("ETag"))
+
+    def test_profile_not_found(self):
+        """
+        Test that the asynchronous profile view raises Http404 for a missing profile.
+
+        Args:
+            self (AsyncViewsTest): Instance of the test case.
+
+        Raises:
+            AssertionError: If Http404 is not raised.
+
+        Returns:
+            None
+        """
+        request = self.factory.get(reverse("profile", args=["nobody"]))
+        with self.assertRaises(Http404):
+            async_to_sync(async_views.profile)(request, "nobody")
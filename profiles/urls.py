@@ -6,13 +6,17 @@ It imports the necessary modules and defines a 'urlpatterns' list which routes U
 Each URL is mapped to a view function in the 'views' module.
 When Django encounters an incoming URL, it checks the 'urlpatterns' list from top to bottom
 until it finds a matching pattern.
+The pages are served by the 'async_views' module when ASYNC_VIEWS is set.
 """
 
 
+from django.conf import settings
 from django.urls import path
-from .views import index, profile
+from . import async_views, views
+
+pages = async_views if settings.ASYNC_VIEWS else views
 
 urlpatterns = [
-    path("", index, name="profiles_index"),
-    path("<str:username>/", profile, name="profile"),
+    path("", pages.index, name="profiles_index"),
+    path("<str:username>/", pages.profile, name="profile"),
 ]
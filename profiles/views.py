@@ -6,18 +6,49 @@ The views receive an HttpRequest object, perform operations based on the request
 and return an HttpResponse object.
 """
 
+import sentry_sdk
 from django.shortcuts import render, get_object_or_404
-from django.http import Http404
+from django.http import Http404, HttpResponse
 from .models import Profile
 from logging import getLogger
+from oc_lettings_site import page_cache
+from oc_lettings_site.conditional import (
+    aggregate_validators,
+    conditional,
+    request_validators,
+    timestamp_validators,
+)
+from oc_lettings_site.database import public_view
+from oc_lettings_site.pagination import KeysetPaginator
 
 
 logger = getLogger(__name__)
 
 
+def index_validators(request):
+    """
+    Return the validators of the profiles index from the profiles table aggregate.
+    """
+    return aggregate_validators(Profile.objects.all())
+
+
+def profile_validators(request, username):
+    """
+    Return the validators of a profile page from the profile timestamp.
+    """
+    timestamps = (
+        Profile.objects.filter(user__username=username)
+        .values_list("updated_at")
+        .first()
+    )
+    return timestamp_validators(*(timestamps or ()))
+
+
+@public_view
+@conditional(index_validators)
 def index(request):
     """
-    Display a list of all profiles.
+    Display a page of profiles, selected with the `after` and `before` keyset cursors.
 
     Args:
         request (HttpRequest): The request object.
@@ -25,19 +56,30 @@ def index(request):
     Returns:
         HttpResponse: The response object.
     """
+    return index_response(request)
+
+
+def index_response(request):
+    """
+    Build the response of the profiles index, for the synchronous and asynchronous views.
+    """
     logger.info(
         "Client with IP %s accessed the profiles index page",
         request.META.get("REMOTE_ADDR"),
     )
-    profiles_list = Profile.objects.all()
-    context = {"profiles_list": profiles_list}
+    page = KeysetPaginator(Profile.objects.for_list()).page_from_request(request)
+    context = {"profiles_list": page.object_list, "page": page}
     return render(request, "profiles/index.html", context)
 
 
+@public_view
+@conditional(profile_validators)
 def profile(request, username):
     """
     Display a specific profile.
 
+    The rendered page is served from the page cache when it is available.
+
     Args:
         request (HttpRequest): The request object.
         username (str): The username of the profile to display.
@@ -48,9 +90,29 @@ def profile(request, username):
     Raises:
         Http404: If no Profile exists with the given username.
     """
+    return profile_response(request, username)
+
+
+def profile_response(request, username):
+    """
+    Build the response of a profile page, for the synchronous and asynchronous views.
+    """
+    cache_key = page_cache.profile_key(username)
+    version, _ = request_validators(request, profile_validators, username)
+    content = page_cache.get_page(cache_key, version)
+    if content is not None:
+        logger.info(
+            "Client with IP %s accessed the profile %s page",
+            request.META.get("REMOTE_ADDR"),
+            username,
+        )
+        return HttpResponse(content)
 
     try:
-        profile = get_object_or_404(Profile, user__username=username)
+        with sentry_sdk.start_span(op="db", description="profile lookup"):
+            profile = get_object_or_404(
+                Profile.objects.for_detail(), user__username=username
+            )
         logger.info(
             "Client with IP %s accessed the profile %s page",
             request.META.get("REMOTE_ADDR"),
@@ -66,4 +128,7 @@ def profile(request, username):
         raise
 
     context = {"profile": profile}
-    return render(request, "profiles/profile.html", context)
+    with sentry_sdk.start_span(op="template.render", description="profiles/profile.html"):
+        response = render(request, "profiles/profile.html", context)
+    page_cache.set_page(cache_key, version, response.content)
+    return response
@@ -4,30 +4,6 @@
     * Licensed under SEE_LICENSE (https://github.com/BlackrockDigital/sb-ui-kit-pro/blob/master/LICENSE)
     */
     window.addEventListener('DOMContentLoaded', event => {
-    // Activate feather
-    feather.replace();
-
-    // Enable tooltips globally
-    var tooltipTriggerList = [].slice.call(document.querySelectorAll('[data-bs-toggle="tooltip"]'));
-    var tooltipList = tooltipTriggerList.map(function (tooltipTriggerEl) {
-        return new bootstrap.Tooltip(tooltipTriggerEl);
-    });
-
-    // Enable popovers globally
-    var popoverTriggerList = [].slice.call(document.querySelectorAll('[data-bs-toggle="popover"]'));
-    var popoverList = popoverTriggerList.map(function (popoverTriggerEl) {
-        return new bootstrap.Popover(popoverTriggerEl);
-    });
-
-    // Activate Bootstrap scrollspy for the sticky nav component
-    const navStick = document.body.querySelector('#navStick');
-    if (navStick) {
-        new bootstrap.ScrollSpy(document.body, {
-            target: '#navStick',
-            offset: 82,
-        });
-    }
-
     // Collapse Navbar
     // Add styling fallback for when a transparent background .navbar-marketing is scrolled
     var navbarCollapse = function() {